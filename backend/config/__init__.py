@@ -1,6 +1,8 @@
 # config/__init__.py
 default_app_config = 'config.apps.ConfigConfig'
 
-# Закомментируйте эти строки:
-# from .celery import app as celery_app
-# __all__ = ['celery_app']
\ No newline at end of file
+# Приложение Celery загружается вместе с Django, чтобы @shared_task
+# использовали брокер из настроек (CELERY_BROKER_URL)
+from .celery import app as celery_app
+
+__all__ = ['celery_app']
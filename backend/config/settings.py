@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 # Загрузка переменных окружения
@@ -21,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Сторонние приложения
     'rest_framework',
@@ -77,6 +79,14 @@ DATABASES = {
 
 AUTH_USER_MODEL = 'crm.User'
 
+# Общий кэш процессов (версии коллекций для ETag, кэши сервисов)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_URL', 'redis://localhost:6379/2'),
+    }
+}
+
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
@@ -106,6 +116,40 @@ SPECTACULAR_SETTINGS = {
 
 # Telegram Bot
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+# Лимиты Bot API: сообщений в секунду на бота (на процесс воркера) и на личный чат
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+# Одновременных запросов к Bot API (размер пула соединений)
+TELEGRAM_CONCURRENCY = int(os.getenv('TELEGRAM_CONCURRENCY', 10))
+# Предельное время отправки одного пакета, секунд
+TELEGRAM_BATCH_TIMEOUT = int(os.getenv('TELEGRAM_BATCH_TIMEOUT', 120))
+
+# Хранение лога уведомлений: дней в рабочей таблице и в архиве (0 - хранить всегда)
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+NOTIFICATION_ARCHIVE_RETENTION_DAYS = int(os.getenv('NOTIFICATION_ARCHIVE_RETENTION_DAYS', 365))
+# Окно объединения уведомлений о завершении/отмене в сводку, секунд (0 - без сводок)
+NOTIFICATION_DIGEST_WINDOW = int(os.getenv('NOTIFICATION_DIGEST_WINDOW', 30))
+# Повторы неудачных отправок: число попыток и экспоненциальная задержка, секунд
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', 6))
+NOTIFICATION_RETRY_BASE = int(os.getenv('NOTIFICATION_RETRY_BASE', 60))
+NOTIFICATION_RETRY_MAX_DELAY = int(os.getenv('NOTIFICATION_RETRY_MAX_DELAY', 3600))
+# Аренда захваченного диспетчером пакета, секунд (больше TELEGRAM_BATCH_TIMEOUT):
+# по ее истечении пакет упавшего диспетчера возвращается в очередь повторов
+NOTIFICATION_SEND_LEASE = int(os.getenv('NOTIFICATION_SEND_LEASE', 300))
+
+# Фильтр черного списка в памяти процесса: как часто сверять версию
+# с общим кэшем, секунд. Это же граница, за которую добавление в ЧС
+# доходит до фильтров других процессов
+BLACKLIST_FILTER_CHECK_INTERVAL = float(os.getenv('BLACKLIST_FILTER_CHECK_INTERVAL', 2))
+
+# Суточный срез заявок для отчетов: дней, пересобираемых еженощной сверкой
+ORDER_STATS_REPAIR_DAYS = int(os.getenv('ORDER_STATS_REPAIR_DAYS', 7))
+# Кэш отчетов, секунд: закрытые периоды, периоды с сегодняшним днем
+# и ожидание результата, который уже считает другой запрос
+REPORT_CACHE_CLOSED_TTL = int(os.getenv('REPORT_CACHE_CLOSED_TTL', 86400))
+REPORT_CACHE_OPEN_TTL = int(os.getenv('REPORT_CACHE_OPEN_TTL', 60))
+REPORT_CACHE_WAIT = float(os.getenv('REPORT_CACHE_WAIT', 10))
 
 # Настройки Celery
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
@@ -114,4 +158,31 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Europe/Moscow'
-CELERY_CACHE_BACKEND = 'default'
\ No newline at end of file
+CELERY_CACHE_BACKEND = 'default'
+CELERY_BEAT_SCHEDULE = {
+    # Страховочный разбор outbox уведомлений (основной запуск - после коммита)
+    'dispatch-notifications': {
+        'task': 'crm.tasks.dispatch_notifications',
+        'schedule': 30.0,
+    },
+    # Повторная отправка неудачных уведомлений
+    'retry-notifications': {
+        'task': 'crm.tasks.retry_notifications',
+        'schedule': 60.0,
+    },
+    # Задания распространения черного списка, не поставленные или прерванные
+    'resume-blacklist-propagation': {
+        'task': 'crm.tasks.resume_blacklist_propagation',
+        'schedule': 60.0,
+    },
+    # Перенос старого лога уведомлений в архив
+    'archive-notifications': {
+        'task': 'crm.tasks.archive_notifications',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    # Сверка суточного среза заявок для отчетов
+    'repair-order-stats': {
+        'task': 'crm.tasks.repair_order_stats',
+        'schedule': crontab(hour=4, minute=0),
+    },
+}
\ No newline at end of file
@@ -1,14 +1,45 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils import timezone
+from django.utils.functional import cached_property
 from .models import (
     Order,
     User,
     City, 
     Address,  # Используем Address вместо Location
     Blacklist,
+    BlacklistPropagationJob,
     ManagerStatus,
-    NotificationLog
+    NotificationLog,
+    NotificationLogArchive,
+    NotificationTemplate
 )
+from .services.order_service import OrderService
+from .services.order_stats_service import OrderStatsService
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для таблиц на десятки миллионов строк: для списка без
+    фильтров число строк берется из статистики PostgreSQL (pg_class.reltuples)
+    вместо полного COUNT(*).
+    """
+    ESTIMATE_THRESHOLD = 100000
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if connection.vendor == 'postgresql' and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [query.model._meta.db_table]
+                )
+                estimate = cursor.fetchone()[0]
+            if estimate > self.ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
 
 class OrderAdmin(admin.ModelAdmin):
     list_display = (
@@ -21,9 +52,10 @@ class OrderAdmin(admin.ModelAdmin):
         'created_at',
         'is_blacklisted'
     )
+    list_select_related = ('address__city', 'assigned_to')
     list_filter = ('status', 'created_at', 'assigned_to')
-    search_fields = ('client_name', 'phone', 'address')
-    readonly_fields = ('created_at',)
+    search_fields = ('client_name', 'phone', 'address__street', 'address__city__name')
+    readonly_fields = ('created_at', 'updated_at', 'search_document')
     list_editable = ('status',)
     actions = ['mark_as_completed']
 
@@ -31,8 +63,40 @@ class OrderAdmin(admin.ModelAdmin):
         return f"{obj.address.city}, {obj.address.street}"
     get_address.short_description = 'Адрес'
 
+    def save_model(self, request, obj, form, change):
+        """
+        Сохранение из формы и из list_editable. Сначала сохраняются
+        остальные поля при прежнем статусе, и смена менеджера или адреса
+        учитывается в суточном срезе от состояния до правки; затем смена
+        статуса идет через OrderService (история, освобождение менеджера,
+        суточный срез) уже от нового менеджера.
+        """
+        if not change:
+            super().save_model(request, obj, form, change)
+            OrderStatsService.record_created([obj])
+            return
+        
+        old = Order.objects.select_for_update().select_related('address').get(pk=obj.pk)
+        # Статус, не тронутый в форме, не откатывает параллельную смену
+        new_status = obj.status if 'status' in form.changed_data else old.status
+        obj.status = old.status
+        super().save_model(request, obj, form, change)
+        OrderStatsService.record_transition(
+            obj, old.status, old.assigned_to_id, old_city_id=old.address.city_id
+        )
+        
+        if new_status != obj.status:
+            order = OrderService.update_order_status(
+                obj.pk, new_status, request.user, comment='Изменено в админке'
+            )
+            obj.status, obj.updated_at = order.status, order.updated_at
+
     def mark_as_completed(self, request, queryset):
-        queryset.update(status='completed')
+        ids = queryset.exclude(status=Order.STATUS_COMPLETED).values_list('id', flat=True)
+        for order_id in ids:
+            OrderService.update_order_status(
+                order_id, Order.STATUS_COMPLETED, request.user, comment='Изменено в админке'
+            )
     mark_as_completed.short_description = "Отметить как выполненные"
 
 class CustomUserAdmin(UserAdmin):
@@ -69,15 +133,54 @@ class BlacklistAdmin(admin.ModelAdmin):
     search_fields = ('client_name', 'phone')
     readonly_fields = ('created_at',)
 
+class BlacklistPropagationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'action', 'client_name', 'status', 'processed', 'total', 'created_at', 'finished_at')
+    list_filter = ('action', 'status')
+    search_fields = ('client_name', 'phone_normalized')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 class ManagerStatusAdmin(admin.ModelAdmin):
     list_display = ('user', 'status', 'last_updated')
     list_editable = ('status',)
     readonly_fields = ('last_updated',)
 
 class NotificationLogAdmin(admin.ModelAdmin):
-    list_display = ('order', 'recipient', 'message_type', 'created_at')
-    readonly_fields = ('created_at',)
-    list_filter = ('message_type', 'created_at')
+    list_display = ('order', 'recipient', 'message_type', 'status', 'created_at', 'sent_at')
+    list_select_related = ('order', 'recipient')
+    readonly_fields = ('created_at', 'sent_at', 'attempts', 'next_attempt_at', 'digest_key')
+    list_filter = ('message_type', 'status', 'created_at')
+    raw_id_fields = ('order', 'recipient')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        queryset.filter(
+            status__in=[NotificationLog.STATUS_FAILED, NotificationLog.STATUS_DEAD]
+        ).update(status=NotificationLog.STATUS_FAILED, attempts=0, next_attempt_at=timezone.now())
+    retry_now.short_description = "Повторить отправку"
+
+class NotificationLogArchiveAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order_id', 'recipient_id', 'message_type', 'status', 'created_at')
+    list_filter = ('message_type', 'status', 'created_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class NotificationTemplateAdmin(admin.ModelAdmin):
+    list_display = ('type', 'is_active', 'updated_at')
+    list_filter = ('type', 'is_active')
+    readonly_fields = ('updated_at',)
 
 # Регистрация моделей
 admin.site.register(Order, OrderAdmin)
@@ -85,5 +188,8 @@ admin.site.register(User, CustomUserAdmin)
 admin.site.register(City)  # Регистрируем City без кастомного админ-класса
 admin.site.register(Address, AddressAdmin)  # Регистрируем Address с кастомным админ-классом
 admin.site.register(Blacklist, BlacklistAdmin)
+admin.site.register(BlacklistPropagationJob, BlacklistPropagationJobAdmin)
 admin.site.register(ManagerStatus, ManagerStatusAdmin)
-admin.site.register(NotificationLog, NotificationLogAdmin)
\ No newline at end of file
+admin.site.register(NotificationLog, NotificationLogAdmin)
+admin.site.register(NotificationLogArchive, NotificationLogArchiveAdmin)
+admin.site.register(NotificationTemplate, NotificationTemplateAdmin)
\ No newline at end of file
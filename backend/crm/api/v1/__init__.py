@@ -14,6 +14,7 @@ api_v1_router.register(r'users', UserViewSet, basename='user')
 api_v1_router.register(r'locations', LocationViewSet, basename='location')
 api_v1_router.register(r'blacklist', BlacklistViewSet, basename='blacklist')
 api_v1_router.register(r'manager-statuses', ManagerStatusViewSet, basename='managerstatus')
+api_v1_router.register(r'notifications', NotificationLogViewSet, basename='notification')
 
 # Дополнительные endpoints
 api_v1_router.register(r'reports/orders', OrderReportViewSet, basename='order-report')
@@ -0,0 +1,79 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from crm.utils.versioning import get_versions
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы (ETag / Last-Modified) для списков.
+    
+    Валидаторы считаются одним агрегирующим запросом
+    (количество строк и максимум last_modified_field) плюс версии
+    коллекций из кэша. Если клиент прислал совпадающие
+    If-None-Match / If-Modified-Since, ответ 304 отдается
+    без выборки строк и сериализации.
+    """
+    last_modified_field = None
+    version_scopes = ()
+    
+    def get_list_validators(self, queryset):
+        """
+        Вычисляет части ETag и дату последнего изменения для queryset.
+        
+        Returns:
+            tuple: (list частей ETag, datetime | None)
+        """
+        aggregates = {'count': Count('pk')}
+        if self.last_modified_field:
+            aggregates['last_modified'] = Max(self.last_modified_field)
+        
+        stats = queryset.order_by().aggregate(**aggregates)
+        last_modified = stats.get('last_modified')
+        return [stats['count'], last_modified], last_modified
+    
+    def conditional_response(self, request, etag_parts, last_modified=None):
+        """
+        Проверяет валидаторы запроса.
+        
+        Args:
+            request (Request): Текущий запрос
+            etag_parts (list): Значения, от которых зависит ответ
+            last_modified (datetime): Время последнего изменения данных
+            
+        Returns:
+            tuple: (ответ 304 или None, etag, timestamp Last-Modified)
+        """
+        versions = get_versions(*self.version_scopes)
+        parts = list(etag_parts) + sorted(versions.items())
+        etag = quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=timestamp
+        )
+        return not_modified, etag, timestamp
+    
+    @staticmethod
+    def set_validators(response, etag, timestamp=None):
+        """Проставляет ETag / Last-Modified в ответ."""
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag_parts, last_modified = self.get_list_validators(queryset)
+        
+        not_modified, etag, timestamp = self.conditional_response(
+            request, etag_parts, last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+        
+        response = super().list(request, *args, **kwargs)
+        return self.set_validators(response, etag, timestamp)
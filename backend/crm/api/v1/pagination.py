@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация по (created_at, id) для больших лент.
+    В отличие от OFFSET, стоимость глубоких страниц равна стоимости первой:
+    курсор кодирует позицию, и запрос идет по индексу (-created_at, -id).
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -1,14 +1,17 @@
 """
 Инициализация сериализаторов API v1.
 """
-from .order import OrderSerializer, StatusHistorySerializer
+from .order import (
+    OrderSerializer, OrderListSerializer, OrderBulkItemSerializer, StatusHistorySerializer
+)
 from .user import UserSerializer, ManagerStatusSerializer
 from .location import CitySerializer, AddressSerializer
 from .blacklist import BlacklistSerializer
 from .notification import NotificationLogSerializer
 
 __all__ = [
-    'OrderSerializer', 'StatusHistorySerializer',
+    'OrderSerializer', 'OrderListSerializer', 'OrderBulkItemSerializer',
+    'StatusHistorySerializer',
     'UserSerializer', 'ManagerStatusSerializer',
     'CitySerializer', 'AddressSerializer',
     'BlacklistSerializer',
@@ -1,5 +1,7 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
-from crm.models import Blacklist, Order
+from crm.models import Blacklist, BlacklistPropagationJob, Order
 from crm.services.blacklist_service import BlacklistService
 
 class BlacklistSerializer(serializers.ModelSerializer):
@@ -21,9 +23,34 @@ class BlacklistSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at']
 
+    @classmethod
+    def prepare_queryset(cls, queryset):
+        """
+        Подсчет связанных заявок в том же запросе, что и список.
+        Коррелированный подзапрос вычисляется только для строк страницы
+        (в отличие от JOIN + GROUP BY по всей таблице) и идет
+        по индексу таблицы связей по blacklist_id.
+        
+        Args:
+            queryset (QuerySet): Исходный queryset черного списка
+            
+        Returns:
+            QuerySet: queryset с аннотацией related_orders_count
+        """
+        through = Blacklist.related_orders.through
+        counts = through.objects.filter(
+            blacklist_id=OuterRef('pk')
+        ).order_by().values('blacklist_id').annotate(total=Count('*')).values('total')
+        return queryset.annotate(
+            related_orders_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+        )
+
     def get_related_orders_count(self, obj):
-        """Количество связанных заявок клиента."""
-        return obj.related_orders.count()
+        """Количество связанных заявок клиента (из аннотации, если она есть)."""
+        count = getattr(obj, 'related_orders_count', None)
+        if count is None:
+            return obj.related_orders.count()
+        return count
 
 class AddToBlacklistSerializer(serializers.Serializer):
     """
@@ -54,11 +81,62 @@ class AddToBlacklistSerializer(serializers.Serializer):
         return attrs
 
     def create(self, validated_data):
-        """Создание записи в черном списке."""
+        """
+        Создание записи в черном списке. Задание пометки
+        заявок клиента доступно после save() в атрибуте job.
+        """
         service = BlacklistService()
-        return service.add_to_blacklist(
+        entry, self.job = service.add_to_blacklist(
             client_name=validated_data['client_name'],
             phone=validated_data['phone'],
             reason=validated_data['reason'],
             order_id=validated_data.get('order_id')
-        )
\ No newline at end of file
+        )
+        return entry
+
+class BlacklistPropagationJobSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор задания распространения флага ЧС на заявки клиента.
+    Клиент опрашивает задание до статуса done.
+    """
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BlacklistPropagationJob
+        fields = [
+            'id',
+            'action',
+            'client_name',
+            'status',
+            'total',
+            'processed',
+            'updated',
+            'progress',
+            'created_at',
+            'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """Доля обработанных заявок (0..1), None - подсчет еще не начат."""
+        if obj.status == BlacklistPropagationJob.STATUS_DONE:
+            return 1.0
+        if not obj.total:
+            return None
+        return min(obj.processed / obj.total, 1.0)
+
+class BlacklistImportSerializer(serializers.Serializer):
+    """
+    Сериализатор загрузки CSV-файла черного списка.
+    Колонки файла: client_name, phone, reason (необязательна).
+    """
+    file = serializers.FileField(
+        help_text="CSV-файл в UTF-8 с заголовком client_name,phone,reason"
+    )
+    reason = serializers.CharField(
+        max_length=500,
+        required=False,
+        allow_blank=True,
+        default='',
+        help_text="Причина для строк без колонки reason"
+    )
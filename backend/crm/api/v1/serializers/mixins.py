@@ -0,0 +1,37 @@
+class SparseFieldsetMixin:
+    """
+    Поддержка разреженных наборов полей (?fields=id,status,client_name).
+    Неизвестные имена полей игнорируются; без параметра
+    сериализатор отдает все поля.
+    """
+    fields_query_param = 'fields'
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.requested_fields(self.context.get('request'))
+        
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+    
+    @classmethod
+    def requested_fields(cls, request):
+        """
+        Разбирает параметр запроса с перечнем полей.
+        
+        Args:
+            request (Request): Текущий запрос DRF или None
+            
+        Returns:
+            set | None: Имена запрошенных полей или None, если параметр не задан
+        """
+        if request is None:
+            return None
+        
+        raw = request.query_params.get(cls.fields_query_param)
+        if not raw:
+            return None
+        
+        known = set(cls.Meta.fields)
+        requested = {name.strip() for name in raw.split(',')} & known
+        return requested or None
@@ -15,6 +15,7 @@ class NotificationLogSerializer(serializers.ModelSerializer):
         model = NotificationLog
         fields = [
             'id', 'order', 'recipient', 'message_type',
-            'message_text', 'created_at', 'is_sent'
+            'message_text', 'created_at', 'status', 'attempts',
+            'next_attempt_at', 'sent_at', 'is_sent'
         ]
         read_only_fields = fields
\ No newline at end of file
@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from crm.models import Order, StatusHistory
+from crm.services.validator import PhoneValidator
 from .user import UserSerializer
 from .location import AddressSerializer
+from .mixins import SparseFieldsetMixin
 
 class StatusHistorySerializer(serializers.ModelSerializer):
     """
@@ -29,32 +31,22 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = [
             'id', 'client_name', 'phone', 'address', 'comment',
-            'status', 'created_at', 'assigned_to', 'is_blacklisted',
+            'status', 'created_at', 'updated_at', 'assigned_to', 'is_blacklisted',
             'status_history'
         ]
-        read_only_fields = ['id', 'created_at', 'status_history', 'is_blacklisted']
+        # Статус меняется только действиями assign/update_status (OrderService):
+        # там же ведутся история статусов и суточный срез отчетов
+        read_only_fields = ['id', 'status', 'created_at', 'updated_at', 'status_history', 'is_blacklisted']
     
     def validate(self, data):
         """
         Валидация данных заявки:
         - Проверка формата телефона
-        - Проверка статусов при изменении
         """
         if 'phone' in data:
             validator = PhoneValidator()
             data['phone'] = validator(data['phone'])
         
-        # Дополнительные проверки при изменении статуса
-        if 'status' in data:
-            current_status = self.instance.status if self.instance else None
-            new_status = data['status']
-            
-            # Логика проверки допустимых переходов статусов
-            if current_status == 'completed' and new_status != 'completed':
-                raise serializers.ValidationError(
-                    "Завершенную заявку нельзя изменить"
-                )
-        
         return data
     
     def create(self, validated_data):
@@ -70,4 +62,94 @@ class OrderSerializer(serializers.ModelSerializer):
             address=validated_data['address'],
             comment=validated_data.get('comment', ''),
             operator=self.context['request'].user
-        )
\ No newline at end of file
+        )
+
+class OrderListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Облегченный сериализатор заявок для списков.
+    Отдает только колонки таблицы без вложенной истории и адреса,
+    поддерживает ?fields= для выбора подмножества полей.
+    """
+    city = serializers.CharField(source='address.city.name', read_only=True)
+    address = serializers.StringRelatedField()
+    # Для неназначенной заявки DRF пропустил бы поле целиком (assigned_to = None),
+    # поэтому имя отдается явно: форма строки списка не зависит от заявки
+    assigned_to_name = serializers.SerializerMethodField()
+    
+    # Колонки модели, необходимые для каждого поля списка
+    FIELD_COLUMNS = {
+        'id': ['id'],
+        'client_name': ['client_name'],
+        'phone': ['phone'],
+        'city': ['address__city__name'],
+        'address': [
+            'address__street', 'address__house', 'address__building',
+            'address__apartment', 'address__city__name'
+        ],
+        'status': ['status'],
+        'created_at': ['created_at'],
+        'updated_at': ['updated_at'],
+        'assigned_to': ['assigned_to'],
+        'assigned_to_name': ['assigned_to__first_name', 'assigned_to__last_name'],
+        'is_blacklisted': ['is_blacklisted'],
+    }
+    
+    # Колонки, нужные всегда (ключ курсорной пагинации)
+    REQUIRED_COLUMNS = ['id', 'created_at']
+    
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'client_name', 'phone', 'city', 'address', 'status',
+            'created_at', 'updated_at', 'assigned_to', 'assigned_to_name', 'is_blacklisted'
+        ]
+        read_only_fields = fields
+    
+    @classmethod
+    def prepare_queryset(cls, queryset, request=None):
+        """
+        Ограничивает выборку колонками запрошенных полей
+        и подключает только нужные JOIN'ы.
+        
+        Args:
+            queryset (QuerySet): Исходный queryset заявок
+            request (Request): Текущий запрос (для ?fields=)
+            
+        Returns:
+            QuerySet: Оптимизированный queryset
+        """
+        fields = cls.requested_fields(request) or cls.Meta.fields
+        
+        columns = list(cls.REQUIRED_COLUMNS)
+        for name in fields:
+            columns.extend(cls.FIELD_COLUMNS[name])
+        
+        relations = {
+            column.rsplit('__', 1)[0]
+            for column in columns
+            if '__' in column
+        }
+        
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*columns)
+    
+    def get_assigned_to_name(self, obj):
+        """Полное имя назначенного менеджера или None."""
+        return obj.assigned_to.get_full_name() if obj.assigned_to_id else None
+
+
+class OrderBulkItemSerializer(serializers.Serializer):
+    """
+    Элемент пакетного создания заявок.
+    Проверяет только формат данных без обращений к БД:
+    адреса и черный список разрешаются сервисом одним запросом на пакет.
+    """
+    client_name = serializers.CharField(max_length=100)
+    phone = serializers.CharField(max_length=20)
+    address_id = serializers.IntegerField()
+    comment = serializers.CharField(required=False, allow_blank=True, default='')
+    
+    def validate_phone(self, value):
+        """Нормализация номера телефона."""
+        return PhoneValidator()(value)
@@ -6,6 +6,9 @@ from .views import (
     LocationViewSet,
     ManagerStatusViewSet,
     BlacklistViewSet,
+    NotificationLogViewSet,
+    OrderReportViewSet,
+    ManagerReportViewSet,
     OrderBlacklistView  
 )
 
@@ -16,6 +19,9 @@ router.register(r'users', UserViewSet, basename='user')
 router.register(r'locations', LocationViewSet, basename='location')
 router.register(r'manager-statuses', ManagerStatusViewSet, basename='manager-status')
 router.register(r'blacklist', BlacklistViewSet, basename='blacklist')
+router.register(r'notifications', NotificationLogViewSet, basename='notification')
+router.register(r'reports/orders', OrderReportViewSet, basename='order-report')
+router.register(r'reports/managers', ManagerReportViewSet, basename='manager-report')
 
 urlpatterns = [
     path('', include(router.urls)),
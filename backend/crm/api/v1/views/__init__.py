@@ -4,10 +4,12 @@ from .location import LocationViewSet
 from .blacklist import BlacklistViewSet, OrderBlacklistView  # Добавлен OrderBlacklistView
 from .manager_status import ManagerStatusViewSet
 from .reports import OrderReportViewSet, ManagerReportViewSet
+from .notification import NotificationLogViewSet
 
 __all__ = [
     'OrderViewSet', 'UserViewSet', 'LocationViewSet',
     'BlacklistViewSet', 'ManagerStatusViewSet',
     'OrderReportViewSet', 'ManagerReportViewSet',
+    'NotificationLogViewSet',
     'OrderBlacklistView'  # Добавлен в экспорт
 ]
\ No newline at end of file
@@ -1,12 +1,17 @@
+import io
 from rest_framework import viewsets, status, serializers  # Добавлен импорт serializers
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from crm.models import Blacklist, Order
+from crm.models import Blacklist, BlacklistPropagationJob, Order
 from ..serializers.blacklist import (
     BlacklistSerializer,
-    AddToBlacklistSerializer
+    AddToBlacklistSerializer,
+    BlacklistImportSerializer,
+    BlacklistPropagationJobSerializer
 )
 from ..permissions import IsCoordinator
+from ..pagination import CreatedAtCursorPagination
 from crm.services.blacklist_service import BlacklistService  # Исправлен относительный импорт
 
 class BlacklistViewSet(viewsets.ModelViewSet):
@@ -14,9 +19,23 @@ class BlacklistViewSet(viewsets.ModelViewSet):
     ViewSet для работы с черным списком клиентов.
     Доступен только координаторам и администраторам.
     """
-    queryset = Blacklist.objects.all().order_by('-created_at')
+    queryset = Blacklist.objects.all().order_by('-created_at', '-id')
     serializer_class = BlacklistSerializer
     permission_classes = [IsCoordinator]
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        """
+        Список - один запрос на страницу: число связанных заявок
+        считается в том же запросе, ?q= фильтрует по ФИО и телефону.
+        """
+        queryset = BlacklistSerializer.prepare_queryset(super().get_queryset())
+        
+        query = self.request.query_params.get('q', '').strip()
+        if self.action == 'list' and query:
+            queryset = BlacklistService.search(queryset, query)
+        
+        return queryset
 
     @action(
         detail=True,
@@ -26,14 +45,18 @@ class BlacklistViewSet(viewsets.ModelViewSet):
     def unblock(self, request, pk=None):
         """
         Разблокировка клиента (удаление из черного списка).
-        Также снимает флаги is_blacklisted с связанных заявок.
+        Флаги is_blacklisted с заявок клиента снимает фоновое задание,
+        ответ возвращается сразу с заданием для опроса (jobs/<id>/).
         """
         entry = self.get_object()
         service = BlacklistService()
-        service.remove_from_blacklist(entry.id)
+        job = service.remove_from_blacklist(entry.id)
         return Response(
-            {"status": "Клиент удален из черного списка"},
-            status=status.HTTP_200_OK
+            {
+                "status": "Клиент удален из черного списка",
+                "job": BlacklistPropagationJobSerializer(job).data
+            },
+            status=status.HTTP_202_ACCEPTED
         )
 
     @action(
@@ -44,17 +67,71 @@ class BlacklistViewSet(viewsets.ModelViewSet):
     def add_from_order(self, request):
         """
         Специальный endpoint для добавления в ЧС из заявки.
-        Принимает order_id и reason.
+        Принимает order_id и reason. Ответ содержит задание
+        пометки остальных заявок клиента (job).
         """
         serializer = AddToBlacklistSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         entry = serializer.save()
         return Response(
-            BlacklistSerializer(entry).data,
+            {
+                **BlacklistSerializer(entry).data,
+                'job': BlacklistPropagationJobSerializer(serializer.job).data
+            },
             status=status.HTTP_201_CREATED
         )
 
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'jobs/(?P<job_id>\d+)',
+        serializer_class=BlacklistPropagationJobSerializer
+    )
+    def job(self, request, job_id=None):
+        """
+        Прогресс задания распространения флага ЧС на заявки клиента.
+        """
+        try:
+            job = BlacklistPropagationJob.objects.get(id=job_id)
+        except BlacklistPropagationJob.DoesNotExist:
+            return Response(
+                {"detail": "Задание не найдено"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(BlacklistPropagationJobSerializer(job).data)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        parser_classes=[MultiPartParser],
+        serializer_class=BlacklistImportSerializer
+    )
+    def import_csv(self, request):
+        """
+        Пакетная загрузка черного списка из CSV.
+        Файл разбирается потоково (крупные загрузки Django хранит
+        во временном файле), ответ - статистика импорта.
+        """
+        serializer = BlacklistImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        uploaded = serializer.validated_data['file']
+        stream = io.TextIOWrapper(uploaded.file, encoding='utf-8-sig', newline='')
+        try:
+            stats = BlacklistService().import_csv(
+                stream,
+                default_reason=serializer.validated_data['reason']
+            )
+        except ValueError as e:
+            return Response({'file': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        finally:
+            # Файл загрузки закрывает Django, обертка от него отсоединяется
+            stream.detach()
+        
+        return Response(stats, status=status.HTTP_200_OK)
+
 class OrderBlacklistView(viewsets.GenericViewSet):
     """
     Отдельный ViewSet для черного списка в контексте заявки.
@@ -80,6 +157,9 @@ class OrderBlacklistView(viewsets.GenericViewSet):
         
         entry = serializer.save()
         return Response(
-            BlacklistSerializer(entry).data,
+            {
+                **BlacklistSerializer(entry).data,
+                'job': BlacklistPropagationJobSerializer(serializer.job).data
+            },
             status=status.HTTP_201_CREATED
         )
\ No newline at end of file
@@ -4,15 +4,18 @@ from rest_framework.response import Response  # Добавлен импорт Re
 from crm.models import City
 from ..serializers import CitySerializer
 from crm.services.fias_integration import FIASIntegration
+from ..mixins import ConditionalGetMixin
 
-class LocationViewSet(viewsets.ModelViewSet):
+class LocationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet для работы с локациями (города и адреса).
     Поддерживает поиск через ФИАС API.
+    Список поддерживает условные запросы (ETag).
     """
     queryset = City.objects.all()
     serializer_class = CitySerializer
     permission_classes = [permissions.IsAuthenticated]
+    version_scopes = ('cities',)
     
     @action(detail=False, methods=['get'])
     def search(self, request):
@@ -1,15 +1,19 @@
 from rest_framework import viewsets, permissions
 from crm.models import ManagerStatus
 from ..serializers import ManagerStatusSerializer
+from ..mixins import ConditionalGetMixin
 
-class ManagerStatusViewSet(viewsets.ModelViewSet):
+class ManagerStatusViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet для работы со статусами менеджеров.
     Позволяет обновлять статусы в реальном времени.
+    Список поддерживает условные запросы (ETag / Last-Modified).
     """
     queryset = ManagerStatus.objects.all()
     serializer_class = ManagerStatusSerializer
     permission_classes = [permissions.IsAuthenticated]
+    last_modified_field = 'last_updated'
+    version_scopes = ('manager_status',)
     
     def get_queryset(self):
         """
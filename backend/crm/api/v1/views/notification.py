@@ -0,0 +1,34 @@
+from django.db.models import Prefetch
+from rest_framework import viewsets, permissions
+from crm.models import NotificationLog, Order
+from ..serializers import NotificationLogSerializer
+from ..pagination import CreatedAtCursorPagination
+from .order import OrderViewSet
+
+class NotificationLogViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet для просмотра лога уведомлений.
+    Пользователи видят уведомления, адресованные им,
+    администраторы - все уведомления.
+    """
+    queryset = NotificationLog.objects.all()
+    serializer_class = NotificationLogSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
+    
+    def get_queryset(self):
+        """
+        Фильтрация по получателю (для всех, кроме администраторов).
+        """
+        user = self.request.user
+        queryset = super().get_queryset().select_related(
+            'recipient'
+        ).prefetch_related(
+            'recipient__groups',
+            Prefetch('order', queryset=OrderViewSet.with_related(Order.objects.all()))
+        )
+        
+        if user.is_superuser:
+            return queryset
+        
+        return queryset.filter(recipient=user)
@@ -1,22 +1,38 @@
+from django.db.models import Prefetch
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from crm.models import Order
-from ..serializers import OrderSerializer
+from crm.models import Order, StatusHistory
+from ..serializers import OrderSerializer, OrderListSerializer, OrderBulkItemSerializer
+from ..pagination import CreatedAtCursorPagination
+from ..mixins import ConditionalGetMixin
 from crm.services.order_service import OrderService
 from crm.services.notification_service import NotificationService
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet для работы с заявками.
     Поддерживает все операции CRUD и специальные действия:
     - Назначение менеджера
     - Изменение статусов
     - Добавление в черный список
+    
+    Список поддерживает условные запросы (ETag).
     """
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
+    # Версии меняются при записи заявок, адресов, городов и имен менеджеров
+    # (crm/signals.py и пути в обход save() в сервисах)
+    version_scopes = ('orders', 'status_history', 'cities')
+    
+    # Сколько лучших совпадений отдает поиск ?q=
+    SEARCH_RESULTS_LIMIT = 50
+    
+    @property
+    def search_query(self):
+        return self.request.query_params.get('q', '').strip()
     
     def get_queryset(self):
         """
@@ -28,6 +44,11 @@ class OrderViewSet(viewsets.ModelViewSet):
         user = self.request.user
         queryset = super().get_queryset()
         
+        if self.action == 'list':
+            queryset = OrderListSerializer.prepare_queryset(queryset, self.request)
+        else:
+            queryset = self.with_related(queryset)
+        
         if user.is_operator:
             return queryset.filter(created_by=user)
         elif user.is_manager:
@@ -35,6 +56,108 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def get_list_validators(self, queryset):
+        """
+        ETag ленты строится только по версиям коллекций, без агрегации
+        по таблице заявок. Пользователь и параметры запроса (фильтры,
+        курсор) входят в ETag: набор видимых заявок зависит от них.
+        """
+        return [self.request.user.pk, self.request.get_full_path()], None
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Лента заявок с курсорной пагинацией.
+        При ?q= - ранжированный поиск, первые SEARCH_RESULTS_LIMIT совпадений.
+        """
+        if not self.search_query:
+            return super().list(request, *args, **kwargs)
+        
+        queryset = OrderService.search_orders(
+            self.filter_queryset(self.get_queryset()),
+            self.search_query
+        )
+        serializer = self.get_serializer(queryset[:self.SEARCH_RESULTS_LIMIT], many=True)
+        return Response({'next': None, 'previous': None, 'results': serializer.data})
+    
+    def get_serializer_class(self):
+        """
+        Облегченное представление для списка,
+        полное (с историей и адресом) - для остальных действий.
+        """
+        if self.action == 'list':
+            return OrderListSerializer
+        return super().get_serializer_class()
+    
+    @staticmethod
+    def with_related(queryset):
+        """
+        План жадной загрузки для OrderSerializer.
+        Количество запросов на страницу не зависит от числа заявок:
+        адрес, город и менеджер подтягиваются JOIN'ом,
+        история статусов и группы пользователей - отдельными prefetch.
+        """
+        history = StatusHistory.objects.select_related(
+            'changed_by'
+        ).prefetch_related(
+            'changed_by__groups'
+        ).order_by('changed_at')
+        
+        return queryset.select_related(
+            'address__city',
+            'assigned_to'
+        ).prefetch_related(
+            'assigned_to__groups',
+            Prefetch('status_history', queryset=history)
+        )
+    
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """
+        Пакетное создание заявок (интеграция колл-центра).
+        Принимает список заявок (до OrderService.BULK_CREATE_LIMIT),
+        возвращает ID созданных заявок и ошибки по индексам элементов.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Ожидается непустой список заявок'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(items) > OrderService.BULK_CREATE_LIMIT:
+            return Response(
+                {'error': f'Не более {OrderService.BULK_CREATE_LIMIT} заявок за один запрос'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        valid_items = []
+        indexes = []
+        errors = []
+        for index, item in enumerate(items):
+            serializer = OrderBulkItemSerializer(data=item)
+            if serializer.is_valid():
+                valid_items.append(serializer.validated_data)
+                indexes.append(index)
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+        
+        result = OrderService.bulk_create_orders(valid_items, request.user)
+        
+        # Индексы ошибок сервиса относятся к списку валидных элементов
+        errors.extend(
+            {'index': indexes[error['index']], 'errors': error['errors']}
+            for error in result['errors']
+        )
+        errors.sort(key=lambda error: error['index'])
+        
+        return Response(
+            {
+                'created': [order.id for order in result['created']],
+                'errors': errors
+            },
+            status=status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST
+        )
+    
     @action(detail=True, methods=['post'])
     def assign(self, request, pk=None):
         """
@@ -56,7 +179,14 @@ class OrderViewSet(viewsets.ModelViewSet):
                 manager_id,
                 request.user
             )
+            order = self.with_related(Order.objects.all()).get(id=order.id)
             return Response(self.get_serializer(order).data)
+        except ValueError as e:
+            # Менеджер или заявка заняты параллельным назначением - повтор не поможет
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -86,6 +216,7 @@ class OrderViewSet(viewsets.ModelViewSet):
                 request.user,
                 comment
             )
+            order = self.with_related(Order.objects.all()).get(id=order.id)
             return Response(self.get_serializer(order).data)
         except Exception as e:
             return Response(
@@ -109,11 +240,12 @@ class OrderViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            blacklist_entry = OrderService.add_to_blacklist(
+            blacklist_entry, job = OrderService.add_to_blacklist(
                 order.id,
                 reason
             )
-            return Response({'success': True}, status=status.HTTP_201_CREATED)
+            # Остальные заявки клиента помечаются в фоне, job_id - для опроса прогресса
+            return Response({'success': True, 'job_id': job.id}, status=status.HTTP_201_CREATED)
         except Exception as e:
             return Response(
                 {'error': str(e)},
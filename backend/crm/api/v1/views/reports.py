@@ -1,8 +1,40 @@
-from rest_framework import viewsets, permissions
+from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from crm.services.report_service import ReportService
+from ..mixins import ConditionalGetMixin
 
-class OrderReportViewSet(viewsets.ViewSet):
+class ReportConditionalMixin(ConditionalGetMixin):
+    """
+    Условные запросы для отчетов: отчет не пересчитывается,
+    пока заявки периода не менялись.
+    """
+    
+    def report_response(self, request, report_name, build_report):
+        """
+        Отдает 304 по валидаторам периода или строит отчет.
+        
+        Args:
+            request (Request): Текущий запрос
+            report_name (str): Имя отчета (часть ETag)
+            build_report (callable): build_report(period, date_from, date_to) -> dict
+        """
+        period = request.query_params.get('period', 'today')
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        
+        stamp = ReportService.get_orders_stamp(period, date_from, date_to)
+        not_modified, etag, timestamp = self.conditional_response(
+            request,
+            [report_name, period, stamp['date_from'], stamp['date_to'], stamp['count'], stamp['last_modified']],
+            stamp['last_modified']
+        )
+        if not_modified is not None:
+            return not_modified
+        
+        report = build_report(period, date_from, date_to)
+        return self.set_validators(Response(report), etag, timestamp)
+
+class OrderReportViewSet(ReportConditionalMixin, viewsets.ViewSet):
     """
     ViewSet для генерации отчетов по заявкам.
     Доступен только координаторам и администраторам.
@@ -20,14 +52,9 @@ class OrderReportViewSet(viewsets.ViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        period = request.query_params.get('period', 'today')
-        date_from = request.query_params.get('date_from')
-        date_to = request.query_params.get('date_to')
-        
-        report = ReportService.get_orders_report(period, date_from, date_to)
-        return Response(report)
+        return self.report_response(request, 'orders', ReportService.get_orders_report)
 
-class ManagerReportViewSet(viewsets.ViewSet):
+class ManagerReportViewSet(ReportConditionalMixin, viewsets.ViewSet):
     """
     ViewSet для генерации отчетов по менеджерам.
     Показывает эффективность работы менеджеров.
@@ -44,9 +71,4 @@ class ManagerReportViewSet(viewsets.ViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        period = request.query_params.get('period', 'today')
-        date_from = request.query_params.get('date_from')
-        date_to = request.query_params.get('date_to')
-        
-        report = ReportService.get_managers_report(period, date_from, date_to)
-        return Response(report)
\ No newline at end of file
+        return self.report_response(request, 'managers', ReportService.get_managers_report)
\ No newline at end of file
@@ -7,8 +7,4 @@ class CRMConfig(AppConfig):
     def ready(self):
         # Импорт сигналов и задач
         import crm.signals
-        from .services import notification_service
-        
-        # Инициализация Telegram бота при запуске приложения
-        from crm.services.notification_service import NotificationService
-        NotificationService.initialize_bot()
\ No newline at end of file
+        from .services import notification_service
\ No newline at end of file
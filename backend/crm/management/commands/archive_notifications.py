@@ -0,0 +1,41 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from crm.services.notification_service import NotificationService
+
+class Command(BaseCommand):
+    help = 'Перенос старых уведомлений в архив и очистка архива'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.NOTIFICATION_RETENTION_DAYS,
+            help='Переносить в архив уведомления старше указанного числа дней'
+        )
+        parser.add_argument(
+            '--archive-days',
+            type=int,
+            default=settings.NOTIFICATION_ARCHIVE_RETENTION_DAYS,
+            help='Удалять из архива записи старше указанного числа дней (0 - не удалять)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=NotificationService.ARCHIVE_BATCH_SIZE,
+            help='Количество строк, обрабатываемых за одну транзакцию'
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        batch_size = options['batch_size']
+
+        moved = NotificationService.archive_old(now - timedelta(days=options['days']), batch_size)
+        self.stdout.write(f'Перенесено в архив: {moved}')
+
+        if options['archive_days']:
+            deleted = NotificationService.purge_archive(now - timedelta(days=options['archive_days']), batch_size)
+            self.stdout.write(f'Удалено из архива: {deleted}')
+
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from crm.models import Order, Blacklist
+from crm.services.blacklist_filter import BlacklistFilter
+from crm.utils.phone import normalize_phone
+from crm.utils.versioning import bump_version_on_commit
+
+class Command(BaseCommand):
+    help = 'Заполнение нормализованных телефонов у заявок и черного списка'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк, обрабатываемых за одну транзакцию'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        updated = self._backfill(
+            Blacklist.objects.only('id', 'phone', 'phone_normalized'),
+            batch_size,
+            ['phone_normalized']
+        )
+        self.stdout.write(f'Черный список: обновлено {updated} записей')
+        if updated:
+            # bulk_update минует сигналы: фильтры процессов пересобираются по версии
+            BlacklistFilter.invalidate()
+
+        # Поисковый документ содержит телефон - пересобираем вместе с ним
+        updated = self._backfill(
+            Order.objects.select_related('address__city').only(
+                'id', 'client_name', 'phone', 'phone_normalized', 'search_document',
+                'address__street', 'address__house', 'address__city__name'
+            ),
+            batch_size,
+            ['phone_normalized', 'search_document']
+        )
+        self.stdout.write(f'Заявки: обновлено {updated} записей')
+        if updated:
+            bump_version_on_commit('orders')
+
+        # Заявки, которые не совпадали с ЧС из-за формата номера
+        flagged = self._flag_blacklisted(batch_size)
+        if flagged:
+            bump_version_on_commit('orders')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Готово, помечено заявок из черного списка: {flagged}')
+        )
+
+    def _flag_blacklisted(self, batch_size):
+        """
+        Пометка заявок клиентов из черного списка порциями по диапазонам
+        первичного ключа: каждая порция - один короткий UPDATE.
+        """
+        in_blacklist = Exists(Blacklist.objects.filter(
+            phone_normalized=OuterRef('phone_normalized'),
+            client_name=OuterRef('client_name')
+        ))
+        flagged = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Order.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return flagged
+
+            flagged += Order.objects.filter(
+                id__gt=last_id,
+                id__lte=ids[-1],
+                is_blacklisted=False
+            ).filter(in_blacklist).update(is_blacklisted=True, updated_at=timezone.now())
+            last_id = ids[-1]
+
+    def _backfill(self, queryset, batch_size, fields):
+        """
+        Проход по таблице порциями по первичному ключу (keyset):
+        каждая порция - один SELECT и один UPDATE, без OFFSET и долгих блокировок.
+        """
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not batch:
+                return updated
+
+            changed = []
+            for obj in batch:
+                before = [getattr(obj, field) for field in fields]
+                obj.phone_normalized = normalize_phone(obj.phone)
+                if 'search_document' in fields:
+                    obj.search_document = obj.build_search_document()
+                if [getattr(obj, field) for field in fields] != before:
+                    changed.append(obj)
+
+            if changed:
+                queryset.model.objects.bulk_update(changed, fields)
+                updated += len(changed)
+            last_id = batch[-1].id
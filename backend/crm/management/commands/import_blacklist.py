@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from crm.services.blacklist_service import BlacklistService
+
+class Command(BaseCommand):
+    help = 'Импорт черного списка из CSV (колонки client_name, phone, reason)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к CSV-файлу')
+        parser.add_argument(
+            '--reason',
+            default='',
+            help='Причина блокировки для строк без колонки reason'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=BlacklistService.IMPORT_CHUNK_SIZE,
+            help='Количество строк, записываемых за одну транзакцию'
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='Кодировка файла'
+        )
+
+    def handle(self, *args, **options):
+        def progress(stats):
+            self.stdout.write(
+                f"Прочитано строк: {stats['rows']}, записано: {stats['imported']}, "
+                f"ошибок: {stats['error_count']}"
+            )
+
+        try:
+            with open(options['path'], encoding=options['encoding'], newline='') as stream:
+                stats = BlacklistService().import_csv(
+                    stream,
+                    default_reason=options['reason'],
+                    chunk_size=options['chunk_size'],
+                    progress=progress
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Ошибка импорта: {e}')
+
+        for error in stats['errors']:
+            self.stdout.write(self.style.WARNING(f"Строка {error['line']}: {error['errors']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Импорт завершен: записей {stats['imported']}, "
+            f"помечено заявок {stats['flagged_orders']}, строк с ошибками {stats['error_count']}"
+        ))
@@ -0,0 +1,31 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from crm.services.order_stats_service import OrderStatsService
+
+class Command(BaseCommand):
+    help = 'Пересборка суточного среза заявок для отчетов (первичное заполнение и исправление)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date-from',
+            type=date.fromisoformat,
+            help='Первый день (ГГГГ-ММ-ДД), по умолчанию - день самой старой заявки'
+        )
+        parser.add_argument(
+            '--date-to',
+            type=date.fromisoformat,
+            help='Последний день включительно, по умолчанию - день самой новой заявки'
+        )
+
+    def handle(self, *args, **options):
+        date_from, date_to = options['date_from'], options['date_to']
+        if date_from and date_to and date_from > date_to:
+            raise CommandError('--date-from позже --date-to')
+
+        days = OrderStatsService.rebuild(
+            date_from,
+            date_to,
+            progress=lambda day: self.stdout.write(f'Пересобран {day}') if options['verbosity'] > 1 else None
+        )
+
+        self.stdout.write(self.style.SUCCESS(f'Готово, пересобрано дней: {days}'))
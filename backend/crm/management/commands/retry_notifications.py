@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from crm.services.notification_service import NotificationService
+
+class Command(BaseCommand):
+    help = 'Повторная отправка неудачных уведомлений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=NotificationService.DISPATCH_BATCH_SIZE,
+            help='Количество уведомлений, отправляемых за одну транзакцию'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=0,
+            help='Ограничение числа пакетов (0 - до опустошения очереди)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        processed = batches = 0
+
+        while not options['max_batches'] or batches < options['max_batches']:
+            count = NotificationService.retry_failed(batch_size)
+            processed += count
+            batches += 1
+            if count < batch_size:
+                break
+
+        self.stdout.write(f'Обработано уведомлений: {processed}')
+        self.stdout.write(self.style.SUCCESS('Готово'))
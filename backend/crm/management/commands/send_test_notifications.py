@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand
 from crm.services.notification_service import NotificationService
-from crm.models import User, Order
+from crm.models import User, Order, NotificationLog
 
 class Command(BaseCommand):
     help = 'Отправка тестовых уведомлений менеджерам'
@@ -44,8 +44,13 @@ class Command(BaseCommand):
             comment="Тестовая заявка для проверки уведомлений"
         )
         
-        # Отправляем уведомление
-        success = NotificationService.send_assignment_notification(test_order)
+        # Ставим уведомление в outbox и сразу разбираем очередь
+        notifications = NotificationService.queue_assignment_notification(test_order)
+        NotificationService.dispatch_pending()
+        success = bool(notifications) and NotificationLog.objects.filter(
+            id__in=[notification.id for notification in notifications],
+            status=NotificationLog.STATUS_SENT
+        ).exists()
         
         if success:
             self.stdout.write(
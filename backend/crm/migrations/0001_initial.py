@@ -0,0 +1,162 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:32
+
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Название')),
+                ('fias_id', models.CharField(blank=True, max_length=36, null=True, verbose_name='ФИАС ID')),
+            ],
+            options={
+                'verbose_name': 'Город',
+                'verbose_name_plural': 'Города',
+            },
+        ),
+        migrations.CreateModel(
+            name='Role',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(choices=[('operator', 'Оператор'), ('coordinator', 'Координатор'), ('manager', 'Менеджер'), ('admin', 'Администратор')], max_length=20, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('telegram_chat_id', models.CharField(blank=True, max_length=50, null=True, verbose_name='ID чата Telegram')),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+                ('role', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='crm.role', verbose_name='Роль')),
+            ],
+            options={
+                'verbose_name': 'Пользователь',
+                'verbose_name_plural': 'Пользователи',
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Address',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('street', models.CharField(max_length=100, verbose_name='Улица')),
+                ('house', models.CharField(max_length=10, verbose_name='Дом')),
+                ('building', models.CharField(blank=True, max_length=10, verbose_name='Корпус')),
+                ('apartment', models.CharField(blank=True, max_length=10, verbose_name='Квартира')),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='crm.city', verbose_name='Город')),
+            ],
+            options={
+                'verbose_name': 'Адрес',
+                'verbose_name_plural': 'Адреса',
+                'unique_together': {('city', 'street', 'house', 'building', 'apartment')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ManagerStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('free', 'Свободен'), ('busy', 'На заявке'), ('dayoff', 'Выходной'), ('training', 'Обучение'), ('paired', 'В паре')], default='free', max_length=20)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(limit_choices_to={'role__name': 'manager'}, on_delete=django.db.models.deletion.CASCADE, related_name='managerstatus', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Статус менеджера',
+                'verbose_name_plural': 'Статусы менеджеров',
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_name', models.CharField(max_length=100, verbose_name='ФИО клиента')),
+                ('phone', models.CharField(max_length=20, verbose_name='Телефон')),
+                ('comment', models.TextField(blank=True, verbose_name='Комментарий')),
+                ('status', models.CharField(choices=[('unassigned', 'Не назначена'), ('assigned', 'Назначена'), ('in_progress', 'В работе'), ('completed', 'Исполнена'), ('rejected', 'Отказ')], default='unassigned', max_length=20, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('is_blacklisted', models.BooleanField(default=False, verbose_name='Черный список')),
+                ('address', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='crm.address', verbose_name='Адрес')),
+                ('assigned_to', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to=settings.AUTH_USER_MODEL, verbose_name='Назначенный менеджер')),
+            ],
+            options={
+                'verbose_name': 'Заявка',
+                'verbose_name_plural': 'Заявки',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_type', models.CharField(choices=[('new', 'Новая заявка'), ('assigned', 'Назначение'), ('canceled', 'Отмена заявки'), ('completed', 'Завершение')], max_length=20, verbose_name='Тип уведомления')),
+                ('message_text', models.TextField(verbose_name='Текст сообщения')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата отправки')),
+                ('is_sent', models.BooleanField(default=False, verbose_name='Отправлено')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Получатель')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='crm.order', verbose_name='Заявка')),
+            ],
+            options={
+                'verbose_name': 'Лог уведомлений',
+                'verbose_name_plural': 'Логи уведомлений',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('unassigned', 'Не назначена'), ('assigned', 'Назначена'), ('in_progress', 'В работе'), ('completed', 'Исполнена'), ('rejected', 'Отказ')], max_length=20)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('comment', models.TextField(blank=True)),
+                ('changed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='crm.order')),
+            ],
+            options={
+                'verbose_name': 'История статуса',
+                'verbose_name_plural': 'История статусов',
+            },
+        ),
+        migrations.CreateModel(
+            name='Blacklist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_name', models.CharField(max_length=100, verbose_name='ФИО клиента')),
+                ('phone', models.CharField(max_length=20, verbose_name='Телефон')),
+                ('reason', models.TextField(verbose_name='Причина блокировки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата добавления')),
+                ('related_orders', models.ManyToManyField(blank=True, to='crm.order', verbose_name='Связанные заявки')),
+            ],
+            options={
+                'verbose_name': 'Запись черного списка',
+                'verbose_name_plural': 'Черный список клиентов',
+                'unique_together': {('client_name', 'phone')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:32
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся без блокировки записи в большие таблицы
+    atomic = False
+
+    dependencies = [
+        ('crm', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notificationlog',
+            index=models.Index(fields=['-created_at', '-id'], name='notification_created_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='blacklist',
+            index=models.Index(fields=['-created_at', '-id'], name='blacklist_created_id_idx'),
+        ),
+    ]
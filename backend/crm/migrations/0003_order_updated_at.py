@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        # Существующие заявки получают время миграции: значение по умолчанию -
+        # константа, поэтому PostgreSQL добавляет столбец без перезаписи таблицы
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Дата изменения'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:32
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся без блокировки записи в большие таблицы
+    atomic = False
+
+    dependencies = [
+        ('crm', '0003_order_updated_at'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ['unassigned', 'assigned', 'in_progress'])), fields=['-created_at'], name='order_open_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['assigned_to', 'status'], name='order_manager_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['client_name', 'phone'], name='order_client_phone_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='statushistory',
+            index=models.Index(fields=['order', 'changed_at'], name='status_history_order_idx'),
+        ),
+    ]
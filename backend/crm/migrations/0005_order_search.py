@@ -0,0 +1,63 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:33
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models, transaction
+
+# Заполнение документа для существующих заявок (см. Order.build_search_document)
+# порциями по первичному ключу: каждая порция - отдельная короткая транзакция
+BACKFILL_SEARCH_DOCUMENT = r"""
+UPDATE crm_order AS o
+SET search_document = lower(concat_ws(
+    ' ', o.client_name, regexp_replace(o.phone, '\D', '', 'g'), c.name, a.street, a.house
+))
+FROM crm_address AS a
+JOIN crm_city AS c ON c.id = a.city_id
+WHERE a.id = o.address_id AND o.id > %s AND o.id <= %s
+"""
+# Верхняя граница id следующей порции
+BACKFILL_BATCH_BOUND = """
+SELECT max(id) FROM (SELECT id FROM crm_order WHERE id > %s ORDER BY id LIMIT %s) AS batch
+"""
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill_search_document(apps, schema_editor):
+    connection = schema_editor.connection
+    last_id = 0
+    while True:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(BACKFILL_BATCH_BOUND, [last_id, BACKFILL_BATCH_SIZE])
+            upper = cursor.fetchone()[0]
+            if upper is None:
+                return
+            cursor.execute(BACKFILL_SEARCH_DOCUMENT, [last_id, upper])
+        last_id = upper
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся без блокировки записи в большие таблицы
+    atomic = False
+
+    dependencies = [
+        ('crm', '0004_order_access_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='order',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='Поисковый документ'),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop, atomic=False),
+        AddIndexConcurrently(
+            model_name='order',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('search_document', config='russian'), name='order_search_vector_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='order_search_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
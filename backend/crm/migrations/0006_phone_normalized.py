@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:37
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся без блокировки записи; существующие строки
+    # заполняются отдельно командой backfill_phone_normalized порциями
+    atomic = False
+
+    dependencies = [
+        ('crm', '0005_order_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blacklist',
+            name='phone_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20, verbose_name='Телефон (нормализованный)'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='phone_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20, verbose_name='Телефон (нормализованный)'),
+        ),
+        AddIndexConcurrently(
+            model_name='blacklist',
+            index=models.Index(fields=['phone_normalized', 'client_name'], name='blacklist_phone_client_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['phone_normalized', 'client_name'], name='order_phone_client_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='order',
+            name='order_client_phone_idx',
+        ),
+    ]
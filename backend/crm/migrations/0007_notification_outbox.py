@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:42
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индекс очереди строится без блокировки записи в лог
+    atomic = False
+
+    dependencies = [
+        ('crm', '0006_phone_normalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationlog',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки'),
+        ),
+        migrations.AddField(
+            model_name='notificationlog',
+            name='sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата отправки'),
+        ),
+        migrations.AddField(
+            model_name='notificationlog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает отправки'), ('sent', 'Отправлено'), ('failed', 'Ошибка отправки')], default='pending', max_length=20, verbose_name='Статус отправки'),
+        ),
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата создания'),
+        ),
+        # Старые записи уже обработаны прежним синхронным кодом:
+        # диспетчер не должен отправлять их повторно
+        migrations.RunSQL(
+            sql="""
+                UPDATE crm_notificationlog
+                SET status = CASE WHEN is_sent THEN 'sent' ELSE 'failed' END,
+                    attempts = 1,
+                    sent_at = CASE WHEN is_sent THEN created_at END
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        AddIndexConcurrently(
+            model_name='notificationlog',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at', 'id'], name='notification_pending_idx'),
+        ),
+    ]
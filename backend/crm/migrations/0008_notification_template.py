@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0007_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('assignment', 'Назначение заявки'), ('status_change', 'Изменение статуса'), ('completion', 'Завершение заявки'), ('cancellation', 'Отмена заявки')], max_length=20, verbose_name='Тип')),
+                ('content', models.TextField(verbose_name='Текст шаблона')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активен')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Шаблон уведомления',
+                'verbose_name_plural': 'Шаблоны уведомлений',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('type',), name='notification_template_active_type_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:56
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Составные индексы лога строятся без блокировки записи
+    atomic = False
+
+    dependencies = [
+        ('crm', '0008_notification_template'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationLogArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField(verbose_name='ID заявки')),
+                ('recipient_id', models.BigIntegerField(verbose_name='ID получателя')),
+                ('message_type', models.CharField(choices=[('new', 'Новая заявка'), ('assigned', 'Назначение'), ('canceled', 'Отмена заявки'), ('completed', 'Завершение')], max_length=20, verbose_name='Тип уведомления')),
+                ('message_text', models.TextField(verbose_name='Текст сообщения')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает отправки'), ('sent', 'Отправлено'), ('failed', 'Ошибка отправки')], max_length=20, verbose_name='Статус отправки')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата отправки')),
+            ],
+            options={
+                'verbose_name': 'Архив уведомлений',
+                'verbose_name_plural': 'Архив уведомлений',
+                'ordering': ['-created_at'],
+            },
+        ),
+        AddIndexConcurrently(
+            model_name='notificationlog',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='notification_recipient_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notificationlog',
+            index=models.Index(fields=['order', '-created_at'], name='notification_order_idx'),
+        ),
+        # Одиночные индексы FK удаляются после построения составных
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='order',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='crm.order', verbose_name='Заявка'),
+        ),
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='recipient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Получатель'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationlogarchive',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='notification_archive_brin'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationlogarchive',
+            index=models.Index(fields=['recipient_id', 'created_at'], name='notification_archive_recip_idx'),
+        ),
+    ]
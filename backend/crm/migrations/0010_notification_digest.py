@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0009_notification_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationlog',
+            name='digest_key',
+            field=models.UUIDField(blank=True, null=True, verbose_name='Сводка'),
+        ),
+        migrations.AddField(
+            model_name='notificationlogarchive',
+            name='digest_key',
+            field=models.UUIDField(blank=True, null=True, verbose_name='Сводка'),
+        ),
+        migrations.AlterField(
+            model_name='notificationtemplate',
+            name='type',
+            field=models.CharField(choices=[('assignment', 'Назначение заявки'), ('status_change', 'Изменение статуса'), ('completion', 'Завершение заявки'), ('cancellation', 'Отмена заявки'), ('digest', 'Сводка уведомлений')], max_length=20, verbose_name='Тип'),
+        ),
+    ]
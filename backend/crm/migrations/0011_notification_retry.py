@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:02
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индекс очереди повторов строится без блокировки записи в лог
+    atomic = False
+
+    dependencies = [
+        ('crm', '0010_notification_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationlog',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Следующая попытка'),
+        ),
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает отправки'), ('sent', 'Отправлено'), ('failed', 'Ошибка, ожидает повтора'), ('dead', 'Не доставлено')], default='pending', max_length=20, verbose_name='Статус отправки'),
+        ),
+        migrations.AlterField(
+            model_name='notificationlogarchive',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает отправки'), ('sent', 'Отправлено'), ('failed', 'Ошибка, ожидает повтора'), ('dead', 'Не доставлено')], max_length=20, verbose_name='Статус отправки'),
+        ),
+        # Накопленные неудачные записи ставятся в очередь повторов
+        # с разбросом в течение часа, чтобы не отправлять их одной волной
+        migrations.RunSQL(
+            sql="""
+                UPDATE crm_notificationlog
+                SET next_attempt_at = now() + random() * interval '1 hour'
+                WHERE status = 'failed'
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        AddIndexConcurrently(
+            model_name='notificationlog',
+            index=models.Index(condition=models.Q(('status', 'failed')), fields=['next_attempt_at', 'id'], name='notification_retry_idx'),
+        ),
+    ]
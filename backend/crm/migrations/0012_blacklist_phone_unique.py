@@ -0,0 +1,63 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:07
+
+from django.db import migrations, models
+from crm.utils.phone import normalize_phone
+
+
+def normalize_blacklist_phones(apps, schema_editor):
+    # Записи, не обработанные backfill_phone_normalized, иначе
+    # совпадут между собой по пустому номеру при удалении дублей
+    Blacklist = apps.get_model('crm', 'Blacklist')
+    entries = list(Blacklist.objects.filter(phone_normalized='').only('id', 'phone'))
+    for entry in entries:
+        entry.phone_normalized = normalize_phone(entry.phone)
+    Blacklist.objects.bulk_update(entries, ['phone_normalized'], batch_size=1000)
+
+
+# Дубли по (phone_normalized, client_name) - один клиент с номером в разных
+# форматах: связанные заявки переносятся на запись с меньшим ID, остальные удаляются
+MERGE_DUPLICATES_SQL = """
+    CREATE TEMPORARY TABLE blacklist_duplicates ON COMMIT DROP AS
+    SELECT id, keep_id FROM (
+        SELECT id, min(id) OVER (PARTITION BY phone_normalized, client_name) AS keep_id
+        FROM crm_blacklist
+    ) ranked
+    WHERE id <> keep_id;
+
+    INSERT INTO crm_blacklist_related_orders (blacklist_id, order_id)
+    SELECT d.keep_id, m.order_id
+    FROM crm_blacklist_related_orders m
+    JOIN blacklist_duplicates d ON d.id = m.blacklist_id
+    ON CONFLICT DO NOTHING;
+
+    DELETE FROM crm_blacklist_related_orders
+    WHERE blacklist_id IN (SELECT id FROM blacklist_duplicates);
+
+    DELETE FROM crm_blacklist
+    WHERE id IN (SELECT id FROM blacklist_duplicates);
+
+    -- Отложенные проверки FK выполняются сейчас: иначе ALTER TABLE
+    -- в той же транзакции откажет из-за ожидающих триггеров
+    SET CONSTRAINTS ALL IMMEDIATE;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0011_notification_retry'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_blacklist_phones, migrations.RunPython.noop),
+        migrations.RunSQL(MERGE_DUPLICATES_SQL, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='blacklist',
+            constraint=models.UniqueConstraint(fields=('phone_normalized', 'client_name'), name='blacklist_phone_client_uniq'),
+        ),
+        # Уникальный индекс ограничения заменяет прежний индекс проверки
+        migrations.RemoveIndex(
+            model_name='blacklist',
+            name='blacklist_phone_client_idx',
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:10
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Триграммные индексы строятся без блокировки записи
+    atomic = False
+
+    dependencies = [
+        ('crm', '0012_blacklist_phone_unique'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='blacklist',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('client_name'), name='gin_trgm_ops'), name='blacklist_name_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='blacklist',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['phone_normalized'], name='blacklist_phone_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
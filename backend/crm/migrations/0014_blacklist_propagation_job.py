@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:13
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индекс заявок перестраивается без блокировки записи
+    atomic = False
+
+    dependencies = [
+        ('crm', '0013_blacklist_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlacklistPropagationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('block', 'Блокировка'), ('unblock', 'Разблокировка')], max_length=10, verbose_name='Действие')),
+                ('client_name', models.CharField(max_length=100, verbose_name='ФИО клиента')),
+                ('phone_normalized', models.CharField(max_length=20, verbose_name='Телефон (нормализованный)')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершено')], default='pending', max_length=10, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Заявок клиента')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано заявок')),
+                ('updated', models.PositiveIntegerField(default=0, verbose_name='Изменено заявок')),
+                ('last_order_id', models.PositiveBigIntegerField(default=0, verbose_name='Последняя обработанная заявка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+            ],
+            options={
+                'verbose_name': 'Задание распространения ЧС',
+                'verbose_name_plural': 'Задания распространения ЧС',
+            },
+        ),
+        # Новый индекс строится до удаления старого: поиск заявок
+        # клиента все время обслуживается одним из них
+        AddIndexConcurrently(
+            model_name='order',
+            index=models.Index(fields=['phone_normalized', 'client_name', 'id'], name='order_client_id_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='order',
+            name='order_phone_client_idx',
+        ),
+        migrations.AddIndex(
+            model_name='blacklistpropagationjob',
+            index=models.Index(condition=models.Q(('status', 'done'), _negated=True), fields=['updated_at'], name='blacklist_job_active_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0014_blacklist_propagation_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День создания')),
+                ('status', models.CharField(choices=[('unassigned', 'Не назначена'), ('assigned', 'Назначена'), ('in_progress', 'В работе'), ('completed', 'Исполнена'), ('rejected', 'Отказ')], max_length=20, verbose_name='Статус')),
+                ('count', models.IntegerField(default=0, verbose_name='Заявок')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+                ('city', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='crm.city', verbose_name='Город')),
+                ('manager', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Менеджер')),
+            ],
+            options={
+                'verbose_name': 'Суточная статистика заявок',
+                'verbose_name_plural': 'Суточная статистика заявок',
+                'constraints': [models.UniqueConstraint(fields=('day', 'city', 'manager', 'status'), name='order_daily_stats_key', nulls_distinct=False)],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:46
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индекс очереди повторов заменяется без блокировки записи:
+    # новый строится до удаления старого
+    atomic = False
+
+    dependencies = [
+        ('crm', '0015_order_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает отправки'), ('sending', 'Отправляется'), ('sent', 'Отправлено'), ('failed', 'Ошибка, ожидает повтора'), ('dead', 'Не доставлено')], default='pending', max_length=20, verbose_name='Статус отправки'),
+        ),
+        migrations.AlterField(
+            model_name='notificationlogarchive',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает отправки'), ('sending', 'Отправляется'), ('sent', 'Отправлено'), ('failed', 'Ошибка, ожидает повтора'), ('dead', 'Не доставлено')], max_length=20, verbose_name='Статус отправки'),
+        ),
+        AddIndexConcurrently(
+            model_name='notificationlog',
+            index=models.Index(condition=models.Q(('status__in', ['failed', 'sending'])), fields=['next_attempt_at', 'id'], name='notification_requeue_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='notificationlog',
+            name='notification_retry_idx',
+        ),
+    ]
@@ -1,15 +1,15 @@
 # Импорт всех моделей для удобного доступа из других модулей
 from .user import User, Role, ManagerStatus
-from .order import Order, StatusHistory
+from .order import Order, StatusHistory, OrderDailyStats
 from .location import City, Address
-from .blacklist import Blacklist
-from .notification import NotificationLog
+from .blacklist import Blacklist, BlacklistPropagationJob
+from .notification import NotificationLog, NotificationLogArchive, NotificationTemplate
 
 # Делаем модели доступными при импорте из models
 __all__ = [
     'User', 'Role', 'ManagerStatus',
-    'Order', 'StatusHistory',
+    'Order', 'StatusHistory', 'OrderDailyStats',
     'City', 'Address',
-    'Blacklist',
-    'NotificationLog'
+    'Blacklist', 'BlacklistPropagationJob',
+    'NotificationLog', 'NotificationLogArchive', 'NotificationTemplate'
 ]
\ No newline at end of file
@@ -1,5 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Lower
 from .order import Order
+from ..utils.phone import normalize_phone
 
 class Blacklist(models.Model):
     """
@@ -14,6 +17,14 @@ class Blacklist(models.Model):
         max_length=20,
         verbose_name="Телефон"
     )
+    # Телефон в канонической форме: совпадение не зависит от формата ввода
+    phone_normalized = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name="Телефон (нормализованный)"
+    )
     reason = models.TextField(
         verbose_name="Причина блокировки"
     )
@@ -31,6 +42,78 @@ class Blacklist(models.Model):
         verbose_name = "Запись черного списка"
         verbose_name_plural = "Черный список клиентов"
         unique_together = [['client_name', 'phone']]
+        indexes = [
+            # Keyset-пагинация черного списка по (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='blacklist_created_id_idx'),
+            # Поиск ?q= по подстроке ФИО и цифрам телефона (pg_trgm)
+            GinIndex(OpClass(Lower('client_name'), name='gin_trgm_ops'), name='blacklist_name_trgm_idx'),
+            GinIndex(fields=['phone_normalized'], opclasses=['gin_trgm_ops'], name='blacklist_phone_trgm_idx'),
+        ]
+        constraints = [
+            # Одна запись на клиента и номер в любом формате; служит и индексом
+            # проверки клиента при создании заявки, и ключом пакетного upsert
+            models.UniqueConstraint(fields=['phone_normalized', 'client_name'], name='blacklist_phone_client_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_name} ({self.phone})"
+
+    def save(self, *args, **kwargs):
+        self.phone_normalized = normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'phone_normalized'}
+        super().save(*args, **kwargs)
+
+class BlacklistPropagationJob(models.Model):
+    """
+    Фоновое распространение флага is_blacklisted на заявки клиента
+    после блокировки или разблокировки. Заявки обрабатываются пакетами
+    по возрастанию ID, курсор last_order_id сохраняется после каждого
+    пакета: прерванное задание продолжается с места остановки.
+    """
+    ACTION_BLOCK = 'block'
+    ACTION_UNBLOCK = 'unblock'
+
+    ACTION_CHOICES = [
+        (ACTION_BLOCK, 'Блокировка'),
+        (ACTION_UNBLOCK, 'Разблокировка'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Завершено'),
+    ]
+
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name='Действие')
+    # Ключ клиента, а не ссылка на запись: при разблокировке запись удаляется
+    client_name = models.CharField(max_length=100, verbose_name='ФИО клиента')
+    phone_normalized = models.CharField(max_length=20, verbose_name='Телефон (нормализованный)')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='Статус')
+    total = models.PositiveIntegerField(null=True, blank=True, verbose_name='Заявок клиента')
+    processed = models.PositiveIntegerField(default=0, verbose_name='Обработано заявок')
+    updated = models.PositiveIntegerField(default=0, verbose_name='Изменено заявок')
+    last_order_id = models.PositiveBigIntegerField(default=0, verbose_name='Последняя обработанная заявка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершено')
+
+    class Meta:
+        verbose_name = 'Задание распространения ЧС'
+        verbose_name_plural = 'Задания распространения ЧС'
+        indexes = [
+            # Незавершенные задания для периодического перезапуска
+            models.Index(
+                fields=['updated_at'],
+                condition=~models.Q(status='done'),
+                name='blacklist_job_active_idx'
+            ),
+        ]
 
     def __str__(self):
-        return f"{self.client_name} ({self.phone})"
\ No newline at end of file
+        return f"{self.get_action_display()} {self.client_name} ({self.get_status_display()})"
@@ -1,11 +1,14 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
 from .user import User
 from .order import Order
 
 class NotificationLog(models.Model):
     """
-    Лог уведомлений, отправленных через Telegram.
-    Позволяет отслеживать историю уведомлений.
+    Лог уведомлений, отправляемых через Telegram.
+    Работает как outbox: запись создается в одной транзакции с изменением
+    заявки (status=pending), отправку выполняет диспетчер
+    (NotificationService.dispatch_pending).
     """
     NOTIFICATION_NEW = 'new'
     NOTIFICATION_ASSIGNED = 'assigned'
@@ -19,16 +22,45 @@ class NotificationLog(models.Model):
         (NOTIFICATION_COMPLETED, 'Завершение'),
     ]
     
-    order = models.ForeignKey(Order, on_delete=models.CASCADE, verbose_name='Заявка')
-    recipient = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Получатель')
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_DEAD = 'dead'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Ожидает отправки'),
+        (STATUS_SENDING, 'Отправляется'),
+        (STATUS_SENT, 'Отправлено'),
+        (STATUS_FAILED, 'Ошибка, ожидает повтора'),
+        (STATUS_DEAD, 'Не доставлено'),
+    ]
+    
+    # Одиночные индексы FK не нужны: их покрывают составные индексы ниже
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, db_index=False, verbose_name='Заявка')
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False, verbose_name='Получатель')
     message_type = models.CharField(
         max_length=20, 
         choices=NOTIFICATION_TYPES,
         verbose_name='Тип уведомления'
     )
     message_text = models.TextField(verbose_name='Текст сообщения')
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата отправки')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name='Статус отправки'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки')
+    next_attempt_at = models.DateTimeField(null=True, blank=True, verbose_name='Следующая попытка')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата отправки')
     is_sent = models.BooleanField(default=False, verbose_name='Отправлено')
+    # Общий ключ записей, отправленных одной сводкой (NOTIFICATION_DIGEST_WINDOW)
+    digest_key = models.UUIDField(null=True, blank=True, verbose_name='Сводка')
+    
+    # Типы, которые объединяются в сводку для получателя
+    DIGEST_TYPES = (NOTIFICATION_COMPLETED, NOTIFICATION_CANCELED)
     
     def __str__(self):
         return f"{self.get_message_type_display()} для {self.recipient}"
@@ -36,4 +68,103 @@ class NotificationLog(models.Model):
     class Meta:
         verbose_name = 'Лог уведомлений'
         verbose_name_plural = 'Логи уведомлений'
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # Keyset-пагинация лога по (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='notification_created_id_idx'),
+            # Очередь диспетчера: только неотправленные записи
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='notification_pending_idx'
+            ),
+            # Очередь повторов: неудачные записи по времени попытки
+            # и захваченные диспетчером по окончанию аренды
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status__in=['failed', 'sending']),
+                name='notification_requeue_idx'
+            ),
+            # Лента уведомлений пользователя (API) и заявки (админка)
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notification_recipient_idx'),
+            models.Index(fields=['order', '-created_at'], name='notification_order_idx'),
+        ]
+
+class NotificationLogArchive(models.Model):
+    """
+    Архив уведомлений старше срока хранения (NOTIFICATION_RETENTION_DAYS).
+    Записи переносятся из NotificationLog пакетами с сохранением ID
+    (NotificationService.archive_old). Внешних ключей нет: архив не зависит
+    от удаления заявок и пользователей и не замедляет их удаление.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name='ID')
+    order_id = models.BigIntegerField(verbose_name='ID заявки')
+    recipient_id = models.BigIntegerField(verbose_name='ID получателя')
+    message_type = models.CharField(
+        max_length=20,
+        choices=NotificationLog.NOTIFICATION_TYPES,
+        verbose_name='Тип уведомления'
+    )
+    message_text = models.TextField(verbose_name='Текст сообщения')
+    status = models.CharField(
+        max_length=20,
+        choices=NotificationLog.STATUS_CHOICES,
+        verbose_name='Статус отправки'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки')
+    created_at = models.DateTimeField(verbose_name='Дата создания')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата отправки')
+    digest_key = models.UUIDField(null=True, blank=True, verbose_name='Сводка')
+    
+    def __str__(self):
+        return f"{self.get_message_type_display()} для #{self.recipient_id}"
+    
+    class Meta:
+        verbose_name = 'Архив уведомлений'
+        verbose_name_plural = 'Архив уведомлений'
+        ordering = ['-created_at']
+        indexes = [
+            # Архив пополняется по возрастанию created_at: BRIN в сотни раз
+            # меньше B-tree и достаточен для выборок и очистки по диапазону дат
+            BrinIndex(fields=['created_at'], name='notification_archive_brin'),
+            models.Index(fields=['recipient_id', 'created_at'], name='notification_archive_recip_idx'),
+        ]
+
+class NotificationTemplate(models.Model):
+    """
+    Редактируемый шаблон текста уведомления (синтаксис шаблонов Django).
+    Если активного шаблона нет, используется файл notifications/<type>.txt.
+    """
+    TYPE_ASSIGNMENT = 'assignment'
+    TYPE_STATUS_CHANGE = 'status_change'
+    TYPE_COMPLETION = 'completion'
+    TYPE_CANCELLATION = 'cancellation'
+    TYPE_DIGEST = 'digest'
+    
+    TYPE_CHOICES = [
+        (TYPE_ASSIGNMENT, 'Назначение заявки'),
+        (TYPE_STATUS_CHANGE, 'Изменение статуса'),
+        (TYPE_COMPLETION, 'Завершение заявки'),
+        (TYPE_CANCELLATION, 'Отмена заявки'),
+        (TYPE_DIGEST, 'Сводка уведомлений'),
+    ]
+    
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES, verbose_name='Тип')
+    content = models.TextField(verbose_name='Текст шаблона')
+    is_active = models.BooleanField(default=True, verbose_name='Активен')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
+    
+    def __str__(self):
+        return self.get_type_display()
+    
+    class Meta:
+        verbose_name = 'Шаблон уведомления'
+        verbose_name_plural = 'Шаблоны уведомлений'
+        constraints = [
+            # Не более одного активного шаблона каждого типа
+            models.UniqueConstraint(
+                fields=['type'],
+                condition=models.Q(is_active=True),
+                name='notification_template_active_type_uniq'
+            ),
+        ]
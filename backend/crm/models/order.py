@@ -1,7 +1,10 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
 from django.utils import timezone
 from .user import User
-from .location import Address
+from .location import Address, City
+from ..utils.phone import normalize_phone
 
 class Order(models.Model):
     """
@@ -26,6 +29,8 @@ class Order(models.Model):
     # Основные поля заявки
     client_name = models.CharField(max_length=100, verbose_name='ФИО клиента')
     phone = models.CharField(max_length=20, verbose_name='Телефон')
+    # Телефон в канонической форме (только цифры) для поиска клиента и черного списка
+    phone_normalized = models.CharField(max_length=20, blank=True, default='', editable=False, verbose_name='Телефон (нормализованный)')
     address = models.ForeignKey(Address, on_delete=models.PROTECT, verbose_name='Адрес')
     comment = models.TextField(blank=True, verbose_name='Комментарий')
     status = models.CharField(
@@ -35,6 +40,7 @@ class Order(models.Model):
         verbose_name='Статус'
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
     assigned_to = models.ForeignKey(
         User, 
         null=True, 
@@ -44,15 +50,75 @@ class Order(models.Model):
         verbose_name='Назначенный менеджер'
     )
     is_blacklisted = models.BooleanField(default=False, verbose_name='Черный список')
+    # Денормализованный поисковый документ (клиент, телефон, адрес)
+    search_document = models.TextField(blank=True, editable=False, verbose_name='Поисковый документ')
+    
+    # Поля, от которых зависит поисковый документ
+    SEARCH_SOURCE_FIELDS = {'client_name', 'phone', 'address'}
     
     # Методы модели
     def __str__(self):
         return f"Заявка #{self.id} - {self.client_name}"
     
+    def build_search_document(self):
+        """
+        Собирает поисковый документ: ФИО, цифры телефона, город, улица, дом.
+        Хранится в нижнем регистре, чтобы LIKE-поиск использовал триграммный индекс.
+        """
+        address = self.address
+        parts = [
+            self.client_name,
+            self.phone_normalized,
+            address.city.name,
+            address.street,
+            address.house,
+        ]
+        return ' '.join(part for part in parts if part).lower()
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        
+        if update_fields is None:
+            self.phone_normalized = normalize_phone(self.phone)
+            self.search_document = self.build_search_document()
+        elif self.SEARCH_SOURCE_FIELDS & set(update_fields):
+            self.phone_normalized = normalize_phone(self.phone)
+            self.search_document = self.build_search_document()
+            kwargs['update_fields'] = set(update_fields) | {'phone_normalized', 'search_document'}
+        
+        super().save(*args, **kwargs)
+    
     class Meta:
         verbose_name = 'Заявка'
         verbose_name_plural = 'Заявки'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset-пагинация ленты заявок по (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            # Фильтр по статусу с диапазоном дат (списки, отчеты)
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # Открытые заявки - небольшая доля таблицы, частичный индекс
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(status__in=['unassigned', 'assigned', 'in_progress']),
+                name='order_open_created_idx'
+            ),
+            # Заявки менеджера по статусу
+            models.Index(fields=['assigned_to', 'status'], name='order_manager_status_idx'),
+            # Поиск заявок клиента (история клиента); id в ключе дает пакеты
+            # распространения черного списка по диапазону индекса без сортировки
+            models.Index(fields=['phone_normalized', 'client_name', 'id'], name='order_client_id_idx'),
+            # Полнотекстовый и триграммный поиск по заявкам
+            GinIndex(
+                SearchVector('search_document', config='russian'),
+                name='order_search_vector_idx'
+            ),
+            GinIndex(
+                fields=['search_document'],
+                opclasses=['gin_trgm_ops'],
+                name='order_search_trgm_idx'
+            ),
+        ]
 
 class StatusHistory(models.Model):
     """
@@ -70,4 +136,50 @@ class StatusHistory(models.Model):
     
     class Meta:
         verbose_name = 'История статуса'
-        verbose_name_plural = 'История статусов'
\ No newline at end of file
+        verbose_name_plural = 'История статусов'
+        indexes = [
+            # История заявки в хронологическом порядке
+            models.Index(fields=['order', 'changed_at'], name='status_history_order_idx'),
+        ]
+
+class OrderDailyStats(models.Model):
+    """
+    Суточный срез заявок для отчетов: число заявок, созданных в день day
+    (по местному времени), в разрезе города, менеджера и текущего статуса.
+    Поддерживается инкрементально из OrderService (создание, назначение,
+    смена статуса), пересобирается командой rebuild_order_stats.
+    """
+    day = models.DateField(verbose_name='День создания')
+    # Отдельные индексы по городу и менеджеру не нужны:
+    # отчеты выбирают диапазон дней по ключу уникальности
+    city = models.ForeignKey(City, on_delete=models.CASCADE, db_index=False, verbose_name='Город')
+    # Без FK-ограничения: удаление пользователя не должно терять счетчики
+    # (заявки при этом остаются), срез поправит rebuild_order_stats
+    manager = models.ForeignKey(
+        User,
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+',
+        verbose_name='Менеджер'
+    )
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES, verbose_name='Статус')
+    count = models.IntegerField(default=0, verbose_name='Заявок')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'Суточная статистика заявок'
+        verbose_name_plural = 'Суточная статистика заявок'
+        constraints = [
+            # Ключ инкрементального upsert; заявки без менеджера - одна строка
+            models.UniqueConstraint(
+                fields=['day', 'city', 'manager', 'status'],
+                nulls_distinct=False,
+                name='order_daily_stats_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.city_id}/{self.manager_id} {self.status}: {self.count}"
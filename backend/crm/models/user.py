@@ -48,6 +48,10 @@ class User(AbstractUser):
     def is_manager(self):
         return self.role and self.role.name == Role.ROLE_MANAGER
     
+    @property
+    def is_coordinator(self):
+        return self.role and self.role.name == Role.ROLE_COORDINATOR
+    
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
@@ -0,0 +1,163 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from ..models import Blacklist
+from ..utils.bloom import BloomFilter
+from ..utils.versioning import get_version, bump_version
+
+
+class BlacklistFilter:
+    """
+    Фильтр Блума по нормализованным телефонам черного списка в памяти процесса.
+    Большинство клиентов в ЧС не числится: отрицательный ответ фильтра
+    точен и избавляет от запроса к БД, положительный - подтверждается запросом.
+
+    Синхронизация между процессами: каждое добавление увеличивает версию
+    'blacklist' и кладет телефоны в журнал кэша под номером этой версии.
+    Процесс, отставший на несколько версий, дочитывает журнал и добавляет
+    телефоны в свой фильтр; при разрыве журнала (вытеснение, сброс кэша)
+    фильтр строится заново. Удаленные из ЧС номера остаются в фильтре
+    до периодической пересборки - это лишь лишние проверки в БД.
+
+    Версия читается из кэша не чаще раза в BLACKLIST_FILTER_CHECK_INTERVAL
+    секунд, а не на каждую проверку. Граница устаревания: телефон,
+    добавленный в ЧС другим процессом, этот процесс начинает находить
+    не позже чем через интервал; свой процесс видит добавления сразу
+    (publish, invalidate). Заявки, принятые другими процессами в этом
+    окне, помечает задание распространения: оно не завершается раньше
+    интервала после создания (BlacklistService.propagate).
+
+    Пересборка из БД идет без общей блокировки: проверки в других потоках
+    продолжают работать по прежнему фильтру, новый подменяется готовым.
+    """
+
+    VERSION_SCOPE = 'blacklist'
+    LOG_KEY = 'crm:blacklist_filter:{}'
+    LOG_TTL = 86400
+    # Отставание больше журнала - быстрее пересобрать фильтр целиком
+    LOG_LIMIT = 1000
+    REBUILD_INTERVAL = 3600
+    ERROR_RATE = 0.001
+    # Запас емкости для добавлений между пересборками
+    GROWTH = 1000
+
+    _filter = None
+    _version = None
+    _built_at = 0.0
+    _checked_at = 0.0
+    # Короткая: защищает подмену фильтра и добавления в него
+    _lock = threading.Lock()
+    # Одна пересборка на процесс
+    _build_lock = threading.Lock()
+
+    @classmethod
+    def might_contain(cls, phone_normalized):
+        """
+        Может ли телефон быть в черном списке.
+
+        Args:
+            phone_normalized (str): Телефон в форме normalize_phone
+
+        Returns:
+            bool: False - точно нет, True - нужна проверка в БД
+        """
+        return phone_normalized in cls._current()
+
+    @classmethod
+    def publish(cls, phones):
+        """
+        Добавление телефонов во все фильтры (вызывается при сохранении записей ЧС).
+
+        Args:
+            phones (iterable[str]): Нормализованные телефоны
+        """
+        phones = [phone for phone in phones if phone]
+        if not phones:
+            return
+        version = bump_version(cls.VERSION_SCOPE)
+        cache.set(cls.LOG_KEY.format(version), phones, cls.LOG_TTL)
+
+        # Свой фильтр - сразу, не дожидаясь следующего обращения
+        with cls._lock:
+            if cls._filter is not None:
+                for phone in phones:
+                    cls._filter.add(phone)
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Пересборка фильтров во всех процессах после массового изменения
+        телефонов в обход save() (bulk_update, update).
+        Версия без записи журнала - разрыв, который читатели не могут дочитать.
+        """
+        bump_version(cls.VERSION_SCOPE)
+        # Свой процесс проверяет версию при следующем обращении
+        cls._checked_at = 0.0
+
+    @classmethod
+    def _current(cls):
+        """Актуальный фильтр: дочитывание журнала или пересборка"""
+        now = time.monotonic()
+        bloom = cls._filter
+        if bloom is not None and now - cls._checked_at < settings.BLACKLIST_FILTER_CHECK_INTERVAL:
+            return bloom
+
+        version = get_version(cls.VERSION_SCOPE)
+        with cls._lock:
+            bloom, known = cls._filter, cls._version
+            fresh = (
+                bloom is not None
+                and now - cls._built_at < cls.REBUILD_INTERVAL
+                and bloom.count <= bloom.capacity
+            )
+            if fresh and known >= version:
+                cls._checked_at = now
+                return bloom
+
+        if fresh and version - known <= cls.LOG_LIMIT:
+            keys = [cls.LOG_KEY.format(v) for v in range(known + 1, version + 1)]
+            entries = cache.get_many(keys)
+            if len(entries) == len(keys):
+                with cls._lock:
+                    for phones in entries.values():
+                        for phone in phones:
+                            bloom.add(phone)
+                    if cls._filter is bloom and cls._version < version:
+                        cls._version = version
+                    cls._checked_at = now
+                return bloom
+
+        return cls._rebuild(version)
+
+    @classmethod
+    def _rebuild(cls, version):
+        """
+        Построение фильтра из БД вне общей блокировки и подмена готовым.
+        Пока другой поток строит фильтр, проверки идут по прежнему
+        (ждут только при первом построении, когда прежнего нет).
+
+        Args:
+            version (int): Версия, прочитанная до загрузки: изменения
+                во время загрузки будут дочитаны из журнала при следующей проверке
+        """
+        started = time.monotonic()
+        if not cls._build_lock.acquire(blocking=cls._filter is None):
+            return cls._filter
+        try:
+            if cls._filter is not None and cls._built_at >= started:
+                # Построен другим потоком, пока этот ждал
+                return cls._filter
+
+            bloom = BloomFilter(Blacklist.objects.count() * 2 + cls.GROWTH, cls.ERROR_RATE)
+            for phone in Blacklist.objects.values_list('phone_normalized', flat=True).iterator(chunk_size=10000):
+                bloom.add(phone)
+
+            with cls._lock:
+                cls._filter, cls._version, cls._built_at = bloom, version, time.monotonic()
+                # Добавления своего процесса во время загрузки попали в прежний
+                # фильтр: следующая проверка сверит версию и дочитает их
+                cls._checked_at = 0.0
+            return bloom
+        finally:
+            cls._build_lock.release()
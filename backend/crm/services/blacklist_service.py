@@ -1,5 +1,17 @@
-from ..models import Blacklist, Order
+import csv
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Value
+from django.db.models.functions import Lower
+from django.utils import timezone
+from ..models import Blacklist, BlacklistPropagationJob, Order
 from ..signals import client_blacklisted, client_unblocked
+from ..utils.phone import normalize_phone
+from ..utils.versioning import bump_version_on_commit
+from .blacklist_filter import BlacklistFilter
+from .validator import PhoneValidator
 
 class BlacklistService:
     """
@@ -7,59 +19,354 @@ class BlacklistService:
     Инкапсулирует основную логику и обработку сигналов.
     """
     
+    # Строк в пакете импорта: один upsert и один UPDATE заявок на пакет
+    IMPORT_CHUNK_SIZE = 1000
+    # Ошибок строк в отчете импорта (остальные только считаются)
+    IMPORT_MAX_ERRORS = 100
+    # Заявок в пакете распространения флага ЧС (одна короткая транзакция)
+    PROPAGATION_CHUNK_SIZE = 500
+    # Задание без продвижения дольше этого срока перезапускается
+    PROPAGATION_STALE_AFTER = timedelta(minutes=1)
+    
+    @staticmethod
+    def search(queryset, query):
+        """
+        Поиск по подстроке ФИО клиента и цифрам телефона.
+        Обслуживается триграммными GIN-индексами по LOWER(client_name)
+        и phone_normalized, поэтому не сканирует таблицу целиком.
+        
+        Args:
+            queryset (QuerySet): Исходный queryset черного списка
+            query (str): Поисковая строка
+            
+        Returns:
+            QuerySet: Отфильтрованный queryset (порядок не меняется)
+        """
+        term = query.strip()
+        digits = normalize_phone(term)
+        
+        # Регистр строки приводится в БД, как и у индекса: иначе
+        # при другой локали Python и PostgreSQL разойдутся на кириллице
+        condition = Q(client_name_lower__contains=Lower(Value(term)))
+        if len(digits) >= 3:
+            condition |= Q(phone_normalized__contains=digits)
+        
+        return queryset.alias(client_name_lower=Lower('client_name')).filter(condition)
+
     def add_to_blacklist(self, client_name, phone, reason, order_id=None):
         """
         Основной метод добавления в черный список.
         1. Создает или обновляет запись в ЧС
-        2. Помечает связанные заявки
-        3. Отправляет сигналы
+        2. Помечает заявку, из которой пришла блокировка
+        3. Ставит задание пометки остальных заявок клиента
+        4. Отправляет сигналы
+        
+        Returns:
+            tuple: (Blacklist - запись, BlacklistPropagationJob - задание)
         """
-        entry, created = Blacklist.objects.update_or_create(
-            client_name=client_name,
-            phone=phone,
-            defaults={'reason': reason}
-        )
+        phone_normalized = normalize_phone(phone)
+        
+        with transaction.atomic():
+            entry, created = Blacklist.objects.update_or_create(
+                client_name=client_name,
+                phone_normalized=phone_normalized,
+                defaults={'reason': reason},
+                create_defaults={'phone': phone, 'reason': reason}
+            )
 
-        # Обновляем связанные заявки
-        if order_id:
-            order = Order.objects.get(id=order_id)
-            entry.related_orders.add(order)
-            order.is_blacklisted = True
-            order.save()
+            # Заявка-источник помечается сразу, остальные - в фоне
+            if order_id:
+                order = Order.objects.get(id=order_id)
+                entry.related_orders.add(order)
+                order.is_blacklisted = True
+                order.save(update_fields=['is_blacklisted', 'updated_at'])
 
-        # Помечаем все заявки этого клиента
-        Order.objects.filter(
-            client_name=client_name,
-            phone=phone
-        ).update(is_blacklisted=True)
+            job = self._start_propagation(BlacklistPropagationJob.ACTION_BLOCK, client_name, phone_normalized)
 
         # Отправка сигнала
         client_blacklisted.send(
             sender=self.__class__,
             entry=entry,
-            order_id=order_id
+            order_id=order_id,
+            job=job
         )
 
-        return entry
+        return entry, job
 
     def remove_from_blacklist(self, entry_id):
         """
-        Удаление из черного списка с очисткой флагов у заявок.
+        Удаление из черного списка. Флаги у заявок клиента
+        снимает фоновое задание.
+        
+        Returns:
+            BlacklistPropagationJob: Задание снятия флагов
         """
-        entry = BlacklistEntry.objects.get(id=entry_id)
-        orders = entry.related_orders.all()
+        with transaction.atomic():
+            entry = Blacklist.objects.get(id=entry_id)
+            job = self._start_propagation(
+                BlacklistPropagationJob.ACTION_UNBLOCK,
+                entry.client_name,
+                entry.phone_normalized
+            )
+            
+            # Отправка сигнала перед удалением
+            client_unblocked.send(
+                sender=self.__class__,
+                entry=entry,
+                job=job
+            )
+            
+            entry.delete()
         
-        # Снимаем флаги
-        Order.objects.filter(
-            client_name=entry.client_name,
-            phone=entry.phone
-        ).update(is_blacklisted=False)
+        return job
+
+    @staticmethod
+    def _start_propagation(action, client_name, phone_normalized):
+        """
+        Создание задания распространения флага и его запуск после коммита.
+        robust=True: если брокер недоступен, задание подберет
+        периодический resume_blacklist_propagation.
+        """
+        from crm.tasks import propagate_blacklist
+        job = BlacklistPropagationJob.objects.create(
+            action=action,
+            client_name=client_name,
+            phone_normalized=phone_normalized
+        )
+        transaction.on_commit(lambda: propagate_blacklist.delay(job.id), robust=True)
+        return job
+
+    @classmethod
+    def propagate(cls, job_id, chunk_size=None):
+        """
+        Выполнение задания: пакеты заявок клиента по возрастанию ID
+        (диапазон индекса order_client_id_idx), каждый пакет - отдельная
+        короткая транзакция. Значение флага на каждом пакете берется из
+        текущего состояния черного списка, а не из действия задания, поэтому
+        повторный запуск, перезапуск после сбоя и встречные задания
+        блокировки и разблокировки одного клиента сходятся к верному результату.
+        Строка задания блокируется на время пакета (SKIP LOCKED): второй
+        воркер того же задания пропускает занятый пакет.
+        Задание блокировки не завершается раньше BLACKLIST_FILTER_CHECK_INTERVAL
+        после создания: заявки, принятые в этом окне процессами с еще
+        не обновленным фильтром (BlacklistFilter), помечает повторный
+        запуск с курсора.
         
-        # Отправка сигнала перед удалением
-        client_unblocked.send(
-            sender=self.__class__,
-            entry=entry,
-            order_ids=list(orders.values_list('id', flat=True))
+        Args:
+            job_id (int): ID задания
+            chunk_size (int): Заявок в пакете (по умолчанию PROPAGATION_CHUNK_SIZE)
+            
+        Returns:
+            BlacklistPropagationJob | None: Задание после последнего пакета,
+            None - задание уже завершено или занято другим воркером
+        """
+        chunk_size = chunk_size or cls.PROPAGATION_CHUNK_SIZE
+        job = None
+        
+        while True:
+            with transaction.atomic():
+                locked = BlacklistPropagationJob.objects.select_for_update(skip_locked=True).filter(
+                    id=job_id
+                ).exclude(status=BlacklistPropagationJob.STATUS_DONE).first()
+                if locked is None:
+                    return job
+                job = locked
+                
+                client_orders = Order.objects.filter(
+                    phone_normalized=job.phone_normalized,
+                    client_name=job.client_name
+                )
+                if job.total is None:
+                    job.total = client_orders.count()
+                
+                blacklisted = Blacklist.objects.filter(
+                    phone_normalized=job.phone_normalized,
+                    client_name=job.client_name
+                ).exists()
+                ids = list(
+                    client_orders.filter(id__gt=job.last_order_id)
+                    .order_by('id')
+                    .values_list('id', flat=True)[:chunk_size]
+                )
+                now = timezone.now()
+                
+                if ids:
+                    job.updated += Order.objects.filter(id__in=ids).exclude(
+                        is_blacklisted=blacklisted
+                    ).update(is_blacklisted=blacklisted, updated_at=now)
+                    # update() минует post_save: ETag ленты заявок сбрасываем явно
+                    bump_version_on_commit('orders')
+                    job.processed += len(ids)
+                    job.last_order_id = ids[-1]
+                
+                settle_until = job.created_at + timedelta(seconds=settings.BLACKLIST_FILTER_CHECK_INTERVAL)
+                if len(ids) < chunk_size and (not blacklisted or now >= settle_until):
+                    job.status = BlacklistPropagationJob.STATUS_DONE
+                    job.finished_at = now
+                else:
+                    job.status = BlacklistPropagationJob.STATUS_RUNNING
+                job.save()
+                
+                settling = len(ids) < chunk_size and job.status != BlacklistPropagationJob.STATUS_DONE
+                if settling:
+                    cls._recheck_later(job.id, (settle_until - now).total_seconds())
+            
+            if job.status == BlacklistPropagationJob.STATUS_DONE or settling:
+                return job
+
+    @staticmethod
+    def _recheck_later(job_id, countdown):
+        """
+        Повторный запуск задания по окончании окна устаревания фильтров.
+        robust=True: если брокер недоступен, задание подберет
+        периодический resume_blacklist_propagation.
+        """
+        from crm.tasks import propagate_blacklist
+        transaction.on_commit(
+            lambda: propagate_blacklist.apply_async((job_id,), countdown=countdown),
+            robust=True
         )
+
+    @classmethod
+    def resume_stale_jobs(cls, stale_after=None):
+        """
+        Перезапуск незавершенных заданий, которые не продвигались дольше
+        stale_after: задача не была поставлена (брокер недоступен) или
+        воркер упал посреди задания. Работа продолжается с курсора.
+        
+        Args:
+            stale_after (timedelta): Порог (по умолчанию PROPAGATION_STALE_AFTER)
+            
+        Returns:
+            int: Количество завершенных заданий
+        """
+        threshold = timezone.now() - (stale_after or cls.PROPAGATION_STALE_AFTER)
+        job_ids = list(
+            BlacklistPropagationJob.objects.exclude(
+                status=BlacklistPropagationJob.STATUS_DONE
+            ).filter(updated_at__lt=threshold).order_by('updated_at').values_list('id', flat=True)
+        )
+        
+        finished = 0
+        for job_id in job_ids:
+            job = cls.propagate(job_id)
+            if job is not None and job.status == BlacklistPropagationJob.STATUS_DONE:
+                finished += 1
+        return finished
+
+    def import_csv(self, stream, default_reason='', chunk_size=None, progress=None):
+        """
+        Потоковый импорт черного списка из CSV с колонками client_name, phone
+        и необязательной reason. Файл читается построчно, в памяти - не больше
+        одного пакета, поэтому расход памяти не зависит от размера файла.
+        Каждый пакет - одна транзакция: upsert записей по
+        (phone_normalized, client_name) и один UPDATE, помечающий заявки
+        клиентов. Сигнал client_blacklisted для импорта не отправляется.
+        Заявки, принятые другими процессами в пределах
+        BLACKLIST_FILTER_CHECK_INTERVAL после пакета, флаг не получают
+        (см. BlacklistFilter): их помечает повторный импорт того же файла.
+        
+        Args:
+            stream: Текстовый поток с CSV (первая строка - заголовок)
+            default_reason (str): Причина для строк без reason
+            chunk_size (int): Размер пакета (по умолчанию IMPORT_CHUNK_SIZE)
+            progress (callable): Вызывается со статистикой после каждого пакета
+            
+        Returns:
+            dict: {
+                'rows': int - прочитано строк,
+                'imported': int - добавлено или обновлено записей,
+                'flagged_orders': int - помечено заявок,
+                'error_count': int - строк с ошибками,
+                'errors': list[dict] - {'line': int, 'errors': dict}, не более IMPORT_MAX_ERRORS
+            }
+            
+        Raises:
+            ValueError: В заголовке нет обязательных колонок
+        """
+        chunk_size = chunk_size or self.IMPORT_CHUNK_SIZE
+        reader = csv.DictReader(stream)
+        missing = {'client_name', 'phone'} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"В файле нет колонок: {', '.join(sorted(missing))}")
+        
+        validator = PhoneValidator()
+        stats = {'rows': 0, 'imported': 0, 'flagged_orders': 0, 'error_count': 0, 'errors': []}
+        # Ключ - ограничение уникальности: повтор клиента в пакете
+        # не должен попасть в один INSERT ... ON CONFLICT дважды
+        chunk = {}
+        
+        for line, row in enumerate(reader, start=2):
+            stats['rows'] += 1
+            client_name = (row.get('client_name') or '').strip()
+            phone = (row.get('phone') or '').strip()
+            reason = (row.get('reason') or '').strip() or default_reason
+            
+            errors = {}
+            if not client_name:
+                errors['client_name'] = ['Укажите ФИО клиента']
+            elif len(client_name) > Blacklist._meta.get_field('client_name').max_length:
+                errors['client_name'] = ['Слишком длинное ФИО']
+            try:
+                phone = validator(phone)
+            except ValidationError as e:
+                errors['phone'] = e.messages
+            if not reason:
+                errors['reason'] = ['Укажите причину блокировки']
+            
+            if errors:
+                stats['error_count'] += 1
+                if len(stats['errors']) < self.IMPORT_MAX_ERRORS:
+                    stats['errors'].append({'line': line, 'errors': errors})
+                continue
+            
+            phone_normalized = normalize_phone(phone)
+            chunk[(phone_normalized, client_name)] = Blacklist(
+                client_name=client_name,
+                phone=phone,
+                phone_normalized=phone_normalized,
+                reason=reason
+            )
+            if len(chunk) >= chunk_size:
+                self._import_chunk(list(chunk.values()), stats)
+                chunk = {}
+                if progress:
+                    progress(stats)
+        
+        if chunk:
+            self._import_chunk(list(chunk.values()), stats)
+            if progress:
+                progress(stats)
+        
+        return stats
+
+    def _import_chunk(self, entries, stats):
+        """
+        Запись пакета импорта: upsert записей и пометка заявок клиентов
+        одним UPDATE по индексу (phone_normalized, client_name).
+        """
+        phones = {entry.phone_normalized for entry in entries}
+        
+        with transaction.atomic():
+            Blacklist.objects.bulk_create(
+                entries,
+                update_conflicts=True,
+                unique_fields=['phone_normalized', 'client_name'],
+                update_fields=['reason']
+            )
+            flagged = Order.objects.filter(
+                phone_normalized__in=phones,
+                is_blacklisted=False
+            ).filter(
+                Exists(Blacklist.objects.filter(
+                    phone_normalized=OuterRef('phone_normalized'),
+                    client_name=OuterRef('client_name')
+                ))
+            ).update(is_blacklisted=True, updated_at=timezone.now())
+            if flagged:
+                bump_version_on_commit('orders')
         
-        entry.delete()
\ No newline at end of file
+        # bulk_create минует post_save: телефоны добавляются в фильтры явно
+        BlacklistFilter.publish(phones)
+        stats['imported'] += len(entries)
+        stats['flagged_orders'] += flagged
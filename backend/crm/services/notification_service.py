@@ -1,115 +1,112 @@
-import telegram
+import random
+from datetime import timedelta
+from uuid import uuid4
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Max
 from django.utils import timezone
-from ..models import NotificationLog
+from ..models import NotificationLog, NotificationLogArchive, NotificationTemplate, Role
+from .recipient_directory import RecipientDirectory, Recipient
+from .telegram_sender import TelegramSender
+from .template_registry import NotificationTemplateRegistry
 
 class NotificationService:
     """
     Сервис для отправки уведомлений через Telegram.
-    Интегрируется с Telegram Bot API и логирует все отправленные уведомления.
+    Уведомления записываются в NotificationLog (outbox) в транзакции
+    изменения заявки, отправку выполняет диспетчер пакетами.
     """
     
-    _bot = None
+    # Размер пакета, забираемого диспетчером за один захват
+    DISPATCH_BATCH_SIZE = 100
+    # Размер пакета переноса лога в архив (один оператор SQL на пакет)
+    ARCHIVE_BATCH_SIZE = 5000
+    
+    _sender = None
     
     @classmethod
-    def initialize_bot(cls):
-        """Инициализация бота при старте приложения"""
-        if not cls._bot and hasattr(settings, 'TELEGRAM_BOT_TOKEN'):
-            cls._bot = telegram.Bot(token=settings.TELEGRAM_BOT_TOKEN)
+    def get_sender(cls):
+        """Отправитель Telegram с лимитами (создается при первом обращении)"""
+        if cls._sender is None:
+            cls._sender = TelegramSender.from_settings()
+        return cls._sender
     
     @classmethod
-    def _send_telegram_message(cls, chat_id, message):
+    def _queue(cls, order, recipients, message_type, message):
         """
-        Внутренний метод для отправки сообщения через Telegram API.
+        Запись уведомлений в outbox одним INSERT.
+        Вызывается внутри транзакции изменения заявки: уведомление
+        сохраняется тогда и только тогда, когда зафиксировано изменение.
         
         Args:
-            chat_id (str): ID чата или группы
+            order (Order): Объект заявки
+            recipients (iterable[Recipient]): Получатели
+            message_type (str): Тип из NotificationLog.NOTIFICATION_TYPES
             message (str): Текст сообщения
             
         Returns:
-            bool: Успешно ли отправлено сообщение
+            list[NotificationLog]: Созданные записи
         """
-        if not cls._bot:
-            cls.initialize_bot()
+        notifications = NotificationLog.objects.bulk_create([
+            NotificationLog(
+                order=order,
+                recipient_id=recipient.user_id,
+                message_type=message_type,
+                message_text=message
+            )
+            for recipient in recipients
+            if recipient.chat_id
+        ])
         
-        try:
-            cls._bot.send_message(
-                chat_id=chat_id,
-                text=message,
-                parse_mode='HTML'
+        window = settings.NOTIFICATION_DIGEST_WINDOW
+        if notifications and window and message_type in NotificationLog.DIGEST_TYPES:
+            # Сводка уходит по истечении окна, не дожидаясь периодического запуска
+            from crm.tasks import dispatch_notifications
+            transaction.on_commit(
+                lambda: dispatch_notifications.apply_async(countdown=window),
+                robust=True
             )
-            return True
-        except Exception as e:
-            print(f"Ошибка отправки Telegram сообщения: {e}")
-            return False
+        return notifications
     
     @classmethod
-    def send_assignment_notification(cls, order):
+    def queue_assignment_notification(cls, order):
         """
         Уведомление о назначении заявки менеджеру.
         
         Args:
             order (Order): Объект заявки
         """
-        if not order.assigned_to or not order.assigned_to.telegram_chat_id:
-            return
-        
-        message = (
-            f"<b>Новая заявка №{order.id}</b>\n"
-            f"Клиент: {order.client_name}\n"
-            f"Адрес: {order.address}\n"
-            f"Телефон: {order.phone}\n"
-            f"Статус: Назначена"
-        )
+        if not order.assigned_to:
+            return []
         
-        success = cls._send_telegram_message(
-            order.assigned_to.telegram_chat_id,
-            message
+        message = NotificationTemplateRegistry.render(
+            NotificationTemplate.TYPE_ASSIGNMENT,
+            {'order': order, 'manager': order.assigned_to}
         )
         
-        # Логирование уведомления
-        NotificationLog.objects.create(
-            order=order,
-            recipient=order.assigned_to,
-            message_type='assigned',
-            message_text=message,
-            is_sent=success
-        )
+        recipient = Recipient(order.assigned_to.id, order.assigned_to.telegram_chat_id)
+        return cls._queue(order, [recipient], NotificationLog.NOTIFICATION_ASSIGNED, message)
     
     @classmethod
-    def send_completion_notification(cls, order):
+    def queue_completion_notification(cls, order):
         """
-        Уведомление о завершении заявки (координатору).
+        Уведомление о завершении заявки (координаторам).
         
         Args:
             order (Order): Объект заявки
         """
-        # Находим координаторов
-        coordinators = User.objects.filter(role__name='coordinator', telegram_chat_id__isnull=False)
+        # Координаторы - из справочника получателей, без запроса к БД
+        coordinators = RecipientDirectory.get(Role.ROLE_COORDINATOR)
         
-        message = (
-            f"<b>Заявка №{order.id} завершена</b>\n"
-            f"Клиент: {order.client_name}\n"
-            f"Менеджер: {order.assigned_to.get_full_name() if order.assigned_to else 'Не назначен'}\n"
-            f"Статус: {order.get_status_display()}"
+        message = NotificationTemplateRegistry.render(
+            NotificationTemplate.TYPE_COMPLETION,
+            {'order': order}
         )
         
-        for coordinator in coordinators:
-            success = cls._send_telegram_message(
-                coordinator.telegram_chat_id,
-                message
-            )
-            
-            NotificationLog.objects.create(
-                order=order,
-                recipient=coordinator,
-                message_type='completed',
-                message_text=message,
-                is_sent=success
-            )
+        return cls._queue(order, coordinators, NotificationLog.NOTIFICATION_COMPLETED, message)
     
     @classmethod
-    def send_cancellation_notification(cls, order, reason):
+    def queue_cancellation_notification(cls, order, reason):
         """
         Уведомление об отмене заявки.
         
@@ -120,31 +117,314 @@ class NotificationService:
         recipients = []
         
         if order.assigned_to:
-            recipients.append(order.assigned_to)
+            recipients.append(Recipient(order.assigned_to.id, order.assigned_to.telegram_chat_id))
         
         # Добавляем координаторов
-        recipients.extend(User.objects.filter(role__name='coordinator', telegram_chat_id__isnull=False))
+        recipients.extend(RecipientDirectory.get(Role.ROLE_COORDINATOR))
+        
+        message = NotificationTemplateRegistry.render(
+            NotificationTemplate.TYPE_CANCELLATION,
+            {'order': order, 'reason': reason}
+        )
+        
+        return cls._queue(order, recipients, NotificationLog.NOTIFICATION_CANCELED, message)
+    
+    @classmethod
+    def dispatch_pending(cls, batch_size=None):
+        """
+        Отправка одного пакета ожидающих уведомлений.
+        
+        При NOTIFICATION_DIGEST_WINDOW > 0 уведомления типов DIGEST_TYPES
+        выдерживаются окно и отправляются получателю одной сводкой;
+        каждая запись лога сохраняется и получает общий digest_key.
+        
+        Args:
+            batch_size (int): Размер пакета (по умолчанию DISPATCH_BATCH_SIZE)
+            
+        Returns:
+            int: Число обработанных записей
+        """
+        window = settings.NOTIFICATION_DIGEST_WINDOW
+        
+        queryset = NotificationLog.objects.filter(status=NotificationLog.STATUS_PENDING)
+        if window:
+            # Свежие события ждут, пока к ним присоединятся следующие
+            queryset = queryset.exclude(
+                message_type__in=NotificationLog.DIGEST_TYPES,
+                created_at__gt=timezone.now() - timedelta(seconds=window)
+            )
+        
+        return cls._dispatch(queryset.order_by('created_at', 'id'), batch_size)
+    
+    @classmethod
+    def retry_failed(cls, batch_size=None):
+        """
+        Повторная отправка одного пакета неудачных уведомлений, у которых
+        наступило время следующей попытки (next_attempt_at), и уведомлений
+        с истекшей арендой (диспетчер упал, не записав результат).
+        Пакет выбирается по частичному индексу notification_requeue_idx,
+        поэтому очередь из сотен тысяч строк разбирается порциями
+        без загрузки целиком.
+        
+        Args:
+            batch_size (int): Размер пакета (по умолчанию DISPATCH_BATCH_SIZE)
+            
+        Returns:
+            int: Число обработанных записей
+        """
+        queryset = NotificationLog.objects.filter(
+            status__in=[NotificationLog.STATUS_FAILED, NotificationLog.STATUS_SENDING],
+            next_attempt_at__lte=timezone.now()
+        )
+        return cls._dispatch(queryset.order_by('next_attempt_at', 'id'), batch_size)
+    
+    @staticmethod
+    def next_attempt_at(attempts, now=None):
+        """
+        Время следующей попытки: экспоненциальная задержка
+        NOTIFICATION_RETRY_BASE * 2^(attempts-1), не более NOTIFICATION_RETRY_MAX_DELAY,
+        со случайным разбросом 50-100%, чтобы повторы не приходили волной.
+        
+        Args:
+            attempts (int): Число уже выполненных попыток
+            now (datetime): Точка отсчета (по умолчанию текущее время)
+            
+        Returns:
+            datetime: Время следующей попытки
+        """
+        delay = min(
+            settings.NOTIFICATION_RETRY_MAX_DELAY,
+            settings.NOTIFICATION_RETRY_BASE * 2 ** (attempts - 1)
+        )
+        return (now or timezone.now()) + timedelta(seconds=delay * random.uniform(0.5, 1))
+    
+    @classmethod
+    def _dispatch(cls, queryset, batch_size=None):
+        """
+        Отправка пакета уведомлений из queryset и пометка результата.
+        Транзакции короткие и не охватывают обращения к Telegram:
+        пакет захватывается арендой (_claim), отправляется вне транзакции
+        и результат записывается отдельной транзакцией (_record).
+        При падении процесса пакет возвращается в очередь по истечении
+        аренды (доставка "хотя бы раз"). Неудачные записи получают время
+        следующей попытки, после NOTIFICATION_MAX_ATTEMPTS попыток - статус dead.
+        
+        Args:
+            queryset (QuerySet): Упорядоченная выборка NotificationLog
+            batch_size (int): Размер пакета (по умолчанию DISPATCH_BATCH_SIZE)
+            
+        Returns:
+            int: Число обработанных записей
+        """
+        batch, lease = cls._claim(queryset, batch_size or cls.DISPATCH_BATCH_SIZE)
+        if not batch:
+            return 0
+        
+        if settings.NOTIFICATION_DIGEST_WINDOW:
+            groups = cls._group_digests(batch)
+        else:
+            groups = [[notification] for notification in batch]
+        
+        # Отправитель сам соблюдает лимиты Telegram и обрабатывает 429
+        results = cls.get_sender().send_batch([
+            (group[0].recipient.telegram_chat_id, cls._render_group(group))
+            for group in groups
+        ])
+        
+        cls._record(groups, results, lease)
+        return len(batch)
+    
+    @classmethod
+    def _claim(cls, queryset, batch_size):
+        """
+        Захват пакета: строки выбираются SELECT ... FOR UPDATE SKIP LOCKED
+        (параллельные диспетчеры получают непересекающиеся пакеты) и получают
+        статус sending с арендой до next_attempt_at. Время аренды служит
+        меткой владельца: записать результат может только захвативший диспетчер.
+        
+        Returns:
+            tuple: (list[NotificationLog], datetime аренды)
+        """
+        lease = timezone.now() + timedelta(seconds=settings.NOTIFICATION_SEND_LEASE)
+        with transaction.atomic():
+            batch = list(
+                queryset.select_for_update(skip_locked=True, of=('self',))
+                .select_related('recipient')[:batch_size]
+            )
+            if batch:
+                NotificationLog.objects.filter(id__in=[n.id for n in batch]).update(
+                    status=NotificationLog.STATUS_SENDING,
+                    next_attempt_at=lease
+                )
+        return batch, lease
+    
+    @classmethod
+    def _record(cls, groups, results, lease):
+        """
+        Запись результата отправки - не более трех UPDATE в одной транзакции.
+        Обновляются только строки, аренда которых не перехвачена
+        другим диспетчером после ее истечения.
+        """
+        now = timezone.now()
+        sent, failed, merged = [], [], []
+        for group, success in zip(groups, results):
+            if len(group) > 1:
+                digest_key = uuid4()
+                for notification in group:
+                    notification.digest_key = digest_key
+            if success:
+                sent.extend(notification.id for notification in group)
+                if len(group) > 1:
+                    merged.extend(group)
+                continue
+            for notification in group:
+                notification.attempts += 1
+                if notification.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+                    notification.status = NotificationLog.STATUS_DEAD
+                    notification.next_attempt_at = None
+                else:
+                    notification.status = NotificationLog.STATUS_FAILED
+                    notification.next_attempt_at = cls.next_attempt_at(notification.attempts, now)
+                failed.append(notification)
         
-        message = (
-            f"<b>Заявка №{order.id} отменена</b>\n"
-            f"Причина: {reason}\n"
-            f"Клиент: {order.client_name}\n"
-            f"Адрес: {order.address}"
+        owned = NotificationLog.objects.filter(
+            status=NotificationLog.STATUS_SENDING,
+            next_attempt_at=lease
         )
+        with transaction.atomic():
+            # digest_key - до смены статуса: после нее строки уже не в owned
+            if merged:
+                owned.bulk_update(merged, ['digest_key'])
+            if sent:
+                owned.filter(id__in=sent).update(
+                    status=NotificationLog.STATUS_SENT,
+                    is_sent=True,
+                    sent_at=now,
+                    next_attempt_at=None,
+                    attempts=F('attempts') + 1
+                )
+            if failed:
+                owned.bulk_update(
+                    failed,
+                    ['status', 'attempts', 'next_attempt_at', 'digest_key']
+                )
+    
+    @staticmethod
+    def _group_digests(batch):
+        """
+        Разбиение пакета на сообщения: уведомления DIGEST_TYPES одного
+        получателя объединяются, остальные отправляются по одному.
         
-        for recipient in recipients:
-            if not recipient.telegram_chat_id:
+        Returns:
+            list[list[NotificationLog]]: Группы в порядке первой записи
+        """
+        groups, digests = [], {}
+        for notification in batch:
+            if notification.message_type not in NotificationLog.DIGEST_TYPES:
+                groups.append([notification])
                 continue
-                
-            success = cls._send_telegram_message(
-                recipient.telegram_chat_id,
-                message
+            group = digests.get(notification.recipient_id)
+            if group is None:
+                group = digests[notification.recipient_id] = []
+                groups.append(group)
+            group.append(notification)
+        return groups
+    
+    @staticmethod
+    def _render_group(group):
+        """
+        Текст сообщения для группы: собственный текст одиночного
+        уведомления или сводка по типам событий.
+        """
+        if len(group) == 1:
+            return group[0].message_text
+        
+        labels = dict(NotificationLog.NOTIFICATION_TYPES)
+        return NotificationTemplateRegistry.render(NotificationTemplate.TYPE_DIGEST, {
+            'groups': [
+                {
+                    'label': labels[message_type],
+                    'orders': [n.order_id for n in group if n.message_type == message_type]
+                }
+                for message_type in NotificationLog.DIGEST_TYPES
+                if any(n.message_type == message_type for n in group)
+            ]
+        })
+    
+    @classmethod
+    def archive_old(cls, before, batch_size=None):
+        """
+        Перенос обработанных уведомлений старше before в NotificationLogArchive.
+        Каждый пакет - один оператор DELETE ... RETURNING + INSERT: строки
+        удаляются и вставляются атомарно, без выгрузки в Python. Строки,
+        захваченные диспетчером, пропускаются (SKIP LOCKED); ожидающие
+        и отправляемые не переносятся.
+        
+        Args:
+            before (datetime): Граница по дате создания
+            batch_size (int): Размер пакета (по умолчанию ARCHIVE_BATCH_SIZE)
+            
+        Returns:
+            int: Число перенесенных записей
+        """
+        batch_size = batch_size or cls.ARCHIVE_BATCH_SIZE
+        columns = ', '.join(field.column for field in NotificationLogArchive._meta.concrete_fields)
+        sql = f"""
+            WITH moved AS (
+                DELETE FROM {NotificationLog._meta.db_table}
+                WHERE id IN (
+                    SELECT id FROM {NotificationLog._meta.db_table}
+                    WHERE created_at < %s AND status NOT IN (%s, %s)
+                    ORDER BY created_at, id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {columns}
             )
+            INSERT INTO {NotificationLogArchive._meta.db_table} ({columns})
+            SELECT {columns} FROM moved
+        """
+        
+        moved = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [
+                    before, NotificationLog.STATUS_PENDING, NotificationLog.STATUS_SENDING, batch_size
+                ])
+                count = cursor.rowcount
+            moved += count
+            if count < batch_size:
+                return moved
+    
+    @classmethod
+    def purge_archive(cls, before, batch_size=None):
+        """
+        Удаление из архива записей старше before пакетами по диапазонам
+        первичного ключа. Верхняя граница id определяется один раз (BRIN
+        по created_at), дальше каждый пакет - проход по индексу id от
+        предыдущего пакета, без сортировки архива.
+        
+        Args:
+            before (datetime): Граница по дате создания
+            batch_size (int): Размер пакета (по умолчанию ARCHIVE_BATCH_SIZE)
             
-            NotificationLog.objects.create(
-                order=order,
-                recipient=recipient,
-                message_type='canceled',
-                message_text=message,
-                is_sent=success
-            )
\ No newline at end of file
+        Returns:
+            int: Число удаленных записей
+        """
+        batch_size = batch_size or cls.ARCHIVE_BATCH_SIZE
+        expired = NotificationLogArchive.objects.filter(created_at__lt=before)
+        last_id = expired.aggregate(last_id=Max('id'))['last_id']
+        
+        deleted = 0
+        first_id = 0
+        while last_id is not None and first_id < last_id:
+            ids = list(
+                expired.filter(id__gt=first_id, id__lte=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            deleted += NotificationLogArchive.objects.filter(id__in=ids).delete()[0]
+            first_id = ids[-1]
+        return deleted
@@ -1,6 +1,13 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from ..models import Order, StatusHistory, Blacklist, User
+from ..models import Order, StatusHistory, Blacklist, User, Address, ManagerStatus
+from ..utils.phone import normalize_phone
+from ..utils.versioning import bump_version, bump_version_on_commit
+from .blacklist_filter import BlacklistFilter
 from .notification_service import NotificationService
+from .order_stats_service import OrderStatsService
 
 class OrderService:
     """
@@ -12,6 +19,11 @@ class OrderService:
     - Работа с черным списком
     """
     
+    # Максимальный размер пакета для bulk_create_orders
+    BULK_CREATE_LIMIT = 1000
+    # Заявок в пакете пересборки поисковых документов
+    SEARCH_REFRESH_CHUNK_SIZE = 1000
+    
     @staticmethod
     def create_order(client_name, phone, address, comment, operator):
         """
@@ -28,36 +40,188 @@ class OrderService:
         Returns:
             Order: Созданный объект заявки
         """
-        # Проверка на черный список
-        is_blacklisted = Blacklist.objects.filter(
-            client_name=client_name,
-            phone=phone
+        # Проверка на черный список по нормализованному номеру: фильтр в памяти
+        # отсекает почти всех клиентов, запрос к БД - только при совпадении
+        phone_normalized = normalize_phone(phone)
+        is_blacklisted = BlacklistFilter.might_contain(phone_normalized) and Blacklist.objects.filter(
+            phone_normalized=phone_normalized,
+            client_name=client_name
         ).exists()
         
-        order = Order.objects.create(
-            client_name=client_name,
-            phone=phone,
-            address=address,
-            comment=comment,
-            is_blacklisted=is_blacklisted,
-            assigned_to=None
+        with transaction.atomic():
+            order = Order.objects.create(
+                client_name=client_name,
+                phone=phone,
+                address=address,
+                comment=comment,
+                is_blacklisted=is_blacklisted,
+                assigned_to=None
+            )
+            
+            # Запись в историю статусов
+            StatusHistory.objects.create(
+                order=order,
+                status=Order.STATUS_UNASSIGNED,
+                changed_by=operator,
+                comment='Заявка создана'
+            )
+            OrderStatsService.record_created([order])
+        
+        return order
+    
+    @staticmethod
+    def bulk_create_orders(orders_data, operator):
+        """
+        Пакетное создание заявок фиксированным числом запросов:
+        один запрос адресов, один запрос черного списка (только если
+        фильтр BlacklistFilter нашел кандидатов) и по одному INSERT
+        для заявок, истории статусов и суточного среза в одной транзакции.
+        
+        Args:
+            orders_data (list): Словари с ключами client_name, phone,
+                address_id, comment (уже прошедшие валидацию формата)
+            operator (User): Оператор, создавший заявки
+            
+        Returns:
+            dict: {
+                'created': list[Order] - созданные заявки,
+                'errors': list[dict] - {'index': int, 'errors': dict}
+            }
+        """
+        if len(orders_data) > OrderService.BULK_CREATE_LIMIT:
+            raise ValueError(
+                f'Не более {OrderService.BULK_CREATE_LIMIT} заявок за один запрос'
+            )
+        
+        addresses = Address.objects.select_related('city').in_bulk(
+            {item['address_id'] for item in orders_data}
         )
+        phones = {item['phone']: normalize_phone(item['phone']) for item in orders_data}
+        candidates = {phone for phone in phones.values() if BlacklistFilter.might_contain(phone)}
+        blacklisted = set(
+            Blacklist.objects.filter(
+                phone_normalized__in=candidates
+            ).values_list('client_name', 'phone_normalized')
+        ) if candidates else set()
+        
+        orders = []
+        errors = []
+        for index, item in enumerate(orders_data):
+            address = addresses.get(item['address_id'])
+            if address is None:
+                errors.append({
+                    'index': index,
+                    'errors': {'address_id': ['Адрес не найден']}
+                })
+                continue
+            
+            phone_normalized = phones[item['phone']]
+            order = Order(
+                client_name=item['client_name'],
+                phone=item['phone'],
+                phone_normalized=phone_normalized,
+                address=address,
+                comment=item.get('comment', ''),
+                is_blacklisted=(item['client_name'], phone_normalized) in blacklisted,
+                assigned_to=None
+            )
+            # bulk_create не вызывает save(), производные поля заполняем сами
+            order.search_document = order.build_search_document()
+            orders.append(order)
         
-        # Запись в историю статусов
-        StatusHistory.objects.create(
-            order=order,
-            status=Order.STATUS_UNASSIGNED,
-            changed_by=operator,
-            comment='Заявка создана'
+        with transaction.atomic():
+            created = Order.objects.bulk_create(orders)
+            StatusHistory.objects.bulk_create([
+                StatusHistory(
+                    order=order,
+                    status=Order.STATUS_UNASSIGNED,
+                    changed_by=operator,
+                    comment='Заявка создана'
+                )
+                for order in created
+            ])
+            OrderStatsService.record_created(created)
+            # bulk_create минует post_save: ETag ленты заявок сбрасываем явно
+            bump_version_on_commit('orders')
+            bump_version_on_commit('status_history')
+        
+        return {'created': created, 'errors': errors}
+    
+    @classmethod
+    def refresh_search_documents(cls, queryset, chunk_size=None):
+        """
+        Пересборка поисковых документов заявок после правки адреса или
+        города. Проход порциями по первичному ключу: каждая порция - один
+        SELECT и один UPDATE только измененных строк.
+        
+        Args:
+            queryset (QuerySet): Заявки, документы которых могли устареть
+            chunk_size (int): Заявок в порции (по умолчанию SEARCH_REFRESH_CHUNK_SIZE)
+            
+        Returns:
+            int: Число обновленных заявок
+        """
+        chunk_size = chunk_size or cls.SEARCH_REFRESH_CHUNK_SIZE
+        queryset = queryset.select_related('address__city').only(
+            'id', 'client_name', 'phone_normalized', 'search_document',
+            'address__street', 'address__house', 'address__city__name'
         )
         
-        return order
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id).order_by('id')[:chunk_size])
+            if not batch:
+                return updated
+            
+            changed = []
+            for order in batch:
+                document = order.build_search_document()
+                if document != order.search_document:
+                    order.search_document = document
+                    changed.append(order)
+            if changed:
+                Order.objects.bulk_update(changed, ['search_document'])
+                updated += len(changed)
+            last_id = batch[-1].id
+    
+    @staticmethod
+    def search_orders(queryset, query):
+        """
+        Поиск заявок по клиенту, телефону и адресу с ранжированием.
+        Использует GIN-индексы по search_document: полнотекстовый
+        (русская морфология) и триграммный (подстроки, цифры телефона).
+        
+        Args:
+            queryset (QuerySet): Исходный queryset заявок
+            query (str): Поисковая строка
+            
+        Returns:
+            QuerySet: Найденные заявки, упорядоченные по релевантности
+        """
+        term = query.strip().lower()
+        digits = normalize_phone(term)
+        
+        vector = SearchVector('search_document', config='russian')
+        ts_query = SearchQuery(term, config='russian')
+        
+        condition = Q(search_vector=ts_query) | Q(search_document__contains=term)
+        if len(digits) >= 3 and digits != term:
+            condition |= Q(search_document__contains=digits)
+        
+        return queryset.annotate(
+            search_vector=vector,
+            rank=SearchRank(vector, ts_query) + TrigramSimilarity('search_document', term)
+        ).filter(condition).order_by('-rank', '-created_at')
     
     @staticmethod
     def assign_order(order_id, manager_id, coordinator):
         """
         Назначение заявки менеджеру.
-        Проверяет, что менеджер свободен.
+        Выполняется атомарно: строка заявки блокируется (SELECT ... FOR UPDATE),
+        менеджер занимается условным UPDATE ... WHERE status='free'.
+        Параллельные координаторы не могут назначить одного менеджера
+        на две заявки или одну заявку двум менеджерам.
         
         Args:
             order_id (int): ID заявки
@@ -66,34 +230,49 @@ class OrderService:
             
         Returns:
             Order: Обновленный объект заявки
+            
+        Raises:
+            ValueError: Заявка уже назначена или менеджер занят
         """
-        order = Order.objects.get(id=order_id)
         manager = User.objects.get(id=manager_id)
         
-        # Проверка статуса менеджера
-        if hasattr(manager, 'managerstatus') and manager.managerstatus.status != 'free':
-            raise ValueError('Менеджер уже занят другой заявкой')
-        
-        # Обновление заявки
-        order.assigned_to = manager
-        order.status = Order.STATUS_ASSIGNED
-        order.save()
-        
-        # Обновление статуса менеджера
-        if hasattr(manager, 'managerstatus'):
-            manager.managerstatus.status = 'busy'
-            manager.managerstatus.save()
-        
-        # Запись в историю
-        StatusHistory.objects.create(
-            order=order,
-            status=Order.STATUS_ASSIGNED,
-            changed_by=coordinator,
-            comment=f'Назначен менеджер: {manager.get_full_name()}'
-        )
-        
-        # Отправка уведомления
-        NotificationService.send_assignment_notification(order)
+        with transaction.atomic():
+            # Порядок блокировок везде одинаковый: заявка, затем статус менеджера.
+            # Адрес нужен для ключа суточного среза, но не блокируется
+            order = Order.objects.select_for_update(of=('self',)).select_related('address').get(id=order_id)
+            if order.status in (Order.STATUS_ASSIGNED, Order.STATUS_IN_PROGRESS):
+                raise ValueError('Заявка уже назначена менеджеру')
+            
+            # Занимаем менеджера одним запросом: проверка и запись не разделены
+            claimed = ManagerStatus.objects.filter(
+                user_id=manager.id,
+                status=ManagerStatus.STATUS_FREE
+            ).update(status=ManagerStatus.STATUS_BUSY, last_updated=timezone.now())
+            
+            if claimed:
+                # update() не вызывает post_save - ETag статусов сбрасываем сами
+                transaction.on_commit(lambda: bump_version('manager_status'))
+            elif ManagerStatus.objects.filter(user_id=manager.id).exists():
+                raise ValueError('Менеджер уже занят другой заявкой')
+            
+            old_status, old_manager_id = order.status, order.assigned_to_id
+            order.assigned_to = manager
+            order.status = Order.STATUS_ASSIGNED
+            order.save(update_fields=['assigned_to', 'status', 'updated_at'])
+            OrderStatsService.record_transition(order, old_status, old_manager_id)
+            
+            # Запись в историю
+            StatusHistory.objects.create(
+                order=order,
+                status=Order.STATUS_ASSIGNED,
+                changed_by=coordinator,
+                comment=f'Назначен менеджер: {manager.get_full_name()}'
+            )
+            
+            # Уведомление пишется в outbox в этой же транзакции,
+            # отправка - диспетчером после коммита: ответ API не ждет Telegram
+            NotificationService.queue_assignment_notification(order)
+            OrderService._dispatch_after_commit()
         
         return order
     
@@ -111,56 +290,68 @@ class OrderService:
         Returns:
             Order: Обновленный объект заявки
         """
-        order = Order.objects.get(id=order_id)
-        order.status = new_status
-        order.save()
-        
-        # Если заявка завершена/отклонена, освобождаем менеджера
-        if new_status in [Order.STATUS_COMPLETED, Order.STATUS_REJECTED]:
-            if order.assigned_to and hasattr(order.assigned_to, 'managerstatus'):
-                order.assigned_to.managerstatus.status = 'free'
-                order.assigned_to.managerstatus.save()
-        
-        # Запись в историю
-        StatusHistory.objects.create(
-            order=order,
-            status=new_status,
-            changed_by=user,
-            comment=comment
-        )
-        
-        # Отправка уведомления при завершении
-        if new_status == Order.STATUS_COMPLETED:
-            NotificationService.send_completion_notification(order)
+        with transaction.atomic():
+            order = Order.objects.select_for_update(of=('self',)).select_related('address').get(id=order_id)
+            old_status = order.status
+            order.status = new_status
+            order.save(update_fields=['status', 'updated_at'])
+            OrderStatsService.record_transition(order, old_status, order.assigned_to_id)
+            
+            # Если заявка завершена/отклонена, освобождаем менеджера
+            if new_status in [Order.STATUS_COMPLETED, Order.STATUS_REJECTED] and order.assigned_to_id:
+                released = ManagerStatus.objects.filter(
+                    user_id=order.assigned_to_id,
+                    status=ManagerStatus.STATUS_BUSY
+                ).update(status=ManagerStatus.STATUS_FREE, last_updated=timezone.now())
+                if released:
+                    transaction.on_commit(lambda: bump_version('manager_status'))
+            
+            # Запись в историю
+            StatusHistory.objects.create(
+                order=order,
+                status=new_status,
+                changed_by=user,
+                comment=comment
+            )
+            
+            # Уведомление координаторов при завершении - через outbox
+            if new_status == Order.STATUS_COMPLETED:
+                NotificationService.queue_completion_notification(order)
+                OrderService._dispatch_after_commit()
         
         return order
     
+    @staticmethod
+    def _dispatch_after_commit():
+        """
+        Запуск диспетчера уведомлений после коммита транзакции.
+        Записи outbox к этому моменту уже видны воркеру; если задача
+        не поставлена (брокер недоступен), их заберет периодический запуск.
+        robust=True: ошибка брокера не превращает сохраненное изменение в ошибку запроса.
+        """
+        from crm.tasks import dispatch_notifications
+        transaction.on_commit(dispatch_notifications.delay, robust=True)
+    
     @staticmethod
     def add_to_blacklist(order_id, reason):
         """
         Добавление клиента в черный список на основе заявки.
+        Остальные заявки клиента помечаются фоновым заданием.
         
         Args:
             order_id (int): ID заявки
             reason (str): Причина добавления
             
         Returns:
-            Blacklist: Созданная запись в черном списке
+            tuple: (Blacklist - запись в черном списке,
+                    BlacklistPropagationJob - задание пометки заявок)
         """
+        # blacklist_service импортирует сигналы, а они - пакет services
+        from .blacklist_service import BlacklistService
         order = Order.objects.get(id=order_id)
-        
-        blacklist_entry, created = Blacklist.objects.get_or_create(
+        return BlacklistService().add_to_blacklist(
             client_name=order.client_name,
             phone=order.phone,
-            defaults={'reason': reason}
-        )
-        
-        if not created:
-            blacklist_entry.reason = reason
-            blacklist_entry.save()
-        
-        # Обновляем связанные заявки
-        blacklist_entry.related_orders.add(order)
-        Order.objects.filter(client_name=order.client_name, phone=order.phone).update(is_blacklisted=True)
-        
-        return blacklist_entry
\ No newline at end of file
+            reason=reason,
+            order_id=order.id
+        )
\ No newline at end of file
@@ -0,0 +1,212 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+from ..models import Order, OrderDailyStats
+from ..utils.versioning import bump_version_on_commit
+
+class OrderStatsService:
+    """
+    Сервис суточного среза заявок (OrderDailyStats) для отчетов.
+    Срез меняется в транзакции изменения заявки: каждое событие -
+    один INSERT ... ON CONFLICT с приращениями счетчиков.
+    """
+
+    # Версия отчетов за месяц создания заявок: меняется при любом
+    # изменении среза в этом месяце (ключи кэша ReportService)
+    REPORT_SCOPE = 'orders_report:{:%Y-%m}'
+
+    UPSERT_SQL = """
+        INSERT INTO {table} (day, city_id, manager_id, status, count, updated_at)
+        VALUES {values}
+        ON CONFLICT ON CONSTRAINT order_daily_stats_key
+        DO UPDATE SET count = {table}.count + EXCLUDED.count, updated_at = EXCLUDED.updated_at
+    """
+
+    # Пространство рекомендательных блокировок дней среза (pg_advisory_xact_lock(int, int)):
+    # приращения берут разделяемую блокировку дня, пересборка дня - исключительную
+    DAY_LOCK_SPACE = 24001
+
+    @classmethod
+    def report_scopes(cls, date_from, date_to):
+        """
+        Версии отчетов для дней [date_from, date_to): по одной на месяц.
+
+        Returns:
+            list[str]: Имена версий для get_versions
+        """
+        scopes = []
+        month = date_from.replace(day=1)
+        while month < date_to:
+            scopes.append(cls.REPORT_SCOPE.format(month))
+            month = (month + timedelta(days=32)).replace(day=1)
+        return scopes
+
+    @classmethod
+    def invalidate_reports(cls, days):
+        """
+        Сброс кэша отчетов за месяцы затронутых дней. Версия увеличивается
+        сразу и повторно после коммита: отчет, посчитанный до коммита
+        по старым данным, не закрепится под новой версией.
+
+        Args:
+            days (Iterable[date]): Дни создания измененных заявок
+        """
+        for scope in {cls.REPORT_SCOPE.format(day) for day in days}:
+            bump_version_on_commit(scope)
+
+    @staticmethod
+    def _key(created_at, city_id, manager_id, status):
+        """Ключ строки среза: день создания заявки по местному времени."""
+        return (timezone.localdate(created_at), city_id, manager_id, status)
+
+    @classmethod
+    def record_created(cls, orders):
+        """
+        Учет новых заявок. Адрес заявок должен быть загружен
+        (в OrderService он передается объектом).
+
+        Args:
+            orders (list[Order]): Созданные заявки
+        """
+        cls._apply(Counter(
+            cls._key(order.created_at, order.address.city_id, order.assigned_to_id, order.status)
+            for order in orders
+        ))
+
+    @classmethod
+    def record_transition(cls, order, old_status, old_manager_id, old_city_id=None):
+        """
+        Учет смены статуса, менеджера или города заявки: счетчик прежнего
+        ключа уменьшается, нового - увеличивается.
+
+        Args:
+            order (Order): Заявка после изменения (с загруженным адресом)
+            old_status (str): Статус до изменения
+            old_manager_id (int | None): Менеджер до изменения
+            old_city_id (int | None): Город до изменения (по умолчанию - текущий)
+        """
+        city_id = order.address.city_id
+        if old_city_id is None:
+            old_city_id = city_id
+        if (old_status, old_manager_id, old_city_id) == (order.status, order.assigned_to_id, city_id):
+            return
+
+        deltas = Counter()
+        deltas[cls._key(order.created_at, old_city_id, old_manager_id, old_status)] -= 1
+        deltas[cls._key(order.created_at, city_id, order.assigned_to_id, order.status)] += 1
+        cls._apply(deltas)
+
+    @classmethod
+    def record_deleted(cls, order):
+        """
+        Учет удаления заявки: счетчик ее ключа уменьшается.
+
+        Args:
+            order (Order): Удаленная заявка
+        """
+        cls._apply(Counter({
+            cls._key(order.created_at, order.address.city_id, order.assigned_to_id, order.status): -1
+        }))
+
+    @classmethod
+    def _apply(cls, deltas):
+        """
+        Приращения счетчиков одним запросом. Строки упорядочены по ключу:
+        параллельные транзакции блокируют строки среза в одном порядке
+        и не взаимоблокируются.
+        """
+        rows = sorted(
+            ((key, delta) for key, delta in deltas.items() if delta),
+            key=lambda item: (item[0][0], item[0][1], item[0][2] or 0, item[0][3])
+        )
+        if not rows:
+            return
+
+        cls._lock_days(sorted({key[0] for key, _ in rows}), shared=True)
+        now = timezone.now()
+        params = []
+        for (day, city_id, manager_id, status), delta in rows:
+            params.extend([day, city_id, manager_id, status, delta, now])
+        sql = cls.UPSERT_SQL.format(
+            table=OrderDailyStats._meta.db_table,
+            values=', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(rows))
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+        cls.invalidate_reports(key[0] for key, _ in rows)
+
+    @classmethod
+    def _lock_days(cls, days, shared=False):
+        """
+        Блокировка дней среза до конца транзакции одним запросом. Дни
+        передаются по возрастанию: порядок захвата одинаков во всех транзакциях.
+        """
+        function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {function}(%s, day) FROM unnest(%s::int[]) AS day',
+                [cls.DAY_LOCK_SPACE, [day.toordinal() for day in days]]
+            )
+
+    @classmethod
+    def rebuild(cls, date_from=None, date_to=None, progress=None):
+        """
+        Пересборка среза по заявкам за дни [date_from, date_to] (включительно),
+        по умолчанию - за все время. Каждый день - отдельная транзакция под
+        исключительной блокировкой этого дня: ждут только приращения
+        пересобираемого дня, и они не теряются, остальные идут без ожидания.
+
+        Args:
+            date_from (date): Первый день
+            date_to (date): Последний день
+            progress (callable): Вызывается с днем после его пересборки
+
+        Returns:
+            int: Количество пересобранных дней
+        """
+        if date_from is None or date_to is None:
+            bounds = Order.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+            if bounds['first'] is None:
+                return 0
+            date_from = date_from or timezone.localdate(bounds['first'])
+            date_to = date_to or timezone.localdate(bounds['last'])
+
+        day = date_from
+        days = 0
+        while day <= date_to:
+            cls._rebuild_day(day)
+            days += 1
+            if progress:
+                progress(day)
+            day += timedelta(days=1)
+        return days
+
+    @classmethod
+    def _rebuild_day(cls, day):
+        """Пересборка одного дня: удаление строк и одна агрегация заявок дня."""
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+        with transaction.atomic():
+            # Агрегация читает заявки после захвата блокировки: изменения,
+            # закоммиченные до нее, уже видны, а приращения незакоммиченных
+            # транзакций ждут блокировки и ложатся поверх пересобранных строк
+            cls._lock_days([day])
+            OrderDailyStats.objects.filter(day=day).delete()
+            groups = Order.objects.filter(
+                created_at__gte=start,
+                created_at__lt=end
+            ).values('address__city_id', 'assigned_to_id', 'status').annotate(count=Count('id')).order_by()
+            OrderDailyStats.objects.bulk_create([
+                OrderDailyStats(
+                    day=day,
+                    city_id=group['address__city_id'],
+                    manager_id=group['assigned_to_id'],
+                    status=group['status'],
+                    count=group['count']
+                )
+                for group in groups
+            ])
+            cls.invalidate_reports([day])
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import namedtuple
+from django.db import transaction
+from ..models import User
+from ..utils.versioning import get_version, bump_version
+
+# Получатель уведомлений: ID пользователя и чат Telegram
+Recipient = namedtuple('Recipient', ['user_id', 'chat_id'])
+
+
+class RecipientDirectory:
+    """
+    Справочник получателей уведомлений по ролям: role -> [Recipient].
+    Хранится в памяти процесса с TTL. Сигналы User/Role сбрасывают
+    локальную копию и увеличивают версию 'recipients' в общем кэше,
+    по которой копии в других процессах (воркеры, gunicorn) узнают
+    об изменении без запроса к БД.
+    """
+
+    TTL = 300
+    VERSION_SCOPE = 'recipients'
+
+    # role -> (срок годности, версия, список получателей)
+    _entries = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, role):
+        """
+        Получатели с указанной ролью и заполненным chat_id.
+
+        Args:
+            role (str): Имя роли (Role.ROLE_COORDINATOR, ...)
+
+        Returns:
+            list[Recipient]: Получатели (копия, можно изменять)
+        """
+        version = get_version(cls.VERSION_SCOPE)
+        now = time.monotonic()
+
+        with cls._lock:
+            entry = cls._entries.get(role)
+        if entry and entry[0] > now and entry[1] == version:
+            return list(entry[2])
+
+        recipients = [
+            Recipient(user_id, chat_id)
+            for user_id, chat_id in User.objects.filter(
+                role__name=role,
+                telegram_chat_id__isnull=False
+            ).exclude(telegram_chat_id='').order_by('id').values_list('id', 'telegram_chat_id')
+        ]
+
+        with cls._lock:
+            cls._entries[role] = (now + cls.TTL, version, recipients)
+        return list(recipients)
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Сброс справочника во всех процессах.
+        Версия увеличивается и после коммита, чтобы не закрепить
+        прочитанные до коммита данные.
+        """
+        with cls._lock:
+            cls._entries.clear()
+        bump_version(cls.VERSION_SCOPE)
+        transaction.on_commit(lambda: bump_version(cls.VERSION_SCOPE))
@@ -1,9 +1,15 @@
-from django.db.models import Count, Q, Avg, Case, When, F
-from django.db.models.functions import Extract
-from django.db.models.fields import DurationField
+import hashlib
+from time import monotonic, sleep
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Max, Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import timedelta
-from ..models import Order, City
+from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
+from ..models import Order, OrderDailyStats
+from ..utils.versioning import get_versions
+from .order_stats_service import OrderStatsService
 
 class ReportService:
     """
@@ -24,10 +30,19 @@ class ReportService:
         'custom': 'Произвольный период'
     }
     
+    REPORT_CACHE_KEY = 'crm:report:{name}:{period}:{date_from}:{date_to}:{digest}'
+    # Блокировка расчета отчета: истекает, если вычислявший процесс упал
+    REPORT_CACHE_LOCK_TIMEOUT = 60
+    REPORT_CACHE_POLL_INTERVAL = 0.05
+    
+    # Статусы, считаемые в отчетах отдельно
+    ORDERS_REPORT_STATUSES = ('completed', 'rejected', 'in_progress', 'unassigned')
+    MANAGERS_REPORT_STATUSES = ('completed', 'rejected')
+    
     @classmethod
     def get_orders_report(cls, period='today', date_from=None, date_to=None):
         """
-        Генерация сводного отчета по заявкам.
+        Генерация сводного отчета по заявкам (через кэш отчетов).
         
         Args:
             period (str): Период из PERIODS
@@ -38,36 +53,43 @@ class ReportService:
             dict: Данные отчета
         """
         date_range = cls._get_date_range(period, date_from, date_to)
+        return cls._cached('orders', period, date_range, cls._build_orders_report)
+    
+    @classmethod
+    def _build_orders_report(cls, period, date_range):
+        """
+        Расчет сводного отчета по заявкам.
+        Прошедшие дни читаются из суточного среза, сегодняшний - из заявок.
+        """
+        by_city = sorted(
+            cls._grouped_counts(
+                date_range,
+                cls.ORDERS_REPORT_STATUSES,
+                order_group=('address__city__name',),
+                stats_group=('city__name',)
+            ),
+            key=lambda row: -row['total']
+        )
         
-        orders = Order.objects.filter(created_at__range=date_range)
-        
-        by_city = orders.values('address__city__name').annotate(
-            total=Count('id'),
-            completed=Count('id', filter=Q(status='completed')),
-            rejected=Count('id', filter=Q(status='rejected')),
-            in_progress=Count('id', filter=Q(status='in_progress'))
-        ).order_by('-total')
-        
+        # Итоги - сумма по городам: каждая заявка входит ровно в одну группу,
+        # повторный проход по заявкам периода не нужен
         total_stats = {
-            'total': orders.count(),
-            'completed': orders.filter(status='completed').count(),
-            'rejected': orders.filter(status='rejected').count(),
-            'in_progress': orders.filter(status='in_progress').count(),
-            'unassigned': orders.filter(status='unassigned').count()
+            key: sum(row[key] for row in by_city)
+            for key in ('total',) + cls.ORDERS_REPORT_STATUSES
         }
         
         return {
             'period': cls.PERIODS[period],
             'date_from': date_range[0],
             'date_to': date_range[1],
-            'by_city': list(by_city),
+            'by_city': by_city,
             'total_stats': total_stats
         }
     
     @classmethod
     def get_managers_report(cls, period='today', date_from=None, date_to=None):
         """
-        Отчет по эффективности менеджеров.
+        Отчет по эффективности менеджеров (через кэш отчетов).
         
         Args:
             period (str): Период из PERIODS
@@ -78,47 +100,240 @@ class ReportService:
             dict: Данные отчета
         """
         date_range = cls._get_date_range(period, date_from, date_to)
-        
-        managers_stats = Order.objects.filter(
-            created_at__range=date_range,
-            assigned_to__isnull=False
-        ).values(
-            'assigned_to__username', 
-            'assigned_to__first_name', 
-            'assigned_to__last_name'
-        ).annotate(
-            total=Count('id'),
-            completed=Count('id', filter=Q(status='completed')),
-            rejected=Count('id', filter=Q(status='rejected')),
-            avg_time=Avg(
-                Case(
-                    When(status='completed', then=F('completed_at') - F('started_at')),
-                    output_field=DurationField()
-                )
-            )
-        ).order_by('-completed')
+        return cls._cached('managers', period, date_range, cls._build_managers_report)
+    
+    @classmethod
+    def _build_managers_report(cls, period, date_range):
+        """
+        Расчет отчета по менеджерам.
+        Прошедшие дни читаются из суточного среза, сегодняшний - из заявок.
+        """
+        managers_stats = sorted(
+            cls._grouped_counts(
+                date_range,
+                cls.MANAGERS_REPORT_STATUSES,
+                order_group=('assigned_to__username', 'assigned_to__first_name', 'assigned_to__last_name'),
+                stats_group=('manager__username', 'manager__first_name', 'manager__last_name'),
+                order_filter=Q(assigned_to__isnull=False),
+                stats_filter=Q(manager__isnull=False)
+            ),
+            key=lambda row: -row['completed']
+        )
         
         return {
             'period': cls.PERIODS[period],
             'date_from': date_range[0],
             'date_to': date_range[1],
-            'managers': list(managers_stats)
+            'managers': managers_stats
         }
     
+    @classmethod
+    def get_orders_stamp(cls, period='today', date_from=None, date_to=None):
+        """
+        Дешевый "отпечаток" заявок периода для условных запросов:
+        количество и время последнего изменения (по срезу для прошедших
+        дней и по заявкам за сегодня).
+        
+        Args:
+            period (str): Период из PERIODS
+            date_from (date): Начальная дата
+            date_to (date): Конечная дата
+            
+        Returns:
+            dict: {'date_from', 'date_to', 'count', 'last_modified'}
+        """
+        date_range = cls._get_date_range(period, date_from, date_to)
+        stats_range, orders_range = cls._split_range(date_range)
+        
+        parts = []
+        if stats_range:
+            parts.append(OrderDailyStats.objects.filter(
+                day__gte=stats_range[0],
+                day__lt=stats_range[1]
+            ).aggregate(count=Sum('count'), last_modified=Max('updated_at')))
+        if orders_range:
+            parts.append(Order.objects.filter(
+                cls._period_filter(orders_range)
+            ).aggregate(count=Count('id'), last_modified=Max('updated_at')))
+        
+        modified = [part['last_modified'] for part in parts if part['last_modified']]
+        return {
+            'date_from': date_range[0],
+            'date_to': date_range[1],
+            'count': sum(part['count'] or 0 for part in parts),
+            'last_modified': max(modified) if modified else None
+        }
+    
+    @classmethod
+    def _cached(cls, name, period, date_range, build):
+        """
+        Результат отчета из кэша. Ключ включает версии месяцев периода
+        (OrderStatsService.report_scopes): изменение заявок месяца делает
+        прежние результаты недостижимыми. Закрытые периоды хранятся
+        REPORT_CACHE_CLOSED_TTL, периоды с сегодняшним днем -
+        REPORT_CACHE_OPEN_TTL (сегодняшние заявки читаются напрямую).
+        Одновременные одинаковые запросы считают отчет один раз:
+        первый берет блокировку (cache.add), остальные ждут результат
+        не дольше REPORT_CACHE_WAIT и только потом считают сами.
+        
+        Args:
+            name (str): Имя отчета
+            period (str): Период из PERIODS (входит в результат)
+            date_range (tuple): (date_from, date_to) из _get_date_range
+            build (callable): build(period, date_range) -> dict
+            
+        Returns:
+            dict: Данные отчета
+        """
+        versions = get_versions(*OrderStatsService.report_scopes(*date_range))
+        digest = hashlib.md5(repr(sorted(versions.items())).encode()).hexdigest()
+        key = cls.REPORT_CACHE_KEY.format(
+            name=name,
+            period=period,
+            date_from=date_range[0],
+            date_to=date_range[1],
+            digest=digest
+        )
+        
+        report = cache.get(key)
+        if report is not None:
+            return report
+        
+        lock_key = f'{key}:lock'
+        if not cache.add(lock_key, 1, cls.REPORT_CACHE_LOCK_TIMEOUT):
+            deadline = monotonic() + settings.REPORT_CACHE_WAIT
+            while monotonic() < deadline:
+                sleep(cls.REPORT_CACHE_POLL_INTERVAL)
+                report = cache.get(key)
+                if report is not None:
+                    return report
+                if cache.get(lock_key) is None:
+                    # Вычислявший процесс завершился без результата
+                    break
+            return build(period, date_range)
+        
+        try:
+            report = build(period, date_range)
+            closed = date_range[1] <= timezone.localdate()
+            cache.set(
+                key,
+                report,
+                settings.REPORT_CACHE_CLOSED_TTL if closed else settings.REPORT_CACHE_OPEN_TTL
+            )
+        finally:
+            cache.delete(lock_key)
+        return report
+    
+    @classmethod
+    def _grouped_counts(cls, date_range, statuses, order_group, stats_group,
+                        order_filter=Q(), stats_filter=Q()):
+        """
+        Число заявок периода по группам: всего и по статусам.
+        Целые прошедшие дни суммируются по OrderDailyStats, сегодняшний
+        день (еще меняется) считается по заявкам; группы объединяются.
+        
+        Args:
+            date_range (tuple): (date_from, date_to) из _get_date_range
+            statuses (tuple): Статусы, считаемые отдельно
+            order_group (tuple): Поля группировки заявок (ключи результата)
+            stats_group (tuple): Соответствующие поля среза
+            order_filter (Q): Дополнительное условие на заявки
+            stats_filter (Q): То же условие для среза
+            
+        Returns:
+            list[dict]: Строки с полями order_group, total и statuses
+        """
+        stats_range, orders_range = cls._split_range(date_range)
+        
+        sources = []
+        if stats_range:
+            sources.append((
+                OrderDailyStats.objects.filter(stats_filter, day__gte=stats_range[0], day__lt=stats_range[1]),
+                stats_group,
+                lambda condition=None: Coalesce(Sum('count', filter=condition), 0)
+            ))
+        if orders_range:
+            sources.append((
+                Order.objects.filter(order_filter, cls._period_filter(orders_range)),
+                order_group,
+                lambda condition=None: Count('id', filter=condition)
+            ))
+        
+        merged = {}
+        for queryset, group, counter in sources:
+            rows = queryset.values(*group).annotate(
+                total=counter(),
+                **{status: counter(Q(status=status)) for status in statuses}
+            ).order_by()
+            for row in rows:
+                key = tuple(row[field] for field in group)
+                target = merged.setdefault(key, {
+                    **dict(zip(order_group, key)),
+                    'total': 0,
+                    **{status: 0 for status in statuses}
+                })
+                for field in ('total',) + statuses:
+                    target[field] += row[field]
+        
+        # Группы, обнуленные в срезе переходами, в отчет не попадают
+        return [row for row in merged.values() if row['total']]
+    
+    @staticmethod
+    def _split_range(date_range):
+        """
+        Деление диапазона дат на прошедшие дни (из среза)
+        и сегодняшний день и далее (из заявок).
+        
+        Returns:
+            tuple: (stats_range | None, orders_range | None)
+        """
+        start, end = date_range
+        today = timezone.localdate()
+        stats_range = (start, min(end, today)) if start < min(end, today) else None
+        orders_range = (max(start, today), end) if max(start, today) < end else None
+        return stats_range, orders_range
+    
+    @staticmethod
+    def _period_filter(date_range):
+        """
+        Условие на created_at для диапазона дат: полуинтервал
+        [начало первого дня, начало дня date_to) в текущем часовом поясе.
+        Границы - aware datetime, поэтому сравнение идет с timestamptz
+        напрямую и обслуживается индексом по created_at (BETWEEN с датами
+        включал бы заявки ровно в полночь конечного дня).
+        
+        Args:
+            date_range (tuple): (date_from, date_to) из _get_date_range
+            
+        Returns:
+            Q: Условие фильтрации заявок
+        """
+        start, end = (
+            timezone.make_aware(datetime.combine(day, time.min))
+            for day in date_range
+        )
+        return Q(created_at__gte=start, created_at__lt=end)
+    
     @staticmethod
     def _get_date_range(period, date_from, date_to):
         """
-        Вычисляет диапазон дат для отчетов.
+        Вычисляет диапазон дат для отчетов (конечная дата не входит).
         
         Args:
             period (str): Ключ периода
-            date_from (date): Начальная дата
-            date_to (date): Конечная дата
+            date_from (date | str): Начальная дата
+            date_to (date | str): Конечная дата
             
         Returns:
             tuple: (date_from, date_to)
         """
-        today = timezone.now().date()
+        today = timezone.localdate()
+        
+        # Даты произвольного периода приходят из query-параметров строками
+        if isinstance(date_from, str):
+            date_from = parse_date(date_from)
+        if isinstance(date_to, str):
+            date_to = parse_date(date_to)
         
         if period == 'today':
             return (today, today + timedelta(days=1))
@@ -0,0 +1,273 @@
+import asyncio
+import concurrent.futures
+import heapq
+import logging
+import threading
+import time
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты "ведро токенов".
+    Токены пополняются со скоростью rate в секунду до capacity;
+    pause() блокирует ведро целиком (ответ 429 с retry_after).
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.blocked_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """
+        Через сколько секунд будет доступен токен (0 - доступен сейчас).
+        Токен не расходуется.
+        """
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            wait = 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            return max(wait, self.blocked_until - now, 0)
+
+    def reserve(self):
+        """
+        Забирает токен в долг.
+
+        Returns:
+            float: Сколько секунд нужно подождать, прежде чем им воспользоваться
+        """
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens -= 1
+            wait = 0 if self.tokens >= 0 else -self.tokens / self.rate
+            return max(wait, self.blocked_until - now, 0)
+
+    def pause(self, seconds):
+        """Блокирует выдачу токенов на seconds секунд."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+
+class TelegramSender:
+    """
+    Отправка сообщений через Telegram Bot API с соблюдением лимитов:
+    общий для бота (~30 сообщений/с) и на каждый чат (1/с для личных,
+    20/мин для групп). Пакет сообщений выстраивается в очередь по времени
+    готовности: сообщения в "остывающий" чат не задерживают остальные.
+    Ответ 429 приостанавливает отправку на retry_after и ставит сообщение
+    в очередь повторно.
+
+    Запросы выполняет asyncio-клиент с постоянным пулом соединений
+    в фоновом потоке: до concurrency запросов одновременно, поэтому
+    скорость рассылки ограничена лимитами Telegram, а не задержкой сети.
+    send_batch() - синхронный фасад для существующего кода.
+
+    Лимиты действуют в пределах процесса: при нескольких воркерах
+    TELEGRAM_GLOBAL_RATE задается как доля общего лимита.
+    """
+
+    # Лимит для групп и каналов (chat_id отрицательный)
+    GROUP_CHAT_RATE = 20 / 60
+    # Запас от лимитов: Telegram считает сообщения в скользящем окне,
+    # и отправка точно на границе лимита из-за сетевого джиттера дает 429
+    RATE_MARGIN = 0.9
+    # Повторы при 429; слишком долгий retry_after не ждем, а отдаем диспетчеру
+    MAX_RETRIES = 3
+    MAX_RETRY_AFTER = 60
+    # Одновременных запросов (и соединений в пуле)
+    CONCURRENCY = 10
+
+    # Предельное время отправки пакета, секунд
+    BATCH_TIMEOUT = 120
+
+    def __init__(self, token, api_url='https://api.telegram.org', global_rate=30, chat_rate=1,
+                 timeout=10, concurrency=CONCURRENCY, batch_timeout=BATCH_TIMEOUT, clock=time.monotonic):
+        self.url = f'{api_url.rstrip("/")}/bot{token}/sendMessage'
+        self.chat_rate = chat_rate * self.RATE_MARGIN
+        self.timeout = timeout
+        self.batch_timeout = batch_timeout
+        self.concurrency = concurrency
+        self.clock = clock
+        # Емкость 1: всплеск равномерно растягивается, а не уходит пачкой
+        self.global_bucket = TokenBucket(global_rate * self.RATE_MARGIN, capacity=1, clock=clock)
+        self.chat_buckets = {}
+        self._loop = None
+        self._client = None
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """Отправитель с параметрами из настроек проекта."""
+        return cls(
+            token=settings.TELEGRAM_BOT_TOKEN,
+            api_url=settings.TELEGRAM_API_URL,
+            global_rate=settings.TELEGRAM_GLOBAL_RATE,
+            chat_rate=settings.TELEGRAM_CHAT_RATE,
+            concurrency=settings.TELEGRAM_CONCURRENCY,
+            batch_timeout=settings.TELEGRAM_BATCH_TIMEOUT
+        )
+
+    def _ensure_loop(self):
+        """
+        Фоновый поток с event loop и HTTP-клиентом.
+        Создается при первой отправке (после fork воркера Celery),
+        живет до close() и переиспользует соединения между пакетами.
+        """
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='telegram-sender', daemon=True).start()
+                self._client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.concurrency,
+                        max_keepalive_connections=self.concurrency
+                    )
+                )
+                self._loop = loop
+        return self._loop
+
+    def close(self):
+        """Закрывает пул соединений и останавливает фоновый поток."""
+        with self._start_lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = self._client = None
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            rate = self.GROUP_CHAT_RATE * self.RATE_MARGIN if str(chat_id).startswith('-') else self.chat_rate
+            # Емкость 1: сообщения в один чат не уходят пачкой
+            bucket = self.chat_buckets[chat_id] = TokenBucket(rate, capacity=1, clock=self.clock)
+        return bucket
+
+    def send_batch(self, messages):
+        """
+        Отправка пакета сообщений с соблюдением лимитов (синхронный фасад).
+        Пакет, не уложившийся в batch_timeout, прерывается: недоставленные
+        к этому моменту сообщения считаются неудачными.
+
+        Args:
+            messages (list[tuple]): Пары (chat_id, text)
+
+        Returns:
+            list[bool]: Результат по каждому сообщению в исходном порядке
+        """
+        if not messages:
+            return []
+        results = [False] * len(messages)
+        future = asyncio.run_coroutine_threadsafe(
+            self.send_batch_async(messages, results),
+            self._ensure_loop()
+        )
+        try:
+            return future.result(timeout=self.batch_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            logger.warning(
+                'Отправка пакета из %s сообщений прервана по таймауту %s с',
+                len(messages), self.batch_timeout
+            )
+            return list(results)
+
+    async def send_batch_async(self, messages, results=None):
+        """
+        Планировщик пакета: выдает сообщения по времени готовности
+        и лимитам, запросы выполняются параллельно (до concurrency).
+        results заполняется по мере доставки.
+        """
+        results = results if results is not None else [False] * len(messages)
+        # Очередь: (время готовности, порядковый номер, индекс сообщения, попытка)
+        queue = [(0, index, index, 0) for index in range(len(messages))]
+        sequence = len(messages)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        in_flight = set()
+
+        async def deliver(index, attempt):
+            nonlocal sequence
+            chat_id, text = messages[index]
+            try:
+                retry_after = await self._post(chat_id, text)
+            finally:
+                semaphore.release()
+
+            if retry_after is None:
+                results[index] = True
+            elif retry_after and attempt < self.MAX_RETRIES and retry_after <= self.MAX_RETRY_AFTER:
+                # Telegram не сообщает, какой лимит превышен - ждут все
+                self.global_bucket.pause(retry_after)
+                self._chat_bucket(chat_id).pause(retry_after)
+                sequence += 1
+                heapq.heappush(queue, (self.clock() + retry_after, sequence, index, attempt + 1))
+
+        while queue or in_flight:
+            if not queue:
+                # Ждем ответов: 429 может вернуть сообщение в очередь
+                await asyncio.wait(set(in_flight), return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            ready_at, _, index, attempt = heapq.heappop(queue)
+            chat_bucket = self._chat_bucket(messages[index][0])
+
+            now = self.clock()
+            ready_at = max(ready_at, now + chat_bucket.delay())
+            if ready_at > now and queue and queue[0][0] < ready_at:
+                # Чат еще "остывает" - пропускаем вперед готовые сообщения
+                sequence += 1
+                heapq.heappush(queue, (ready_at, sequence, index, attempt))
+                continue
+            if ready_at > now:
+                await asyncio.sleep(ready_at - now)
+
+            await asyncio.sleep(max(self.global_bucket.reserve(), chat_bucket.reserve()))
+            await semaphore.acquire()
+            task = asyncio.ensure_future(deliver(index, attempt))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        return results
+
+    async def _post(self, chat_id, text):
+        """
+        Один вызов sendMessage.
+
+        Returns:
+            None - сообщение принято;
+            float - превышен лимит, повторить через столько секунд;
+            0 - ошибка, повтор не поможет (или сеть недоступна)
+        """
+        try:
+            response = await self._client.post(self.url, json={
+                'chat_id': chat_id,
+                'text': text,
+                'parse_mode': 'HTML'
+            })
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning('Ошибка отправки Telegram сообщения в чат %s: %s', chat_id, e)
+            return 0
+
+        if data.get('ok'):
+            return None
+
+        if data.get('error_code') == 429:
+            return float(data.get('parameters', {}).get('retry_after', 1))
+
+        logger.warning('Telegram отклонил сообщение в чат %s: %s', chat_id, data.get('description'))
+        return 0
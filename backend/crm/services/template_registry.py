@@ -0,0 +1,78 @@
+import threading
+from django.template import engines
+from django.template.loader import get_template
+from ..models import NotificationTemplate
+from ..utils.versioning import get_version
+
+
+class NotificationTemplateRegistry:
+    """
+    Реестр скомпилированных шаблонов уведомлений.
+    Все активные шаблоны загружаются одним запросом и компилируются
+    один раз; копия в памяти процесса действует, пока не изменится
+    версия 'notification_templates' (сигналы NotificationTemplate).
+    Типы без шаблона в БД берутся из файлов notifications/<type>.txt.
+    """
+
+    VERSION_SCOPE = 'notification_templates'
+    FILE_TEMPLATE = 'notifications/{}.txt'
+
+    _version = None
+    _templates = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def _load(cls):
+        """
+        Актуальный набор шаблонов {type: скомпилированный шаблон}.
+        Запрос к БД - только после изменения версии.
+        """
+        version = get_version(cls.VERSION_SCOPE)
+        if version == cls._version:
+            return cls._templates
+
+        engine = engines['django']
+        templates = {
+            template_type: engine.from_string(content)
+            for template_type, content in NotificationTemplate.objects.filter(
+                is_active=True
+            ).values_list('type', 'content')
+        }
+        for template_type, _ in NotificationTemplate.TYPE_CHOICES:
+            if template_type not in templates:
+                templates[template_type] = get_template(cls.FILE_TEMPLATE.format(template_type))
+
+        with cls._lock:
+            cls._templates = templates
+            cls._version = version
+        return templates
+
+    @classmethod
+    def render(cls, template_type, context):
+        """
+        Текст одного уведомления.
+
+        Args:
+            template_type (str): Тип из NotificationTemplate.TYPE_CHOICES
+            context (dict): Контекст шаблона
+
+        Returns:
+            str: Текст сообщения
+        """
+        return cls.render_many(template_type, [context])[0]
+
+    @classmethod
+    def render_many(cls, template_type, contexts):
+        """
+        Тексты для пакета уведомлений одного типа за один проход:
+        шаблон выбирается один раз, затем рендерится для каждого контекста.
+
+        Args:
+            template_type (str): Тип из NotificationTemplate.TYPE_CHOICES
+            contexts (list[dict]): Контексты (например, по получателям)
+
+        Returns:
+            list[str]: Тексты в порядке контекстов
+        """
+        template = cls._load()[template_type]
+        return [template.render(context).strip() for context in contexts]
@@ -1,6 +1,7 @@
 import re
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
+from ..utils.phone import normalize_phone
 
 class PhoneValidator:
     """
@@ -17,13 +18,7 @@ class PhoneValidator:
             )
         
         # Нормализация номера
-        normalized = re.sub(r'[^\d]', '', value)
-        if normalized.startswith('8'):
-            normalized = '7' + normalized[1:]
-        elif not normalized.startswith('7'):
-            normalized = '7' + normalized
-        
-        return f'+{normalized}'
+        return f'+{normalize_phone(value)}'
 
 class AddressValidator:
     """
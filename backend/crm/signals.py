@@ -1,41 +1,174 @@
+import logging
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
 from django.dispatch import Signal
+from crm.models import (
+    Order, Address, StatusHistory, ManagerStatus, City, User, Role, NotificationTemplate, Blacklist
+)
+from crm.utils.versioning import bump_version_on_commit
+from crm.services.recipient_directory import RecipientDirectory
+from crm.services.blacklist_filter import BlacklistFilter
+from crm.services.order_service import OrderService
+from crm.services.order_stats_service import OrderStatsService
+
+logger = logging.getLogger(__name__)
 
 # Сигнал при добавлении в черный список
 client_blacklisted = Signal()
 """
 Аргументы:
-- entry: BlacklistEntry - созданная запись
+- entry: Blacklist - созданная или обновленная запись
 - order_id: int | None - ID связанной заявки
+- job: BlacklistPropagationJob - задание пометки заявок клиента
 """
 
 # Сигнал при удалении из черного списка
 client_unblocked = Signal()
 """
 Аргументы:
-- entry: BlacklistEntry - удаляемая запись
-- order_ids: List[int] - IDs заявок, которые были разблокированы
+- entry: Blacklist - удаляемая запись
+- job: BlacklistPropagationJob - задание снятия флагов с заявок клиента
 """
 
 def handle_client_blacklisted(sender, **kwargs):
     """
-    Обработчик сигнала - отправка уведомления о блокировке.
+    Обработчик сигнала - журналирование блокировки.
     """
-    from crm.tasks import send_blacklist_notification
-    send_blacklist_notification.delay(
-        kwargs['entry'].id,
-        kwargs.get('order_id')
+    logger.info(
+        "Клиент %s заблокирован, задание пометки заявок #%s",
+        kwargs['entry'].client_name,
+        kwargs['job'].id
     )
 
 def handle_client_unblocked(sender, **kwargs):
     """
-    Обработчик сигнала - логирование разблокировки.
+    Обработчик сигнала - журналирование разблокировки.
     """
-    from crm.models import SystemLog
-    SystemLog.objects.create(
-        action=f"Клиент {kwargs['entry'].client_name} разблокирован",
-        details=f"Затронуто заявок: {len(kwargs['order_ids'])}"
+    logger.info(
+        "Клиент %s разблокирован, задание снятия флагов #%s",
+        kwargs['entry'].client_name,
+        kwargs['job'].id
     )
 
 # Подключение сигналов
 client_blacklisted.connect(handle_client_blacklisted)
-client_unblocked.connect(handle_client_unblocked)
\ No newline at end of file
+client_unblocked.connect(handle_client_unblocked)
+
+# Версии коллекций для условных GET-запросов (ETag)
+VERSIONED_MODELS = {
+    # Лента заявок: строки заявок и их адресов
+    Order: 'orders',
+    Address: 'orders',
+    StatusHistory: 'status_history',
+    ManagerStatus: 'manager_status',
+    City: 'cities',
+    # Реестр шаблонов уведомлений перекомпилирует шаблоны по этой версии
+    NotificationTemplate: 'notification_templates',
+}
+
+def bump_collection_version(sender, **kwargs):
+    """
+    Обработчик сигнала - инвалидация ETag коллекции при изменении записи.
+    """
+    bump_version_on_commit(VERSIONED_MODELS[sender])
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_collection_version, sender=model)
+    post_delete.connect(bump_collection_version, sender=model)
+
+# Поля пользователя, которые лента заявок показывает как имя менеджера
+MANAGER_NAME_FIELDS = {'first_name', 'last_name'}
+
+def bump_orders_on_manager_rename(sender, **kwargs):
+    """
+    Обработчик сигнала - инвалидация ETag ленты заявок при смене имени
+    пользователя (сохранения только last_login и т.п. пропускаются).
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not MANAGER_NAME_FIELDS & set(update_fields):
+        return
+    bump_version_on_commit('orders')
+
+post_save.connect(bump_orders_on_manager_rename, sender=User)
+post_delete.connect(bump_orders_on_manager_rename, sender=User)
+
+# Поля пользователя, от которых зависит справочник получателей уведомлений
+RECIPIENT_FIELDS = {'role', 'telegram_chat_id'}
+
+def invalidate_recipient_directory(sender, **kwargs):
+    """
+    Обработчик сигнала - сброс справочника получателей при смене роли
+    или chat_id пользователя (сохранения только last_login и т.п.
+    пропускаются) и при любом изменении самой роли.
+    """
+    update_fields = kwargs.get('update_fields')
+    if sender is User and update_fields is not None and not RECIPIENT_FIELDS & set(update_fields):
+        return
+    RecipientDirectory.invalidate()
+
+for model in (User, Role):
+    post_save.connect(invalidate_recipient_directory, sender=model)
+    post_delete.connect(invalidate_recipient_directory, sender=model)
+
+def publish_blacklisted_phone(sender, instance, **kwargs):
+    """
+    Обработчик сигнала - добавление телефона в фильтры черного списка.
+    Удаление не обрабатывается: лишний номер в фильтре безопасен.
+    """
+    BlacklistFilter.publish([instance.phone_normalized])
+
+post_save.connect(publish_blacklisted_phone, sender=Blacklist)
+
+# Поля заявки, от которых зависят отчеты (день создания, город, менеджер, статус)
+REPORT_FIELDS = {'status', 'assigned_to', 'address', 'created_at'}
+
+def invalidate_order_reports(sender, instance, **kwargs):
+    """
+    Обработчик сигнала - сброс кэша отчетов за месяц создания заявки
+    при любом сохранении, меняющем отчетные поля, в том числе в обход
+    OrderService (сохранения только is_blacklisted и т.п. пропускаются).
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not REPORT_FIELDS & set(update_fields):
+        return
+    OrderStatsService.invalidate_reports([timezone.localdate(instance.created_at)])
+
+def record_deleted_order(sender, instance, **kwargs):
+    """
+    Обработчик сигнала - вычет удаленной заявки из суточного среза
+    (и сброс кэша отчетов за ее месяц).
+    """
+    OrderStatsService.record_deleted(instance)
+
+post_save.connect(invalidate_order_reports, sender=Order)
+post_delete.connect(record_deleted_order, sender=Order)
+
+# Поля адреса и города, входящие в поисковый документ заявки
+ADDRESS_SEARCH_FIELDS = {'city', 'street', 'house'}
+CITY_SEARCH_FIELDS = {'name'}
+
+def refresh_address_search_documents(sender, instance, created, **kwargs):
+    """
+    Обработчик сигнала - пересборка поисковых документов заявок
+    по адресу в той же транзакции (заявок у адреса немного).
+    """
+    update_fields = kwargs.get('update_fields')
+    if created or (update_fields is not None and not ADDRESS_SEARCH_FIELDS & set(update_fields)):
+        return
+    OrderService.refresh_search_documents(Order.objects.filter(address=instance))
+
+def refresh_city_search_documents(sender, instance, created, **kwargs):
+    """
+    Обработчик сигнала - пересборка поисковых документов заявок города
+    фоновой задачей после коммита. robust=True: ошибка брокера не отменяет
+    сохранение города, документы тогда пересобирает backfill_phone_normalized.
+    """
+    update_fields = kwargs.get('update_fields')
+    if created or (update_fields is not None and not CITY_SEARCH_FIELDS & set(update_fields)):
+        return
+    from crm.tasks import refresh_city_search_documents as refresh_task
+    transaction.on_commit(lambda: refresh_task.delay(instance.id), robust=True)
+
+post_save.connect(refresh_address_search_documents, sender=Address)
+post_save.connect(refresh_city_search_documents, sender=City)
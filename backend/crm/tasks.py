@@ -1,7 +1,13 @@
 # crm/tasks.py
-from config.celery import shared_task
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
 from .models import Order
+from .services.blacklist_service import BlacklistService
 from .services.notification_service import NotificationService
+from .services.order_service import OrderService
+from .services.order_stats_service import OrderStatsService
 
 @shared_task
 def check_pending_orders():
@@ -9,4 +15,79 @@ def check_pending_orders():
     pending_orders = Order.objects.filter(status='pending')
     for order in pending_orders:
         NotificationService.send_pending_notification(order)
-    return f"Checked {pending_orders.count()} pending orders"
\ No newline at end of file
+    return f"Checked {pending_orders.count()} pending orders"
+
+@shared_task(ignore_result=True)
+def dispatch_notifications(max_batches=50):
+    """
+    Разбор outbox уведомлений пакетами.
+    Запускается после коммита изменений заявок и периодически (beat),
+    несколько воркеров могут работать одновременно.
+    
+    Args:
+        max_batches (int): Ограничение числа пакетов за один запуск
+    """
+    for _ in range(max_batches):
+        if NotificationService.dispatch_pending() < NotificationService.DISPATCH_BATCH_SIZE:
+            break
+
+@shared_task(ignore_result=True)
+def retry_notifications(max_batches=50):
+    """
+    Повторная отправка неудачных уведомлений, у которых наступило
+    время следующей попытки. Очередь разбирается пакетами.
+    
+    Args:
+        max_batches (int): Ограничение числа пакетов за один запуск
+    """
+    for _ in range(max_batches):
+        if NotificationService.retry_failed() < NotificationService.DISPATCH_BATCH_SIZE:
+            break
+
+@shared_task(ignore_result=True)
+def archive_notifications():
+    """
+    Перенос старых уведомлений в архив и очистка архива
+    по срокам NOTIFICATION_RETENTION_DAYS и NOTIFICATION_ARCHIVE_RETENTION_DAYS.
+    """
+    now = timezone.now()
+    NotificationService.archive_old(now - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS))
+    if settings.NOTIFICATION_ARCHIVE_RETENTION_DAYS:
+        NotificationService.purge_archive(now - timedelta(days=settings.NOTIFICATION_ARCHIVE_RETENTION_DAYS))
+
+@shared_task(ignore_result=True)
+def propagate_blacklist(job_id):
+    """
+    Распространение флага черного списка на заявки клиента
+    (BlacklistPropagationJob). Повторный запуск безопасен.
+    
+    Args:
+        job_id (int): ID задания
+    """
+    BlacklistService.propagate(job_id)
+
+@shared_task(ignore_result=True)
+def resume_blacklist_propagation():
+    """Периодический перезапуск зависших заданий распространения ЧС"""
+    BlacklistService.resume_stale_jobs()
+
+@shared_task(ignore_result=True)
+def repair_order_stats():
+    """
+    Пересборка суточного среза заявок за последние ORDER_STATS_REPAIR_DAYS
+    дней: исправляет расхождения от изменений заявок в обход
+    OrderService (админка, ручные правки).
+    """
+    today = timezone.localdate()
+    OrderStatsService.rebuild(today - timedelta(days=settings.ORDER_STATS_REPAIR_DAYS), today)
+
+@shared_task(ignore_result=True)
+def refresh_city_search_documents(city_id):
+    """
+    Пересборка поисковых документов заявок города после его переименования.
+    Выполняется в фоне: заявок одного города могут быть миллионы.
+    
+    Args:
+        city_id (int): ID города
+    """
+    OrderService.refresh_search_documents(Order.objects.filter(address__city_id=city_id))
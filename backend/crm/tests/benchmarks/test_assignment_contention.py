@@ -0,0 +1,84 @@
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import TransactionTestCase
+from crm.models import Order, ManagerStatus, User, Role, City, Address
+from crm.services.order_service import OrderService
+
+# Параметры нагрузки переопределяются переменными окружения
+THREADS = int(os.environ.get('CRM_BENCHMARK_THREADS', 16))
+MANAGERS = int(os.environ.get('CRM_BENCHMARK_MANAGERS', 20))
+ORDERS = int(os.environ.get('CRM_BENCHMARK_ORDERS', 200))
+
+
+@skipUnless(os.environ.get('CRM_BENCHMARKS'), 'Бенчмарки запускаются при CRM_BENCHMARKS=1')
+@skipUnless(connection.vendor == 'postgresql', 'Блокировки строк проверяются на PostgreSQL')
+class AssignmentContentionBenchmark(TransactionTestCase):
+    """
+    Параллельные координаторы назначают заявки на общий пул менеджеров.
+    Каждый поток выбирает случайную пару (заявка, менеджер), поэтому
+    конфликты за одного менеджера и одну заявку - постоянные.
+    Проверяется отсутствие двойных назначений, выводится пропускная способность.
+
+    Запуск:
+        CRM_BENCHMARKS=1 python manage.py test crm.tests.benchmarks.test_assignment_contention
+    """
+
+    def setUp(self):
+        self.coordinator = User.objects.create_user(
+            username='coordinator',
+            password='testpass123',
+            role=Role.objects.create(name=Role.ROLE_COORDINATOR)
+        )
+        manager_role = Role.objects.create(name=Role.ROLE_MANAGER)
+        self.managers = []
+        for i in range(MANAGERS):
+            manager = User.objects.create_user(username=f'manager{i}', password='testpass123', role=manager_role)
+            ManagerStatus.objects.create(user=manager)
+            self.managers.append(manager.id)
+
+        city = City.objects.create(name='Москва')
+        address = Address.objects.create(city=city, street='Тестовая', house='1')
+        self.orders = [
+            Order.objects.create(client_name=f'Клиент {i}', phone=f'+7999{i:07d}', address=address).id
+            for i in range(ORDERS)
+        ]
+
+    def _attempt(self, seed):
+        rnd = random.Random(seed)
+        try:
+            OrderService.assign_order(rnd.choice(self.orders), rnd.choice(self.managers), self.coordinator)
+            return True
+        except ValueError:
+            return False
+        finally:
+            connections.close_all()
+
+    def test_concurrent_assignment(self):
+        attempts = ORDERS * 2
+        started = time.perf_counter()
+        # Измеряется только транзакция назначения, брокер уведомлений не участвует
+        with mock.patch('crm.tasks.dispatch_notifications.delay'), \
+                ThreadPoolExecutor(max_workers=THREADS) as pool:
+            results = list(pool.map(self._attempt, range(attempts)))
+        elapsed = time.perf_counter() - started
+
+        assigned = ManagerStatus.objects.filter(status=ManagerStatus.STATUS_BUSY).count()
+        per_manager = Order.objects.filter(
+            status=Order.STATUS_ASSIGNED
+        ).values('assigned_to').annotate(total=Count('id'))
+
+        print(
+            f'\nНазначения: {attempts} попыток в {THREADS} потоков за {elapsed:.2f} с '
+            f'({attempts / elapsed:.0f} оп/с), успешно {sum(results)}, '
+            f'отклонено {attempts - sum(results)}'
+        )
+
+        # Каждый менеджер - не более одной заявки, успешных назначений ровно столько, сколько занятых
+        self.assertTrue(all(row['total'] == 1 for row in per_manager))
+        self.assertEqual(sum(results), assigned)
+        self.assertEqual(len(per_manager), assigned)
@@ -0,0 +1,67 @@
+import os
+import statistics
+import time
+from unittest import skipUnless
+from django.test import TestCase
+from crm.models import Blacklist
+from crm.services.blacklist_filter import BlacklistFilter
+
+# Параметры нагрузки переопределяются переменными окружения
+BLACKLIST = int(os.environ.get('CRM_BENCHMARK_BLACKLIST', 50000))
+PROBES = int(os.environ.get('CRM_BENCHMARK_PROBES', 10000))
+
+
+@skipUnless(os.environ.get('CRM_BENCHMARKS'), 'Бенчмарки запускаются при CRM_BENCHMARKS=1')
+class BlacklistFilterBenchmark(TestCase):
+    """
+    Стоимость проверки черного списка при приеме заявки от клиента не из ЧС:
+    проверка фильтром в памяти против запроса exists(), который она заменяет.
+    Замеряется только проверка, а не весь create_order: остальная работа
+    приема одинакова в обоих случаях и лишь зашумляет разницу.
+
+    Запуск:
+        CRM_BENCHMARKS=1 python manage.py test crm.tests.benchmarks.test_blacklist_filter
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Blacklist.objects.bulk_create([
+            Blacklist(
+                client_name=f'Клиент {i}',
+                phone=f'+7999{i:07d}',
+                phone_normalized=f'7999{i:07d}',
+                reason='Тест'
+            )
+            for i in range(BLACKLIST)
+        ], batch_size=5000)
+        BlacklistFilter.invalidate()
+
+    @staticmethod
+    def _measure(check):
+        timings = []
+        positives = 0
+        for i in range(PROBES):
+            started = time.perf_counter()
+            positives += bool(check(f'7888{i:07d}'))
+            timings.append(time.perf_counter() - started)
+        return statistics.mean(timings) * 1e6, statistics.median(timings) * 1e6, positives
+
+    def test_check_latency(self):
+        # Прогрев: построение фильтра и соединения
+        BlacklistFilter._filter = None
+        BlacklistFilter.might_contain('')
+
+        query_mean, query_median, _ = self._measure(
+            lambda phone: Blacklist.objects.filter(
+                phone_normalized=phone,
+                client_name='Новый клиент'
+            ).exists()
+        )
+        filter_mean, filter_median, false_positives = self._measure(BlacklistFilter.might_contain)
+
+        print(
+            f'\nПроверка {PROBES} телефонов при ЧС из {BLACKLIST} записей: '
+            f'запрос exists() - среднее {query_mean:.1f} мкс, медиана {query_median:.1f} мкс; '
+            f'фильтр в памяти - среднее {filter_mean:.1f} мкс, медиана {filter_median:.1f} мкс, '
+            f'ложных срабатываний {false_positives} (каждое - тот же запрос exists())'
+        )
@@ -0,0 +1,119 @@
+import os
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
+from django.test import TestCase, override_settings
+from crm.models import Order, NotificationLog, User, City, Address
+from crm.services.notification_service import NotificationService
+
+# Параметры нагрузки переопределяются переменными окружения
+EVENTS = int(os.environ.get('CRM_BENCHMARK_EVENTS', 800))
+COORDINATORS = int(os.environ.get('CRM_BENCHMARK_COORDINATORS', 5))
+WINDOW = int(os.environ.get('CRM_BENCHMARK_WINDOW', 30))
+# Интервал запуска диспетчера (периодический запуск beat)
+TICK = 30
+
+
+class CountingSender:
+    """Отправитель-заглушка: считает сообщения вместо отправки в Telegram"""
+
+    def __init__(self):
+        self.messages = 0
+
+    def send_batch(self, messages):
+        self.messages += len(messages)
+        return [True] * len(messages)
+
+
+@skipUnless(os.environ.get('CRM_BENCHMARKS'), 'Бенчмарки запускаются при CRM_BENCHMARKS=1')
+class NotificationDigestBenchmark(TestCase):
+    """
+    Воспроизведение рабочего дня событий (завершения и отмены заявок
+    с пиками утром и вечером) с рассылкой всем координаторам.
+    Число сообщений в Telegram без сводок сравнивается со сводками
+    в окне WINDOW секунд. Время диспетчера моделируется.
+
+    Запуск:
+        CRM_BENCHMARKS=1 python manage.py test crm.tests.benchmarks.test_notification_digest
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='Москва')
+        address = Address.objects.create(city=city, street='Тестовая', house='1')
+        cls.orders = Order.objects.bulk_create([
+            Order(client_name=f'Клиент {i}', phone=f'+7999{i:07d}', address=address)
+            for i in range(100)
+        ])
+        cls.coordinators = User.objects.bulk_create([
+            User(username=f'coordinator{i}', telegram_chat_id=str(i))
+            for i in range(COORDINATORS)
+        ])
+
+    def _day(self):
+        """События дня: (время, тип), плотнее в часы пик"""
+        rng = random.Random(42)
+        start = datetime(2026, 3, 2, 9, tzinfo=dt_timezone.utc)
+        events = []
+        for _ in range(EVENTS):
+            hour = rng.choice([0, 1, 1, 2, 2, 2, 3, 4, 5, 6, 7, 7, 7, 8, 8, 9])
+            moment = start + timedelta(hours=hour, seconds=rng.uniform(0, 3600))
+            message_type = rng.choice([NotificationLog.NOTIFICATION_COMPLETED] * 4 + [NotificationLog.NOTIFICATION_CANCELED])
+            events.append((moment, message_type))
+        events.sort()
+        return start, events
+
+    def _replay(self, window):
+        NotificationLog.objects.all().delete()
+        sender = CountingSender()
+        start, events = self._day()
+        rng = random.Random(7)
+        now = start
+
+        with override_settings(NOTIFICATION_DIGEST_WINDOW=window), \
+                mock.patch.object(NotificationService, '_sender', sender), \
+                mock.patch('django.utils.timezone.now', lambda: now):
+            position = 0
+            while position < len(events) or NotificationLog.objects.filter(status=NotificationLog.STATUS_PENDING).exists():
+                now += timedelta(seconds=TICK)
+                batch = []
+                while position < len(events) and events[position][0] <= now:
+                    moment, message_type = events[position]
+                    order = rng.choice(self.orders)
+                    batch.extend(
+                        NotificationLog(
+                            order=order,
+                            recipient=coordinator,
+                            message_type=message_type,
+                            message_text=f'{message_type} {order.id}',
+                            created_at=moment
+                        )
+                        for coordinator in self.coordinators
+                    )
+                    position += 1
+                if batch:
+                    created = NotificationLog.objects.bulk_create(batch)
+                    # auto_now_add перезаписывает created_at - восстанавливаем время события
+                    for notification, source in zip(created, batch):
+                        notification.created_at = source.created_at
+                    NotificationLog.objects.bulk_update(created, ['created_at'])
+
+                while NotificationService.dispatch_pending() == NotificationService.DISPATCH_BATCH_SIZE:
+                    pass
+
+        return sender.messages
+
+    def test_digest_volume(self):
+        plain = self._replay(window=0)
+        digest = self._replay(window=WINDOW)
+        notifications = EVENTS * COORDINATORS
+
+        print(
+            f'\nДень: {EVENTS} событий x {COORDINATORS} координаторов = {notifications} уведомлений. '
+            f'Сообщений без сводок: {plain}, со сводками (окно {WINDOW} с): {digest} '
+            f'(-{(1 - digest / plain) * 100:.0f}%)'
+        )
+
+        self.assertEqual(plain, notifications)
+        self.assertLess(digest, plain)
+        self.assertEqual(NotificationLog.objects.filter(status=NotificationLog.STATUS_SENT).count(), notifications)
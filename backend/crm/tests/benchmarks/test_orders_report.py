@@ -0,0 +1,150 @@
+import os
+import statistics
+import time
+import warnings
+from datetime import date, timedelta
+from unittest import skipUnless
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from crm.models import Order, City, Address
+from crm.services.order_stats_service import OrderStatsService
+from crm.services.report_service import ReportService
+
+# Параметры нагрузки переопределяются переменными окружения
+ORDERS = int(os.environ.get('CRM_BENCHMARK_REPORT_ORDERS', 5000000))
+CITIES = int(os.environ.get('CRM_BENCHMARK_CITIES', 20))
+RUNS = int(os.environ.get('CRM_BENCHMARK_RUNS', 5))
+# Заявки равномерно распределены по году, отчет строится за месяц
+DAYS = 365
+START = date(2025, 1, 1)
+REPORT_FROM = date(2025, 6, 1)
+REPORT_TO = date(2025, 7, 1)
+
+
+def legacy_orders_report(date_range):
+    """Прежняя реализация: группировка по городам и пять count() по датам"""
+    orders = Order.objects.filter(created_at__range=date_range)
+    by_city = list(orders.values('address__city__name').annotate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        rejected=Count('id', filter=Q(status='rejected')),
+        in_progress=Count('id', filter=Q(status='in_progress'))
+    ).order_by('-total'))
+    total_stats = {
+        'total': orders.count(),
+        'completed': orders.filter(status='completed').count(),
+        'rejected': orders.filter(status='rejected').count(),
+        'in_progress': orders.filter(status='in_progress').count(),
+        'unassigned': orders.filter(status='unassigned').count()
+    }
+    return {'by_city': by_city, 'total_stats': total_stats}
+
+
+def single_pass_orders_report(date_range):
+    """Отчет одним запросом по заявкам (итоги из группировки, без суточного среза)"""
+    statuses = ReportService.ORDERS_REPORT_STATUSES
+    by_city = list(Order.objects.filter(
+        ReportService._period_filter(date_range)
+    ).values('address__city__name').annotate(
+        total=Count('id'),
+        **{status: Count('id', filter=Q(status=status)) for status in statuses}
+    ).order_by('-total'))
+    total_stats = {
+        key: sum(row[key] for row in by_city)
+        for key in ('total',) + statuses
+    }
+    return {'by_city': by_city, 'total_stats': total_stats}
+
+
+@skipUnless(os.environ.get('CRM_BENCHMARKS'), 'Бенчмарки запускаются при CRM_BENCHMARKS=1')
+@skipUnless(connection.vendor == 'postgresql', 'Таблица заполняется через generate_series')
+class OrdersReportBenchmark(TestCase):
+    """
+    Сводный отчет за месяц на таблице из ORDERS заявок за год:
+    число запросов и время прежней реализации (группировка + пять
+    count() с BETWEEN по датам), однопроходной по заявкам (итоги из
+    группировки, полуинтервал aware datetime), по суточному срезу
+    OrderDailyStats и повторного запроса из кэша отчетов.
+
+    Запуск:
+        CRM_BENCHMARKS=1 python manage.py test crm.tests.benchmarks.test_orders_report
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        address_ids = [
+            Address.objects.create(
+                city=City.objects.create(name=f'Город {i}'),
+                street='Тестовая',
+                house='1'
+            ).id
+            for i in range(CITIES)
+        ]
+        statuses = [choice for choice, _ in Order.STATUS_CHOICES]
+        # Заполнение на стороне сервера: ORM-вставка миллионов строк заняла бы часы
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Order._meta.db_table} (
+                    client_name, phone, phone_normalized, address_id, comment, status,
+                    created_at, updated_at, is_blacklisted, search_document
+                )
+                SELECT
+                    'Клиент ' || n, '+7999' || lpad(n::text, 7, '0'), '7999' || lpad(n::text, 7, '0'),
+                    (%s::bigint[])[1 + n %% %s], '', (%s::text[])[1 + n %% %s],
+                    %s::timestamptz + (n::float / %s) * interval '{DAYS} days',
+                    %s::timestamptz + (n::float / %s) * interval '{DAYS} days',
+                    false, ''
+                FROM generate_series(0, %s - 1) AS n
+                """,
+                [
+                    address_ids, len(address_ids), statuses, len(statuses),
+                    START, ORDERS, START, ORDERS, ORDERS
+                ]
+            )
+            cursor.execute(f'ANALYZE {Order._meta.db_table}')
+        OrderStatsService.rebuild()
+
+    def _measure(self, build):
+        timings = []
+        for _ in range(RUNS):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                report = build()
+                timings.append(time.perf_counter() - started)
+        return report, len(context.captured_queries), statistics.median(timings) * 1000
+
+    def test_report(self):
+        with warnings.catch_warnings():
+            # Прежняя реализация сравнивает timestamptz с naive-датами
+            warnings.simplefilter('ignore', RuntimeWarning)
+            _, legacy_queries, legacy_ms = self._measure(
+                lambda: legacy_orders_report((REPORT_FROM, REPORT_TO))
+            )
+        raw, raw_queries, raw_ms = self._measure(
+            lambda: single_pass_orders_report((REPORT_FROM, REPORT_TO))
+        )
+        report, queries, ms = self._measure(
+            lambda: ReportService._build_orders_report('custom', (REPORT_FROM, REPORT_TO))
+        )
+        cache.clear()
+        cached, cached_queries, cached_ms = self._measure(
+            lambda: ReportService.get_orders_report('custom', REPORT_FROM, REPORT_TO)
+        )
+
+        print(
+            f'\nОтчет за месяц при {ORDERS} заявках: прежний - {legacy_queries} запросов, '
+            f'медиана {legacy_ms:.1f} мс; однопроходный по заявкам - {raw_queries} запрос, '
+            f'медиана {raw_ms:.1f} мс; по суточному срезу - {queries} запрос, медиана {ms:.2f} мс; '
+            f'из кэша отчетов - {cached_queries} запросов, медиана {cached_ms:.2f} мс'
+        )
+
+        self.assertEqual(queries, 1)
+        self.assertLess(queries, legacy_queries)
+        self.assertEqual(raw['total_stats'], report['total_stats'])
+        self.assertLess(ms, raw_ms)
+        self.assertEqual(cached, report)
+        self.assertEqual(cached_queries, 0)
@@ -0,0 +1,48 @@
+import os
+import time
+from unittest import skipUnless
+from django.test import SimpleTestCase
+from crm.services.telegram_sender import TelegramSender
+from crm.tests.fake_telegram import FakeTelegramServer
+
+# Параметры нагрузки переопределяются переменными окружения
+RECIPIENTS = int(os.environ.get('CRM_BENCHMARK_RECIPIENTS', 50))
+LATENCY = float(os.environ.get('CRM_BENCHMARK_LATENCY', 0.1))
+
+
+@skipUnless(os.environ.get('CRM_BENCHMARKS'), 'Бенчмарки запускаются при CRM_BENCHMARKS=1')
+class TelegramFanoutBenchmark(SimpleTestCase):
+    """
+    Рассылка одного уведомления всем координаторам (отмена заявки).
+    Последовательная отправка (concurrency=1, как прежний цикл по получателям)
+    сравнивается с параллельной через пул соединений.
+    Фейковый Bot API отвечает с задержкой LATENCY и применяет лимиты Telegram.
+
+    Запуск:
+        CRM_BENCHMARKS=1 python manage.py test crm.tests.benchmarks.test_telegram_fanout
+    """
+
+    def _fanout(self, concurrency):
+        messages = [(str(chat_id), 'Заявка отменена') for chat_id in range(RECIPIENTS)]
+        with FakeTelegramServer(latency=LATENCY) as server:
+            sender = TelegramSender('token', api_url=server.url, concurrency=concurrency)
+            started = time.perf_counter()
+            results = sender.send_batch(messages)
+            elapsed = time.perf_counter() - started
+            sender.close()
+
+        self.assertTrue(all(results))
+        self.assertEqual(server.rejected, 0)
+        return elapsed
+
+    def test_fanout(self):
+        serial = self._fanout(concurrency=1)
+        concurrent = self._fanout(concurrency=TelegramSender.CONCURRENCY)
+
+        print(
+            f'\nРассылка {RECIPIENTS} получателям (задержка {LATENCY * 1000:.0f} мс): '
+            f'последовательно {serial:.2f} с, параллельно {concurrent:.2f} с '
+            f'(x{serial / concurrent:.1f})'
+        )
+
+        self.assertLess(concurrent, serial)
@@ -0,0 +1,47 @@
+import os
+import time
+from unittest import skipUnless
+from django.test import SimpleTestCase
+from crm.services.telegram_sender import TelegramSender
+from crm.tests.fake_telegram import FakeTelegramServer
+
+# Параметры нагрузки переопределяются переменными окружения
+MESSAGES = int(os.environ.get('CRM_BENCHMARK_MESSAGES', 300))
+CHATS = int(os.environ.get('CRM_BENCHMARK_CHATS', 100))
+GLOBAL_RATE = 30
+
+
+@skipUnless(os.environ.get('CRM_BENCHMARKS'), 'Бенчмарки запускаются при CRM_BENCHMARKS=1')
+class TelegramThroughputBenchmark(SimpleTestCase):
+    """
+    Утренний всплеск: пакет сообщений по множеству чатов, часть чатов "горячие".
+    Фейковый Bot API применяет лимиты Telegram (30 сообщений/с, 1/с на чат).
+    Выводится устойчивая скорость отправки и число ответов 429.
+
+    Запуск:
+        CRM_BENCHMARKS=1 python manage.py test crm.tests.benchmarks.test_telegram_throughput
+    """
+
+    def test_sustained_rate(self):
+        # Каждое 25-е сообщение - в один из трех "горячих" чатов
+        messages = [
+            (str(i % 3) if i % 25 == 0 else str(3 + i % CHATS), f'Сообщение {i}')
+            for i in range(MESSAGES)
+        ]
+
+        with FakeTelegramServer(global_rate=GLOBAL_RATE, chat_rate=1) as server:
+            sender = TelegramSender('token', api_url=server.url, global_rate=GLOBAL_RATE, chat_rate=1)
+            started = time.perf_counter()
+            results = sender.send_batch(messages)
+            elapsed = time.perf_counter() - started
+
+        print(
+            f'\nTelegram: {MESSAGES} сообщений в {CHATS + 3} чатов за {elapsed:.2f} с '
+            f'({MESSAGES / elapsed:.1f} сообщ/с при лимите {GLOBAL_RATE}), '
+            f'ответов 429: {server.rejected}'
+        )
+
+        self.assertTrue(all(results))
+        self.assertEqual(len(server.messages), MESSAGES)
+        # Отправитель держится ниже лимитов и не доводит дело до 429
+        self.assertEqual(server.rejected, 0)
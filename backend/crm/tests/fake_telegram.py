@@ -0,0 +1,106 @@
+import json
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTelegramServer:
+    """
+    Локальный HTTP-сервер, имитирующий sendMessage Telegram Bot API.
+    Соблюдает лимиты как настоящий API: при превышении общего лимита
+    или лимита чата отвечает 429 с parameters.retry_after.
+    Принятые сообщения и отказы сохраняются для проверок в тестах,
+    latency имитирует сетевую задержку ответа.
+
+    Использование:
+        with FakeTelegramServer(global_rate=30, chat_rate=1) as server:
+            sender = TelegramSender('token', api_url=server.url)
+    """
+
+    PATH = re.compile(r'^/bot(?P<token>[^/]+)/sendMessage$')
+
+    def __init__(self, global_rate=30, chat_rate=1, retry_after=1, fail_chats=(), latency=0):
+        self.latency = latency
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.retry_after = retry_after
+        self.fail_chats = {str(chat_id) for chat_id in fail_chats}
+        self.messages = []
+        self.rejected = 0
+        self._global = deque()
+        self._chats = defaultdict(deque)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _over_limit(self, window, limit, now):
+        # Скользящее окно в одну секунду
+        while window and now - window[0] >= 1:
+            window.popleft()
+        return len(window) >= limit
+
+    def _accept(self, chat_id, text):
+        with self._lock:
+            now = time.monotonic()
+            if chat_id in self.fail_chats:
+                return 400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: chat not found'}
+
+            chat_window = self._chats[chat_id]
+            if self._over_limit(self._global, self.global_rate, now) or \
+                    self._over_limit(chat_window, max(self.chat_rate, 1), now):
+                self.rejected += 1
+                return 429, {
+                    'ok': False,
+                    'error_code': 429,
+                    'description': 'Too Many Requests',
+                    'parameters': {'retry_after': self.retry_after}
+                }
+
+            self._global.append(now)
+            chat_window.append(now)
+            self.messages.append((chat_id, text, now))
+            return 200, {'ok': True, 'result': {'message_id': len(self.messages)}}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, как у настоящего API: клиент переиспользует соединения
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                if not fake.PATH.match(self.path):
+                    return self._reply(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                if fake.latency:
+                    time.sleep(fake.latency)
+                self._reply(*fake._accept(str(payload.get('chat_id')), payload.get('text', '')))
+
+            def _reply(self, code, body):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
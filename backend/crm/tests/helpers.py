@@ -0,0 +1,49 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Примесь для TestCase с проверкой бюджета SQL-запросов.
+    Позволяет ловить N+1 регрессии: число запросов на страницу
+    не должно зависеть от количества записей на ней.
+    """
+
+    def count_queries(self, func, *args, **kwargs):
+        """
+        Выполняет func и возвращает (результат, список SQL-запросов).
+        """
+        with CaptureQueriesContext(connection) as context:
+            result = func(*args, **kwargs)
+        return result, [query['sql'] for query in context.captured_queries]
+
+    def assertQueryBudget(self, budget, func, *args, **kwargs):
+        """
+        Проверяет, что func укладывается в budget запросов.
+
+        Returns:
+            tuple: (результат func, фактическое число запросов)
+        """
+        result, queries = self.count_queries(func, *args, **kwargs)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            'Превышен бюджет запросов ({} > {}):\n{}'.format(
+                len(queries), budget, '\n'.join(queries)
+            )
+        )
+        return result, len(queries)
+
+    def assertConstantQueries(self, budget, func, grow, *args, **kwargs):
+        """
+        Проверяет, что число запросов func не меняется после
+        добавления данных через grow() и не превышает budget.
+        """
+        _, before = self.assertQueryBudget(budget, func, *args, **kwargs)
+        grow()
+        _, after = self.assertQueryBudget(budget, func, *args, **kwargs)
+        self.assertEqual(
+            before,
+            after,
+            f'Число запросов зависит от объема данных: {before} -> {after}'
+        )
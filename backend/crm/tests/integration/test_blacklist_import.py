@@ -0,0 +1,98 @@
+import os
+import tempfile
+from io import StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from crm.models import Blacklist, Order, User, Role, City, Address
+from crm.services.blacklist_filter import BlacklistFilter
+from crm.services.blacklist_service import BlacklistService
+
+
+class BlacklistImportTest(TestCase):
+    """Пакетный импорт черного списка из CSV"""
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.ROLE_COORDINATOR)
+        cls.coordinator = User.objects.create_user(username='coordinator', password='testpass123', role=role)
+        city = City.objects.create(name='Москва')
+        cls.address = Address.objects.create(city=city, street='Тестовая', house='1')
+
+    def setUp(self):
+        BlacklistFilter._filter = None
+
+    def _csv(self, rows):
+        return 'client_name,phone,reason\n' + ''.join(f'{row}\n' for row in rows)
+
+    def test_upsert_and_flag_orders(self):
+        """Повторы в разных форматах сливаются, заявки клиентов помечаются"""
+        order = Order.objects.create(client_name='Иванов Иван', phone='89991234567', address=self.address)
+        Blacklist.objects.create(client_name='Петров Петр', phone='+79990000001', reason='Старая причина')
+
+        stats = BlacklistService().import_csv(StringIO(self._csv([
+            'Иванов Иван,+7 999 123-45-67,Неоплата',
+            'Иванов Иван,8(999)1234567,Повтор',
+            'Петров Петр,89990000001,',
+            ',+79990000002,Без имени',
+            'Сидоров,12345,Плохой номер',
+        ])), default_reason='Импорт', chunk_size=2)
+
+        self.assertEqual(stats['rows'], 5)
+        self.assertEqual(stats['imported'], 2)
+        self.assertEqual(stats['flagged_orders'], 1)
+        self.assertEqual(stats['error_count'], 2)
+        self.assertEqual([error['line'] for error in stats['errors']], [5, 6])
+        self.assertIn('phone', stats['errors'][1]['errors'])
+
+        self.assertEqual(Blacklist.objects.count(), 2)
+        self.assertEqual(Blacklist.objects.get(client_name='Иванов Иван').reason, 'Повтор')
+        self.assertEqual(Blacklist.objects.get(client_name='Петров Петр').reason, 'Импорт')
+        order.refresh_from_db()
+        self.assertTrue(order.is_blacklisted)
+        self.assertTrue(BlacklistFilter.might_contain('79991234567'))
+
+    def test_queries_per_chunk(self):
+        """Число запросов зависит от числа пакетов, а не строк"""
+        rows = [f'Клиент {i},+7999{i:07d},Тест' for i in range(50)]
+
+        # SAVEPOINT, INSERT ... ON CONFLICT, UPDATE заявок, RELEASE
+        with self.assertNumQueries(4):
+            BlacklistService().import_csv(StringIO(self._csv(rows[:10])))
+        with self.assertNumQueries(4):
+            BlacklistService().import_csv(StringIO(self._csv(rows)))
+
+        self.assertEqual(Blacklist.objects.count(), 50)
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(ValueError, 'phone'):
+            BlacklistService().import_csv(StringIO('client_name,reason\nИванов,Тест\n'))
+
+    def test_command_reports_progress(self):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self._csv([f'Клиент {i},+7999{i:07d},Тест' for i in range(5)]))
+
+        out = StringIO()
+        call_command('import_blacklist', path, chunk_size=2, stdout=out)
+
+        self.assertEqual(out.getvalue().count('Прочитано строк'), 3)
+        self.assertEqual(Blacklist.objects.count(), 5)
+
+    def test_api_upload(self):
+        client = APIClient()
+        client.force_authenticate(user=self.coordinator)
+        upload = SimpleUploadedFile(
+            'blacklist.csv',
+            '﻿client_name,phone\nИванов Иван,+79991234567\n'.encode('utf-8'),
+            content_type='text/csv'
+        )
+
+        response = client.post(reverse('blacklist-import-csv'), {'file': upload, 'reason': 'Партнер'}, format='multipart')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['imported'], 1)
+        self.assertEqual(Blacklist.objects.get().reason, 'Партнер')
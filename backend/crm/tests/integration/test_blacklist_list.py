@@ -0,0 +1,55 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from crm.models import Blacklist, Order, User, Role, City, Address
+
+
+class BlacklistListTest(TestCase):
+    """Список черного списка для координатора"""
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.ROLE_COORDINATOR)
+        cls.coordinator = User.objects.create_user(username='coordinator', password='testpass123', role=role)
+        city = City.objects.create(name='Москва')
+        address = Address.objects.create(city=city, street='Тестовая', house='1')
+        for i in range(30):
+            entry = Blacklist.objects.create(client_name=f'Клиент {i}', phone=f'+7999{i:07d}', reason='Тест')
+            entry.related_orders.add(*Order.objects.bulk_create([
+                Order(client_name=entry.client_name, phone=entry.phone, address=address)
+                for _ in range(i % 3)
+            ]))
+        Blacklist.objects.create(client_name='John Smith', phone='+79990001000', reason='Тест')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.coordinator)
+
+    def test_page_single_query(self):
+        """Страница списка - один запрос независимо от числа записей"""
+        self.client.get(reverse('blacklist-list'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('blacklist-list'), {'page_size': 20})
+
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual(len(results), 20)
+        self.assertIsNotNone(response.data['next'])
+        counts = {row['client_name']: row['related_orders_count'] for row in results}
+        self.assertEqual(counts['Клиент 29'], 2)
+        self.assertEqual(counts['Клиент 27'], 0)
+
+    def test_search_by_name_and_phone(self):
+        """?q= ищет по подстроке ФИО без учета регистра и по цифрам телефона"""
+        response = self.client.get(reverse('blacklist-list'), {'q': 'Клиент 1'})
+        self.assertEqual(
+            {row['client_name'] for row in response.data['results']},
+            {'Клиент 1'} | {f'Клиент {i}' for i in range(10, 20)}
+        )
+
+        response = self.client.get(reverse('blacklist-list'), {'q': ' SMITH '})
+        self.assertEqual([row['client_name'] for row in response.data['results']], ['John Smith'])
+
+        response = self.client.get(reverse('blacklist-list'), {'q': '8 (999) 000-00-25'})
+        self.assertEqual([row['client_name'] for row in response.data['results']], ['Клиент 25'])
@@ -0,0 +1,134 @@
+from unittest import mock
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from crm.models import Blacklist, BlacklistPropagationJob, Order, User, Role, City, Address
+from crm.services.blacklist_service import BlacklistService
+from crm.tasks import propagate_blacklist
+
+
+@override_settings(BLACKLIST_FILTER_CHECK_INTERVAL=0)
+class BlacklistPropagationTest(TestCase):
+    """Фоновая пометка и снятие флага ЧС у заявок клиента"""
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.ROLE_COORDINATOR)
+        cls.coordinator = User.objects.create_user(username='coordinator', password='testpass123', role=role)
+        city = City.objects.create(name='Москва')
+        cls.address = Address.objects.create(city=city, street='Тестовая', house='1')
+        cls.orders = Order.objects.bulk_create([
+            Order(client_name='Иванов Иван', phone='+79991234567', phone_normalized='79991234567', address=cls.address)
+            for _ in range(7)
+        ])
+        cls.other = Order.objects.create(client_name='Петров Петр', phone='+79991234567', address=cls.address)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.coordinator)
+
+    def _flagged(self):
+        return set(Order.objects.filter(is_blacklisted=True).values_list('id', flat=True))
+
+    def test_request_returns_before_propagation(self):
+        """Запрос только ставит задание, заявки помечает задача после коммита"""
+        with mock.patch.object(propagate_blacklist, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse('order-blacklist', args=[self.orders[0].id]),
+                    {'reason': 'Неоплата'},
+                    format='json'
+                )
+            self.assertEqual(response.status_code, 201, response.data)
+            self.assertEqual(self._flagged(), {self.orders[0].id})
+
+        job_id = response.data['job']['id']
+        delay.assert_called_once_with(job_id)
+        propagate_blacklist(job_id)
+
+        self.assertEqual(self._flagged(), {order.id for order in self.orders})
+        response = self.client.get(reverse('blacklist-job', kwargs={'job_id': job_id}))
+        self.assertEqual(response.data['status'], BlacklistPropagationJob.STATUS_DONE)
+        self.assertEqual(response.data['total'], 7)
+        self.assertEqual(response.data['updated'], 6)
+        self.assertEqual(response.data['progress'], 1.0)
+
+    def test_chunks_resume_from_cursor(self):
+        """Пакеты по возрастанию ID, прерванное задание продолжается с курсора"""
+        entry, job = BlacklistService().add_to_blacklist('Иванов Иван', '8 999 123-45-67', 'Тест')
+
+        # Сбой после второго пакета
+        original = BlacklistPropagationJob.save
+        calls = []
+        def failing_save(job, *args, **kwargs):
+            calls.append(job.last_order_id)
+            if len(calls) == 3:
+                raise RuntimeError('worker lost')
+            original(job, *args, **kwargs)
+        with mock.patch.object(BlacklistPropagationJob, 'save', failing_save), \
+                self.assertRaises(RuntimeError):
+            BlacklistService.propagate(job.id, chunk_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BlacklistPropagationJob.STATUS_RUNNING)
+        self.assertEqual(job.processed, 4)
+        self.assertEqual(job.last_order_id, self.orders[3].id)
+        self.assertEqual(self._flagged(), {order.id for order in self.orders[:4]})
+
+        BlacklistPropagationJob.objects.filter(id=job.id).update(updated_at=job.updated_at.replace(year=2000))
+        self.assertEqual(BlacklistService.resume_stale_jobs(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BlacklistPropagationJob.STATUS_DONE)
+        self.assertEqual(job.processed, 7)
+        self.assertEqual(self._flagged(), {order.id for order in self.orders})
+        # Повторный запуск завершенного задания ничего не делает
+        with self.assertNumQueries(3):
+            self.assertIsNone(BlacklistService.propagate(job.id))
+
+    def test_unblock_follows_current_state(self):
+        """Задание блокировки, выполненное после разблокировки, не возвращает флаги"""
+        entry, block_job = BlacklistService().add_to_blacklist('Иванов Иван', '+79991234567', 'Тест')
+        BlacklistService.propagate(block_job.id)
+        self.assertEqual(len(self._flagged()), 7)
+
+        response = self.client.post(reverse('blacklist-unblock', args=[entry.id]))
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Blacklist.objects.exists())
+
+        # Повторная доставка задания блокировки после разблокировки
+        BlacklistPropagationJob.objects.filter(id=block_job.id).update(
+            status=BlacklistPropagationJob.STATUS_PENDING, last_order_id=0
+        )
+        BlacklistService.propagate(block_job.id)
+        self.assertEqual(self._flagged(), set())
+
+        BlacklistService.propagate(response.data['job']['id'])
+        self.assertEqual(self._flagged(), set())
+        self.assertFalse(Order.objects.get(id=self.other.id).is_blacklisted)
+
+    @override_settings(BLACKLIST_FILTER_CHECK_INTERVAL=30)
+    def test_block_job_waits_for_stale_filters(self):
+        """Задание блокировки дожидается обновления фильтров других процессов"""
+        entry, job = BlacklistService().add_to_blacklist('Иванов Иван', '+79991234567', 'Тест')
+
+        with mock.patch.object(propagate_blacklist, 'apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                BlacklistService.propagate(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BlacklistPropagationJob.STATUS_RUNNING)
+        self.assertEqual(self._flagged(), {order.id for order in self.orders})
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.args, ((job.id,),))
+        self.assertGreater(apply_async.call_args.kwargs['countdown'], 0)
+
+        # Заявка, принятая процессом с устаревшим фильтром
+        late = Order.objects.create(client_name='Иванов Иван', phone='+79991234567', address=self.address)
+        self.assertFalse(late.is_blacklisted)
+        BlacklistPropagationJob.objects.filter(id=job.id).update(created_at=job.created_at - timedelta(minutes=1))
+        BlacklistService.propagate(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BlacklistPropagationJob.STATUS_DONE)
+        self.assertIn(late.id, self._flagged())
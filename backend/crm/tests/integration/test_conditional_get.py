@@ -0,0 +1,92 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from crm.models import Order, StatusHistory, User, Role, City, Address
+
+
+class ConditionalGetTest(TestCase):
+    """Условные GET-запросы (ETag / Last-Modified) для списков и отчетов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.ROLE_COORDINATOR)
+        cls.coordinator = User.objects.create_user(
+            username='coordinator',
+            password='testpass123',
+            role=role
+        )
+        cls.city = City.objects.create(name='Москва')
+        cls.address = Address.objects.create(city=cls.city, street='Тестовая', house='1')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.coordinator)
+        self.order = Order.objects.create(
+            client_name='Иванов Иван',
+            phone='+79991234567',
+            address=self.address
+        )
+
+    def _assert_revalidates(self, url, change):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_orders_list(self):
+        """Новая запись истории статусов меняет ETag списка заявок"""
+        self._assert_revalidates(
+            reverse('order-list'),
+            lambda: StatusHistory.objects.create(order=self.order, status=Order.STATUS_UNASSIGNED)
+        )
+
+    def test_orders_list_related_rows(self):
+        """Правка адреса, города и имени менеджера меняет ETag списка заявок"""
+        url = reverse('order-list')
+
+        def edit_address():
+            self.address.street = 'Новая'
+            self.address.save()
+
+        def rename_city():
+            self.city.name = 'Москва-Сити'
+            self.city.save()
+
+        def rename_manager():
+            self.coordinator.first_name = 'Анна'
+            self.coordinator.save(update_fields=['first_name'])
+
+        for change in (edit_address, rename_city, rename_manager):
+            with self.subTest(change=change.__name__):
+                self._assert_revalidates(url, change)
+
+    def test_orders_list_ignores_login(self):
+        """Сохранение только last_login не сбрасывает ETag списка заявок"""
+        url = reverse('order-list')
+        etag = self.client.get(url)['ETag']
+
+        self.coordinator.save(update_fields=['last_login'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_locations_list(self):
+        """Новый город меняет ETag списка локаций"""
+        self._assert_revalidates(
+            reverse('location-list'),
+            lambda: City.objects.create(name='Казань')
+        )
+
+    def test_orders_report(self):
+        """Новая заявка периода меняет ETag отчета"""
+        self._assert_revalidates(
+            reverse('order-report-list'),
+            lambda: Order.objects.create(client_name='Петров', phone='+79990000000', address=self.address)
+        )
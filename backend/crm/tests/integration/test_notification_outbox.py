@@ -0,0 +1,244 @@
+import threading
+from collections import Counter
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from crm.models import Order, NotificationLog, User, Role, City, Address
+from crm.services.notification_service import NotificationService
+from crm.services.recipient_directory import Recipient
+from crm.services.telegram_sender import TelegramSender
+from crm.tests.fake_telegram import FakeTelegramServer
+
+
+def create_outbox(count):
+    """Заявка и count ожидающих уведомлений разным получателям"""
+    role = Role.objects.create(name=Role.ROLE_COORDINATOR)
+    city = City.objects.create(name='Москва')
+    order = Order.objects.create(
+        client_name='Клиент',
+        phone='+79990000000',
+        address=Address.objects.create(city=city, street='Тестовая', house='1')
+    )
+    recipients = User.objects.bulk_create([
+        User(username=f'user{i}', role=role, telegram_chat_id=str(i))
+        for i in range(count)
+    ])
+    return NotificationService._queue(
+        order,
+        [Recipient(user.id, user.telegram_chat_id) for user in recipients],
+        NotificationLog.NOTIFICATION_ASSIGNED,
+        'Тест'
+    )
+
+
+class FakeTelegramMixin:
+    """Диспетчер отправляет сообщения в локальный фейковый Bot API"""
+
+    def setUp(self):
+        super().setUp()
+        self.telegram = FakeTelegramServer(global_rate=1000, chat_rate=1000, fail_chats=['2'])
+        self.telegram.__enter__()
+        self.addCleanup(self.telegram.__exit__, None, None, None)
+        NotificationService._sender = TelegramSender('token', api_url=self.telegram.url, global_rate=1000)
+        self.addCleanup(setattr, NotificationService, '_sender', None)
+        self.addCleanup(NotificationService._sender.close)
+
+
+class NotificationDispatchTest(FakeTelegramMixin, TestCase):
+    """Разбор outbox уведомлений пакетами"""
+
+    def test_batch_marked_in_bulk(self):
+        """Пакет отправляется и помечается фиксированным числом запросов"""
+        create_outbox(5)
+
+        with self.assertNumQueries(8), self.assertLogs('crm.services.telegram_sender', 'WARNING'):
+            # Захват: SAVEPOINT, SELECT ... FOR UPDATE, UPDATE sending, RELEASE;
+            # результат: SAVEPOINT, UPDATE sent, UPDATE failed, RELEASE
+            processed = NotificationService.dispatch_pending(batch_size=10)
+
+        self.assertEqual(processed, 5)
+        self.assertEqual(len(self.telegram.messages), 4)
+        self.assertEqual(NotificationLog.objects.filter(status=NotificationLog.STATUS_SENT, is_sent=True).count(), 4)
+        self.assertEqual(NotificationLog.objects.get(status=NotificationLog.STATUS_FAILED).attempts, 1)
+        self.assertEqual(NotificationService.dispatch_pending(), 0)
+
+
+    def test_send_outside_transaction(self):
+        """Во время обращения к Telegram транзакция диспетчера не открыта"""
+        create_outbox(3)
+        sender = NotificationService.get_sender()
+        send_batch = sender.send_batch
+        depth = []
+
+        def spy(messages):
+            depth.append(len(connection.savepoint_ids))
+            return send_batch(messages)
+
+        outer = len(connection.savepoint_ids)
+        with mock.patch.object(sender, 'send_batch', spy), \
+                self.assertLogs('crm.services.telegram_sender', 'WARNING'):
+            NotificationService.dispatch_pending()
+
+        self.assertEqual(depth, [outer])
+
+    def test_expired_lease_requeued(self):
+        """Пакет упавшего диспетчера возвращается в очередь по истечении аренды"""
+        create_outbox(3)
+        queryset = NotificationLog.objects.filter(status=NotificationLog.STATUS_PENDING).order_by('id')
+        batch, lease = NotificationService._claim(queryset, 10)
+        self.assertEqual(NotificationService.dispatch_pending(), 0)
+        self.assertEqual(NotificationService.retry_failed(), 0)
+
+        NotificationLog.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('crm.services.telegram_sender', 'WARNING'):
+            self.assertEqual(NotificationService.retry_failed(), 3)
+
+        # Опоздавший диспетчер не перезаписывает результат
+        NotificationService._record([[n] for n in batch], [False] * len(batch), lease)
+        self.assertEqual(NotificationLog.objects.filter(status=NotificationLog.STATUS_SENT).count(), 2)
+        self.assertEqual(len(self.telegram.messages), 2)
+
+
+@override_settings(NOTIFICATION_MAX_ATTEMPTS=3, NOTIFICATION_RETRY_BASE=60, NOTIFICATION_RETRY_MAX_DELAY=3600)
+class RetryDispatchTest(FakeTelegramMixin, TestCase):
+    """Повторы неудачных отправок с экспоненциальной задержкой"""
+
+    def _make_due(self):
+        NotificationLog.objects.filter(status=NotificationLog.STATUS_FAILED).update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_backoff_until_dead(self):
+        """Задержка растет с каждой попыткой, после последней - статус dead"""
+        create_outbox(3)
+        with self.assertLogs('crm.services.telegram_sender', 'WARNING'):
+            NotificationService.dispatch_pending()
+
+        failed = NotificationLog.objects.get(recipient__telegram_chat_id='2')
+        delay = (failed.next_attempt_at - timezone.now()).total_seconds()
+        self.assertEqual(failed.status, NotificationLog.STATUS_FAILED)
+        self.assertTrue(25 <= delay <= 60, delay)
+        # Время попытки не наступило
+        self.assertEqual(NotificationService.retry_failed(), 0)
+
+        self._make_due()
+        with self.assertLogs('crm.services.telegram_sender', 'WARNING'):
+            self.assertEqual(NotificationService.retry_failed(), 1)
+        failed.refresh_from_db()
+        delay = (failed.next_attempt_at - timezone.now()).total_seconds()
+        self.assertEqual(failed.attempts, 2)
+        self.assertTrue(55 <= delay <= 120, delay)
+
+        self._make_due()
+        with self.assertLogs('crm.services.telegram_sender', 'WARNING'):
+            NotificationService.retry_failed()
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, NotificationLog.STATUS_DEAD)
+        self.assertEqual(failed.attempts, 3)
+        self.assertIsNone(failed.next_attempt_at)
+        self._make_due()
+        self.assertEqual(NotificationService.retry_failed(), 0)
+        self.assertEqual(len(self.telegram.messages), 2)
+
+    def test_delivered_on_retry(self):
+        """Доставленное при повторе уведомление помечается отправленным"""
+        create_outbox(3)
+        with self.assertLogs('crm.services.telegram_sender', 'WARNING'):
+            NotificationService.dispatch_pending()
+
+        self.telegram.fail_chats.clear()
+        self._make_due()
+        self.assertEqual(NotificationService.retry_failed(), 1)
+
+        notification = NotificationLog.objects.get(recipient__telegram_chat_id='2')
+        self.assertEqual(notification.status, NotificationLog.STATUS_SENT)
+        self.assertEqual(notification.attempts, 2)
+        self.assertIsNone(notification.next_attempt_at)
+
+    def test_delay_capped(self):
+        """Задержка не превышает NOTIFICATION_RETRY_MAX_DELAY"""
+        now = timezone.now()
+        self.assertLessEqual(NotificationService.next_attempt_at(30, now), now + timedelta(seconds=3600))
+
+
+@override_settings(NOTIFICATION_DIGEST_WINDOW=30)
+class DigestDispatchTest(FakeTelegramMixin, TestCase):
+    """Объединение уведомлений получателя в сводку"""
+
+    def setUp(self):
+        super().setUp()
+        city = City.objects.create(name='Москва')
+        address = Address.objects.create(city=city, street='Тестовая', house='1')
+        self.orders = [
+            Order.objects.create(client_name=f'Клиент {i}', phone=f'+7999000000{i}', address=address)
+            for i in range(4)
+        ]
+        self.coordinator = Recipient(User.objects.create(username='coordinator', telegram_chat_id='10').id, '10')
+        self.manager = Recipient(User.objects.create(username='manager', telegram_chat_id='11').id, '11')
+
+    def _queue(self, order, recipient, message_type, age):
+        notifications = NotificationService._queue(order, [recipient], message_type, f'{message_type} {order.id}')
+        NotificationLog.objects.filter(id=notifications[0].id).update(
+            created_at=timezone.now() - timedelta(seconds=age)
+        )
+        return notifications[0]
+
+    def test_events_in_window_merged(self):
+        """События старше окна уходят одной сводкой, свежие ждут следующей"""
+        merged = [
+            self._queue(self.orders[0], self.coordinator, NotificationLog.NOTIFICATION_COMPLETED, 60),
+            self._queue(self.orders[1], self.coordinator, NotificationLog.NOTIFICATION_COMPLETED, 50),
+            self._queue(self.orders[2], self.coordinator, NotificationLog.NOTIFICATION_CANCELED, 40),
+        ]
+        single = self._queue(self.orders[0], self.manager, NotificationLog.NOTIFICATION_COMPLETED, 60)
+        assignment = self._queue(self.orders[3], self.manager, NotificationLog.NOTIFICATION_ASSIGNED, 0)
+        fresh = self._queue(self.orders[3], self.coordinator, NotificationLog.NOTIFICATION_COMPLETED, 0)
+
+        self.assertEqual(NotificationService.dispatch_pending(), 5)
+
+        texts = {chat_id: [] for chat_id in ('10', '11')}
+        for chat_id, text, _ in self.telegram.messages:
+            texts[chat_id].append(text)
+        self.assertEqual(len(texts['10']), 1)
+        self.assertIn(f'Завершение (2): #{self.orders[0].id}, #{self.orders[1].id}', texts['10'][0])
+        self.assertIn(f'Отмена заявки (1): #{self.orders[2].id}', texts['10'][0])
+        self.assertEqual(sorted(texts['11']), sorted([single.message_text, assignment.message_text]))
+
+        keys = set(NotificationLog.objects.filter(id__in=[n.id for n in merged]).values_list('digest_key', flat=True))
+        self.assertEqual(len(keys), 1)
+        self.assertIsNotNone(keys.pop())
+        self.assertIsNone(NotificationLog.objects.get(id=single.id).digest_key)
+        self.assertEqual(NotificationLog.objects.get(id=fresh.id).status, NotificationLog.STATUS_PENDING)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SKIP LOCKED проверяется на PostgreSQL')
+class ParallelDispatchTest(FakeTelegramMixin, TransactionTestCase):
+    """Несколько диспетчеров разбирают outbox без повторных отправок"""
+
+    DISPATCHERS = 4
+
+    def test_no_double_send(self):
+        self.telegram.fail_chats.clear()
+        notifications = create_outbox(60)
+        barrier = threading.Barrier(self.DISPATCHERS)
+
+        def dispatcher():
+            barrier.wait()
+            try:
+                while NotificationService.dispatch_pending(batch_size=5):
+                    pass
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=dispatcher) for _ in range(self.DISPATCHERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        sent = Counter(chat_id for chat_id, _, _ in self.telegram.messages)
+        self.assertEqual(len(sent), len(notifications))
+        self.assertEqual(set(sent.values()), {1})
+        self.assertFalse(NotificationLog.objects.filter(status=NotificationLog.STATUS_PENDING).exists())
@@ -0,0 +1,75 @@
+from io import StringIO
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from crm.models import User, City, Address, Order, NotificationLog, NotificationLogArchive
+from crm.services.notification_service import NotificationService
+
+
+class NotificationRetentionTest(TestCase):
+    """Перенос старого лога уведомлений в архив"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='manager', password='testpass123', telegram_chat_id='100')
+        city = City.objects.create(name='Москва')
+        cls.order = Order.objects.create(
+            client_name='Клиент',
+            phone='+79990000000',
+            address=Address.objects.create(city=city, street='Тестовая', house='1')
+        )
+
+    def _log(self, days_ago, status):
+        notification = NotificationLog.objects.create(
+            order=self.order,
+            recipient=self.user,
+            message_type=NotificationLog.NOTIFICATION_NEW,
+            message_text=f'{status} {days_ago}',
+            status=status
+        )
+        # created_at заполняется auto_now_add - сдвигаем отдельным UPDATE
+        NotificationLog.objects.filter(id=notification.id).update(
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+        return notification
+
+    def test_old_processed_moved(self):
+        """Старые отправленные и ошибочные переносятся пакетами, ожидающие и свежие остаются"""
+        old = [self._log(100, NotificationLog.STATUS_SENT) for _ in range(5)]
+        old.append(self._log(120, NotificationLog.STATUS_FAILED))
+        pending = self._log(100, NotificationLog.STATUS_PENDING)
+        recent = self._log(1, NotificationLog.STATUS_SENT)
+
+        call_command('archive_notifications', days=90, archive_days=0, batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            set(NotificationLog.objects.values_list('id', flat=True)),
+            {pending.id, recent.id}
+        )
+        archived = NotificationLogArchive.objects.get(id=old[-1].id)
+        self.assertEqual(archived.status, NotificationLog.STATUS_FAILED)
+        self.assertEqual(archived.recipient_id, self.user.id)
+        self.assertEqual(archived.message_text, 'failed 120')
+        self.assertEqual(NotificationLogArchive.objects.count(), 6)
+
+    def test_archive_purged(self):
+        """Записи архива старше срока хранения удаляются"""
+        self._log(400, NotificationLog.STATUS_SENT)
+        kept = self._log(100, NotificationLog.STATUS_SENT)
+
+        call_command('archive_notifications', days=90, archive_days=365, stdout=StringIO())
+
+        self.assertEqual(list(NotificationLogArchive.objects.values_list('id', flat=True)), [kept.id])
+
+    def test_archive_purged_in_batches(self):
+        """Удаление идет пакетами по id, свежие записи между старыми остаются"""
+        old = [self._log(400, NotificationLog.STATUS_SENT) for _ in range(3)]
+        kept = self._log(100, NotificationLog.STATUS_SENT)
+        old += [self._log(400, NotificationLog.STATUS_SENT) for _ in range(2)]
+        call_command('archive_notifications', days=90, archive_days=0, stdout=StringIO())
+
+        deleted = NotificationService.purge_archive(timezone.now() - timedelta(days=365), batch_size=2)
+
+        self.assertEqual(deleted, len(old))
+        self.assertEqual(list(NotificationLogArchive.objects.values_list('id', flat=True)), [kept.id])
@@ -0,0 +1,127 @@
+from django.contrib.auth.models import Group
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from crm.models import Order, StatusHistory, User, Role, City, Address
+from crm.tests.helpers import QueryBudgetMixin
+
+# Сессия/пользователь + заявки + история + группы менеджеров и авторов истории
+ORDER_LIST_QUERY_BUDGET = 8
+
+
+class OrderQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Проверка отсутствия N+1 запросов в API заявок"""
+
+    @classmethod
+    def setUpTestData(cls):
+        coordinator_role = Role.objects.create(name=Role.ROLE_COORDINATOR)
+        manager_role = Role.objects.create(name=Role.ROLE_MANAGER)
+        cls.group = Group.objects.create(name='Мастера')
+
+        cls.coordinator = User.objects.create_user(
+            username='coordinator',
+            password='testpass123',
+            role=coordinator_role
+        )
+        cls.coordinator.groups.add(cls.group)
+        cls.manager = User.objects.create_user(
+            username='manager',
+            password='testpass123',
+            role=manager_role
+        )
+        cls.manager.groups.add(cls.group)
+        cls.city = City.objects.create(name='Москва')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.coordinator)
+
+    def _create_orders(self, count):
+        for i in range(count):
+            address = Address.objects.create(
+                city=self.city,
+                street='Тестовая',
+                house=str(Address.objects.count() + 1)
+            )
+            order = Order.objects.create(
+                client_name=f'Клиент {i}',
+                phone='+79990000000',
+                address=address,
+                assigned_to=self.manager,
+                status=Order.STATUS_ASSIGNED
+            )
+            StatusHistory.objects.bulk_create([
+                StatusHistory(order=order, status=Order.STATUS_UNASSIGNED, changed_by=self.coordinator),
+                StatusHistory(order=order, status=Order.STATUS_ASSIGNED, changed_by=self.manager),
+            ])
+
+    def test_list_query_budget(self):
+        """Число запросов списка не зависит от количества заявок"""
+        self._create_orders(2)
+        url = reverse('order-list')
+
+        self.assertConstantQueries(
+            ORDER_LIST_QUERY_BUDGET,
+            self.client.get,
+            lambda: self._create_orders(15),
+            url
+        )
+
+    def test_retrieve_query_budget(self):
+        """Детальная заявка загружается фиксированным числом запросов"""
+        self._create_orders(1)
+        order = Order.objects.get()
+        url = reverse('order-detail', kwargs={'pk': order.pk})
+
+        response, _ = self.assertQueryBudget(ORDER_LIST_QUERY_BUDGET, self.client.get, url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['status_history']), 2)
+
+    def test_list_cursor_pagination(self):
+        """Лента заявок отдается страницами по курсору без пропусков и дублей"""
+        self._create_orders(5)
+        url = reverse('order-list')
+
+        response = self.client.get(url, {'page_size': 2})
+        seen = [item['id'] for item in response.data['results']]
+        while response.data['next']:
+            response, _ = self.assertQueryBudget(
+                ORDER_LIST_QUERY_BUDGET, self.client.get, response.data['next']
+            )
+            seen.extend(item['id'] for item in response.data['results'])
+
+        expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_list_sparse_fieldset(self):
+        """?fields= ограничивает набор полей списка"""
+        self._create_orders(2)
+
+        response = self.client.get(reverse('order-list'), {'fields': 'id,status,client_name'})
+
+        self.assertEqual(response.status_code, 200)
+        for item in response.data['results']:
+            self.assertEqual(set(item), {'id', 'status', 'client_name'})
+
+    def test_list_is_slim_and_detail_is_rich(self):
+        """Список не содержит историю статусов, детальная заявка - содержит"""
+        self._create_orders(1)
+        order = Order.objects.get()
+
+        item = self.client.get(reverse('order-list')).data['results'][0]
+        detail = self.client.get(reverse('order-detail', kwargs={'pk': order.pk})).data
+
+        self.assertNotIn('status_history', item)
+        self.assertEqual(item['city'], self.city.name)
+        self.assertEqual(item['assigned_to'], self.manager.id)
+        self.assertIn('status_history', detail)
+
+    def test_list_unassigned_order_has_null_manager_name(self):
+        """Неназначенная заявка отдает assigned_to_name = None, а не теряет поле"""
+        address = Address.objects.create(city=self.city, street='Тестовая', house='1')
+        Order.objects.create(client_name='Клиент', phone='+79990000000', address=address)
+
+        item = self.client.get(reverse('order-list')).data['results'][0]
+
+        self.assertIn('assigned_to_name', item)
+        self.assertIsNone(item['assigned_to_name'])
@@ -0,0 +1,79 @@
+from unittest import mock, skipUnless
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from crm.models import Order, User, Role, City, Address
+from crm.tasks import refresh_city_search_documents
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Поиск использует pg_trgm и tsvector PostgreSQL')
+class OrderSearchTest(TestCase):
+    """Поиск заявок по клиенту, телефону и адресу (?q=)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.ROLE_COORDINATOR)
+        cls.coordinator = User.objects.create_user(username='coordinator', password='testpass123', role=role)
+        city = City.objects.create(name='Казань')
+        cls.order = Order.objects.create(
+            client_name='Сидоров Павел',
+            phone='+7 (999) 123-45-67',
+            address=Address.objects.create(city=city, street='Баумана', house='12')
+        )
+        Order.objects.create(
+            client_name='Петрова Анна',
+            phone='+79990000000',
+            address=Address.objects.create(city=city, street='Пушкина', house='3')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.coordinator)
+
+    def search(self, query):
+        response = self.client.get(reverse('order-list'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_search_by_name(self):
+        """Поиск по фамилии клиента без учета регистра"""
+        self.assertEqual(self.search('сидоров'), [self.order.id])
+
+    def test_search_by_phone_fragment(self):
+        """Поиск по фрагменту телефона в любом формате"""
+        self.assertEqual(self.search('123-45'), [self.order.id])
+
+    def test_search_by_street(self):
+        """Поиск по улице адреса"""
+        self.assertEqual(self.search('Баумана'), [self.order.id])
+
+    def test_search_document_follows_updates(self):
+        """Поисковый документ обновляется при save(update_fields=...)"""
+        self.order.client_name = 'Сидоренко Павел'
+        self.order.save(update_fields=['client_name'])
+
+        self.order.refresh_from_db()
+        self.assertIn('сидоренко', self.order.search_document)
+
+    def test_search_follows_address_edit(self):
+        """Правка адреса пересобирает документы его заявок"""
+        address = self.order.address
+        address.street = 'Кремлевская'
+        address.save()
+
+        self.assertEqual(self.search('Кремлевская'), [self.order.id])
+        self.assertEqual(self.search('Баумана'), [])
+
+    def test_search_follows_city_rename(self):
+        """Переименование города пересобирает документы заявок фоновой задачей"""
+        city = self.order.address.city
+        city.name = 'Иннополис'
+        with mock.patch('crm.tasks.refresh_city_search_documents.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            city.save()
+        delay.assert_called_once_with(city.id)
+
+        refresh_city_search_documents(city.id)
+
+        self.assertEqual(len(self.search('Иннополис')), 2)
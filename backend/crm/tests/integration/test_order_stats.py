@@ -0,0 +1,241 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.utils import timezone
+from crm.models import Order, OrderDailyStats, ManagerStatus, User, Role, City, Address
+from crm.services.order_service import OrderService
+from crm.services.order_stats_service import OrderStatsService
+from crm.services.report_service import ReportService
+
+
+class OrderDailyStatsTest(TestCase):
+    """Суточный срез заявок для отчетов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = User.objects.create_user(
+            username='operator',
+            password='testpass123',
+            role=Role.objects.create(name=Role.ROLE_OPERATOR)
+        )
+        manager_role = Role.objects.create(name=Role.ROLE_MANAGER)
+        cls.managers = []
+        for i in range(2):
+            manager = User.objects.create_user(username=f'manager{i}', password='testpass123', role=manager_role)
+            ManagerStatus.objects.create(user=manager)
+            cls.managers.append(manager)
+        cls.addresses = [
+            Address.objects.create(city=City.objects.create(name=name), street='Тестовая', house='1')
+            for name in ('Москва', 'Казань')
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def _snapshot(self):
+        return set(
+            OrderDailyStats.objects.exclude(count=0).values_list('day', 'city_id', 'manager_id', 'status', 'count')
+        )
+
+    def _create_orders(self):
+        orders = [
+            OrderService.create_order(f'Клиент {i}', f'+7999{i:07d}', self.addresses[i % 2], '', self.operator)
+            for i in range(4)
+        ]
+        OrderService.bulk_create_orders([
+            {'client_name': 'Клиент 4', 'phone': '+79990000004', 'address_id': self.addresses[0].id}
+        ], self.operator)
+        return orders
+
+    def test_incremental_matches_rebuild(self):
+        """Инкрементальный срез совпадает с пересборкой по заявкам"""
+        orders = self._create_orders()
+        OrderService.assign_order(orders[0].id, self.managers[0].id, self.operator)
+        OrderService.update_order_status(orders[0].id, Order.STATUS_COMPLETED, self.managers[0])
+        OrderService.assign_order(orders[1].id, self.managers[1].id, self.operator)
+        OrderService.update_order_status(orders[1].id, Order.STATUS_REJECTED, self.managers[1])
+        OrderService.assign_order(orders[2].id, self.managers[0].id, self.operator)
+
+        incremental = self._snapshot()
+        OrderStatsService.rebuild()
+
+        self.assertEqual(incremental, self._snapshot())
+        self.assertEqual(sum(row[4] for row in incremental), 5)
+
+    def test_rebuild_command_repairs_drift(self):
+        """Изменения в обход OrderService исправляет команда пересборки"""
+        orders = self._create_orders()
+        Order.objects.filter(id=orders[0].id).update(status=Order.STATUS_COMPLETED)
+        OrderStatsService.rebuild()
+        expected = self._snapshot()
+        OrderDailyStats.objects.all().delete()
+
+        call_command('rebuild_order_stats', date_from=timezone.localdate(), stdout=StringIO())
+
+        self.assertEqual(self._snapshot(), expected)
+
+    def test_admin_changes_keep_rollup_in_sync(self):
+        """Действие и list_editable админки меняют статус через OrderService"""
+        orders = self._create_orders()
+        admin = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_login(admin)
+        changelist = reverse('admin:crm_order_changelist')
+
+        self.client.post(changelist, {
+            'action': 'mark_as_completed',
+            '_selected_action': [orders[0].id, orders[1].id],
+        })
+        self.client.post(changelist, {
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '1',
+            'form-0-id': orders[2].id,
+            'form-0-status': Order.STATUS_REJECTED,
+            '_save': 'Сохранить',
+        })
+
+        self.assertEqual(Order.objects.filter(status=Order.STATUS_COMPLETED).count(), 2)
+        self.assertEqual(Order.objects.get(id=orders[2].id).status, Order.STATUS_REJECTED)
+        incremental = self._snapshot()
+        OrderStatsService.rebuild()
+        self.assertEqual(incremental, self._snapshot())
+
+    def test_admin_change_form_moves_manager_and_city(self):
+        """Смена менеджера, адреса и статуса в форме админки учитывается от прежнего ключа"""
+        order = self._create_orders()[0]
+        OrderService.assign_order(order.id, self.managers[0].id, self.operator)
+        admin = User.objects.create_superuser(username='admin', password='testpass123')
+        self.client.force_login(admin)
+        change_url = reverse('admin:crm_order_change', args=[order.id])
+
+        form = self.client.get(change_url).context['adminform'].form
+        data = {
+            name: value for name, value in form.initial.items()
+            if name in form.fields and value not in (None, False)
+        }
+        data.update({
+            'assigned_to': self.managers[1].id,
+            'address': self.addresses[1].id,
+            'status': Order.STATUS_COMPLETED,
+            '_save': 'Сохранить',
+        })
+        response = self.client.post(change_url, data)
+        self.assertEqual(response.status_code, 302)
+
+        order.refresh_from_db()
+        self.assertEqual(
+            (order.status, order.assigned_to_id, order.address_id),
+            (Order.STATUS_COMPLETED, self.managers[1].id, self.addresses[1].id)
+        )
+        incremental = self._snapshot()
+        OrderStatsService.rebuild()
+        self.assertEqual(incremental, self._snapshot())
+
+    def test_api_update_ignores_status(self):
+        """PATCH заявки не меняет статус в обход OrderService"""
+        order = self._create_orders()[0]
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(
+            username='coordinator',
+            password='testpass123',
+            role=Role.objects.create(name=Role.ROLE_COORDINATOR)
+        ))
+
+        response = client.patch(
+            reverse('order-detail', kwargs={'pk': order.id}),
+            {'status': Order.STATUS_COMPLETED, 'comment': 'Позвонить вечером'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.STATUS_UNASSIGNED)
+        self.assertEqual(order.comment, 'Позвонить вечером')
+
+    def test_report_reads_rollup_for_past_days(self):
+        """Прошедшие дни - из среза, сегодняшний - из заявок"""
+        orders = self._create_orders()
+        # Две заявки "вчера": срез пересобирается, как после первичного заполнения
+        yesterday = timezone.now() - timedelta(days=1)
+        Order.objects.filter(id__in=[orders[0].id, orders[1].id]).update(created_at=yesterday)
+        OrderStatsService.rebuild()
+        OrderService.assign_order(orders[0].id, self.managers[0].id, self.operator)
+        OrderService.update_order_status(orders[0].id, Order.STATUS_COMPLETED, self.managers[0])
+
+        today = timezone.localdate()
+        with self.assertNumQueries(2):
+            report = ReportService.get_orders_report('custom', today - timedelta(days=1), today + timedelta(days=1))
+
+        self.assertEqual(report['total_stats']['total'], 5)
+        self.assertEqual(report['total_stats']['completed'], 1)
+        self.assertEqual(
+            {row['address__city__name']: row['total'] for row in report['by_city']},
+            {'Москва': 3, 'Казань': 2}
+        )
+
+        # Заявка из среза, измененная в обход OrderService, в отчете не видна до пересборки
+        Order.objects.filter(id=orders[1].id).update(status=Order.STATUS_REJECTED)
+        report = ReportService.get_managers_report('yesterday')
+        self.assertEqual(report['managers'], [{
+            'assigned_to__username': 'manager0',
+            'assigned_to__first_name': '',
+            'assigned_to__last_name': '',
+            'total': 1,
+            'completed': 1,
+            'rejected': 0
+        }])
+
+
+class RebuildDayLockTest(TransactionTestCase):
+    """Пересборка дня блокирует приращения только этого дня"""
+
+    def setUp(self):
+        self.operator = User.objects.create_user(
+            username='operator',
+            password='testpass123',
+            role=Role.objects.create(name=Role.ROLE_OPERATOR)
+        )
+        self.address = Address.objects.create(city=City.objects.create(name='Москва'), street='Тестовая', house='1')
+
+    def _create_order_while_day_locked(self, day):
+        locked, release = threading.Event(), threading.Event()
+
+        def rebuild():
+            try:
+                with transaction.atomic():
+                    OrderStatsService._lock_days([day])
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=rebuild)
+        thread.start()
+        locked.wait(10)
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '500ms'")
+                return OrderService.create_order('Клиент', '+79990000000', self.address, '', self.operator)
+        finally:
+            release.set()
+            thread.join()
+
+    def test_other_day_is_not_blocked(self):
+        """Заявка создается, пока пересобирается вчерашний день"""
+        yesterday = timezone.localdate() - timedelta(days=1)
+
+        order = self._create_order_while_day_locked(yesterday)
+
+        self.assertTrue(OrderDailyStats.objects.filter(day=timezone.localdate(), count=1).exists())
+        self.assertIsNotNone(order.pk)
+
+    def test_same_day_waits_for_rebuild(self):
+        """Приращение пересобираемого дня ждет окончания пересборки"""
+        with self.assertRaises(OperationalError):
+            self._create_order_while_day_locked(timezone.localdate())
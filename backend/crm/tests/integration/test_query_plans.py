@@ -0,0 +1,144 @@
+from datetime import timedelta
+from unittest import skipUnless
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from crm.models import Order, StatusHistory, User, Role, City, Address, Blacklist, NotificationLog
+from crm.services.blacklist_service import BlacklistService
+
+SEED_ORDERS = 5000
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN-проверки рассчитаны на PostgreSQL')
+class QueryPlanTest(TestCase):
+    """
+    Проверка, что ключевые запросы обслуживаются индексами.
+    Последовательное сканирование запрещается на уровне сессии
+    (enable_seqscan = off): если подходящего индекса нет,
+    планировщик все равно выберет Seq Scan, и тест упадет.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.ROLE_MANAGER)
+        cls.manager = User.objects.create_user(username='manager', password='testpass123', role=role)
+        city = City.objects.create(name='Москва')
+        address = Address.objects.create(city=city, street='Тестовая', house='1')
+
+        statuses = [choice for choice, _ in Order.STATUS_CHOICES]
+        orders = Order.objects.bulk_create([
+            Order(
+                client_name=f'Клиент {i}',
+                phone=f'+7999{i:07d}',
+                phone_normalized=f'7999{i:07d}',
+                address=address,
+                status=statuses[i % len(statuses)],
+                assigned_to=cls.manager if i % 3 else None
+            )
+            for i in range(SEED_ORDERS)
+        ])
+        StatusHistory.objects.bulk_create([
+            StatusHistory(order=order, status=order.status)
+            for order in orders
+        ])
+        NotificationLog.objects.bulk_create([
+            NotificationLog(order=order, recipient=cls.manager, message_type=NotificationLog.NOTIFICATION_NEW, message_text='')
+            for order in orders
+        ])
+        Blacklist.objects.bulk_create([
+            Blacklist(client_name=f'Клиент {i}', phone=f'+7999{i:07d}', phone_normalized=f'7999{i:07d}', reason='')
+            for i in range(0, SEED_ORDERS, 2)
+        ])
+        cls.order = orders[0]
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE crm_blacklist')
+            cursor.execute('ANALYZE crm_order')
+            cursor.execute('ANALYZE crm_statushistory')
+            cursor.execute('ANALYZE crm_notificationlog')
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, table):
+        plan = queryset.explain()
+        self.assertNotIn(f'Seq Scan on {table}', plan, plan)
+
+    def test_report_date_range(self):
+        now = timezone.now()
+        self.assertUsesIndex(
+            Order.objects.filter(created_at__gte=now - timedelta(days=7), created_at__lt=now),
+            'crm_order'
+        )
+
+    def test_status_filter(self):
+        self.assertUsesIndex(
+            Order.objects.filter(status=Order.STATUS_COMPLETED).order_by('-created_at'),
+            'crm_order'
+        )
+
+    def test_open_orders(self):
+        self.assertUsesIndex(
+            Order.objects.filter(
+                status__in=[Order.STATUS_UNASSIGNED, Order.STATUS_ASSIGNED, Order.STATUS_IN_PROGRESS]
+            ).order_by('-created_at'),
+            'crm_order'
+        )
+
+    def test_manager_orders(self):
+        self.assertUsesIndex(
+            Order.objects.filter(assigned_to=self.manager, status=Order.STATUS_ASSIGNED),
+            'crm_order'
+        )
+
+    def test_client_orders(self):
+        self.assertUsesIndex(
+            Order.objects.filter(phone_normalized='79990000001', client_name='Клиент 1'),
+            'crm_order'
+        )
+
+    def test_blacklist_lookup(self):
+        self.assertUsesIndex(
+            Blacklist.objects.filter(phone_normalized='79990000001', client_name='Клиент 1'),
+            'crm_blacklist'
+        )
+
+    def test_status_history(self):
+        self.assertUsesIndex(
+            StatusHistory.objects.filter(order=self.order).order_by('changed_at'),
+            'crm_statushistory'
+        )
+
+    def test_recipient_notifications(self):
+        self.assertUsesIndex(
+            NotificationLog.objects.filter(recipient=self.manager).order_by('-created_at', '-id')[:50],
+            'crm_notificationlog'
+        )
+
+    def test_order_notifications(self):
+        self.assertUsesIndex(
+            NotificationLog.objects.filter(order=self.order).order_by('-created_at'),
+            'crm_notificationlog'
+        )
+
+    def test_retry_queue(self):
+        self.assertUsesIndex(
+            NotificationLog.objects.filter(
+                status=NotificationLog.STATUS_FAILED,
+                next_attempt_at__lte=timezone.now()
+            ).order_by('next_attempt_at', 'id')[:100],
+            'crm_notificationlog'
+        )
+
+    def test_blacklist_search(self):
+        for query in ('клиент 12', '999 001'):
+            self.assertUsesIndex(BlacklistService.search(Blacklist.objects.all(), query), 'crm_blacklist')
+
+    def test_blacklist_propagation_chunk(self):
+        # Пакет заявок клиента - диапазон индекса без сортировки
+        plan = Order.objects.filter(
+            phone_normalized='79990000012', client_name='Клиент 12', id__gt=0
+        ).order_by('id').values_list('id', flat=True)[:500].explain()
+        self.assertIn('order_client_id_idx', plan)
+        self.assertNotIn('Sort', plan, plan)
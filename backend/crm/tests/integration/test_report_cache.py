@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from crm.models import Order, ManagerStatus, User, Role, City, Address
+from crm.services.order_service import OrderService
+from crm.services.order_stats_service import OrderStatsService
+from crm.services.report_service import ReportService
+
+
+@override_settings(REPORT_CACHE_CLOSED_TTL=3600, REPORT_CACHE_OPEN_TTL=30, REPORT_CACHE_WAIT=1)
+class ReportCacheTest(TestCase):
+    """Кэш отчетов с версиями по месяцам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = User.objects.create_user(
+            username='operator',
+            password='testpass123',
+            role=Role.objects.create(name=Role.ROLE_OPERATOR)
+        )
+        cls.manager = User.objects.create_user(
+            username='manager',
+            password='testpass123',
+            role=Role.objects.create(name=Role.ROLE_MANAGER)
+        )
+        ManagerStatus.objects.create(user=cls.manager)
+        cls.address = Address.objects.create(city=City.objects.create(name='Москва'), street='Тестовая', house='1')
+
+    def setUp(self):
+        cache.clear()
+        self.order = OrderService.create_order('Клиент', '+79990000001', self.address, '', self.operator)
+
+    def test_repeat_served_from_cache(self):
+        """Повторный отчет не обращается к БД"""
+        report = ReportService.get_orders_report('today')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(ReportService.get_orders_report('today'), report)
+
+    def test_transition_invalidates_period(self):
+        """Изменение заявки через OrderService сбрасывает отчеты ее месяца"""
+        self.assertEqual(ReportService.get_orders_report('today')['total_stats']['completed'], 0)
+
+        OrderService.assign_order(self.order.id, self.manager.id, self.operator)
+        OrderService.update_order_status(self.order.id, Order.STATUS_COMPLETED, self.manager)
+
+        self.assertEqual(ReportService.get_orders_report('today')['total_stats']['completed'], 1)
+        self.assertEqual(ReportService.get_managers_report('today')['managers'][0]['completed'], 1)
+
+    def test_other_month_keeps_cache(self):
+        """Изменения в другом месяце не сбрасывают закрытый период"""
+        ReportService.get_orders_report('custom', date(2025, 1, 1), date(2025, 2, 1))
+
+        OrderService.create_order('Клиент 2', '+79990000002', self.address, '', self.operator)
+
+        with self.assertNumQueries(0):
+            ReportService.get_orders_report('custom', date(2025, 1, 1), date(2025, 2, 1))
+
+    def test_direct_changes_invalidate_closed_period(self):
+        """Сохранение и удаление заявки в обход OrderService сбрасывают закрытый период"""
+        created_at = timezone.now() - timedelta(days=40)
+        Order.objects.filter(id=self.order.id).update(created_at=created_at)
+        OrderStatsService.rebuild(timezone.localdate(created_at), timezone.localdate(created_at))
+        month = timezone.localdate(created_at).replace(day=1)
+        period = ('custom', month, (month + timedelta(days=32)).replace(day=1))
+        self.assertEqual(ReportService.get_orders_report(*period)['total_stats']['total'], 1)
+
+        order = Order.objects.get(id=self.order.id)
+        order.comment = 'Перезвонить'
+        order.save()
+        with CaptureQueriesContext(connection) as queries:
+            ReportService.get_orders_report(*period)
+        self.assertTrue(queries.captured_queries)
+
+        order.delete()
+        self.assertEqual(ReportService.get_orders_report(*period)['total_stats']['total'], 0)
+
+    def test_ttl_by_period(self):
+        """Закрытый период хранится долго, открытый - коротко"""
+        today = timezone.localdate()
+        with mock.patch('crm.services.report_service.cache.set') as cache_set:
+            ReportService.get_orders_report('custom', today - timedelta(days=7), today)
+            ReportService.get_orders_report('week')
+
+        self.assertEqual([call.args[2] for call in cache_set.call_args_list], [3600, 30])
+
+    def test_single_flight(self):
+        """Пока отчет считает другой запрос, повторный ждет его результат"""
+        report = {'total_stats': {'total': 1}}
+        date_range = ReportService._get_date_range('today', None, None)
+        build = mock.Mock(return_value=report)
+
+        # Другой запрос держит блокировку и кладет результат, пока этот ждет
+        real_add = cache.add
+        def taken(lock_key, *args, **kwargs):
+            if lock_key.endswith(':lock'):
+                self.lock_key = lock_key
+                return False
+            return real_add(lock_key, *args, **kwargs)
+        def finish(seconds):
+            cache.set(self.lock_key[:-len(':lock')], report)
+
+        with mock.patch.object(cache, 'add', taken), \
+                mock.patch('crm.services.report_service.sleep', finish):
+            result = ReportService._cached('orders', 'today', date_range, build)
+
+        self.assertEqual(result, report)
+        build.assert_not_called()
+
+    def test_single_flight_owner_failed(self):
+        """Если вычислявший запрос снял блокировку без результата, отчет считается здесь"""
+        date_range = ReportService._get_date_range('today', None, None)
+        build = mock.Mock(return_value={'total_stats': {'total': 1}})
+
+        real_add = cache.add
+        def taken(key, *args, **kwargs):
+            return False if key.endswith(':lock') else real_add(key, *args, **kwargs)
+
+        with mock.patch.object(cache, 'add', taken), mock.patch('crm.services.report_service.sleep'):
+            ReportService._cached('orders', 'today', date_range, build)
+
+        build.assert_called_once_with('today', date_range)
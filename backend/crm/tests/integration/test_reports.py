@@ -0,0 +1,57 @@
+from datetime import date, datetime, time, timedelta
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from crm.models import Order, City, Address
+from crm.services.order_stats_service import OrderStatsService
+from crm.services.report_service import ReportService
+
+
+class OrdersReportTest(TestCase):
+    """Сводный отчет по заявкам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = date(2026, 3, 2)
+        addresses = [
+            Address.objects.create(city=City.objects.create(name=name), street='Тестовая', house='1')
+            for name in ('Москва', 'Казань')
+        ]
+        statuses = ['completed', 'rejected', 'in_progress', 'unassigned', 'assigned']
+        orders = Order.objects.bulk_create([
+            Order(client_name=f'Клиент {i}', phone=f'+7999{i:07d}', address=addresses[i % 2], status=statuses[i % 5])
+            for i in range(23)
+        ])
+        # Последняя заявка - ровно в полночь следующего дня, в отчет за день не входит
+        start = timezone.make_aware(datetime.combine(cls.day, time.min))
+        for i, order in enumerate(orders):
+            order.created_at = start + timedelta(hours=i)
+        Order.objects.bulk_update(orders, ['created_at'])
+        Order.objects.filter(id=orders[-1].id).update(created_at=start + timedelta(days=1))
+        OrderStatsService.rebuild()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_totals_from_single_query(self):
+        # Прошедший день целиком - один запрос к суточному срезу
+        with self.assertNumQueries(1):
+            report = ReportService.get_orders_report('custom', self.day.isoformat(), (self.day + timedelta(days=1)).isoformat())
+
+        self.assertEqual(report['date_from'], self.day)
+        self.assertEqual(report['total_stats'], {
+            'total': 22,
+            'completed': 5,
+            'rejected': 5,
+            'in_progress': 4,
+            'unassigned': 4
+        })
+        self.assertEqual(
+            {row['address__city__name']: row['total'] for row in report['by_city']},
+            {'Москва': 11, 'Казань': 11}
+        )
+
+    def test_empty_period(self):
+        report = ReportService.get_orders_report('custom', date(2020, 1, 1), date(2020, 1, 2))
+        self.assertEqual(report['by_city'], [])
+        self.assertEqual(report['total_stats']['total'], 0)
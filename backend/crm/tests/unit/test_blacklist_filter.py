@@ -0,0 +1,138 @@
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from crm.models import Blacklist, Role, User, City, Address
+from crm.services.blacklist_filter import BlacklistFilter
+from crm.services.order_service import OrderService
+from crm.utils.bloom import BloomFilter
+from crm.utils.versioning import bump_version
+
+
+class BloomFilterTest(SimpleTestCase):
+    """Фильтр Блума"""
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(10000, error_rate=0.01)
+        phones = [f'7999{i:07d}' for i in range(10000)]
+        for phone in phones:
+            bloom.add(phone)
+
+        self.assertTrue(all(phone in bloom for phone in phones))
+        false_positives = sum(f'7888{i:07d}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 200)
+
+
+class BlacklistFilterTest(TestCase):
+    """Фильтр черного списка в памяти процесса"""
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.ROLE_OPERATOR)
+        cls.operator = User.objects.create_user(username='operator', password='testpass123', role=role)
+        city = City.objects.create(name='Москва')
+        cls.address = Address.objects.create(city=city, street='Тестовая', house='1')
+        Blacklist.objects.create(client_name='Иванов Иван', phone='+79991234567', reason='Тест')
+
+    def setUp(self):
+        BlacklistFilter._filter = None
+        BlacklistFilter._checked_at = 0.0
+
+    def _create_order(self, client_name, phone):
+        return OrderService.create_order(
+            client_name=client_name,
+            phone=phone,
+            address=self.address,
+            comment='',
+            operator=self.operator
+        )
+
+    def test_clean_client_without_blacklist_query(self):
+        """Клиент не из ЧС проверяется без запроса к черному списку"""
+        BlacklistFilter.might_contain('')
+
+        with self.assertNumQueries(0):
+            self.assertFalse(BlacklistFilter.might_contain('79990000000'))
+        self.assertFalse(self._create_order('Петров Петр', '+79990000000').is_blacklisted)
+
+    def test_positive_confirmed_by_database(self):
+        """Совпадение телефона подтверждается по имени клиента в БД"""
+        self.assertTrue(self._create_order('Иванов Иван', '8 (999) 123-45-67').is_blacklisted)
+        self.assertFalse(self._create_order('Другой Клиент', '+79991234567').is_blacklisted)
+
+    def _publish_elsewhere(self, phone):
+        """Запись другого процесса: версия и журнал в общем кэше, свой фильтр не тронут"""
+        version = bump_version(BlacklistFilter.VERSION_SCOPE)
+        cache.set(BlacklistFilter.LOG_KEY.format(version), [phone])
+
+    @override_settings(BLACKLIST_FILTER_CHECK_INTERVAL=0)
+    def test_other_process_catches_up_from_log(self):
+        """Добавления другого процесса дочитываются из журнала без пересборки"""
+        BlacklistFilter.might_contain('')
+        bloom = BlacklistFilter._filter
+        self._publish_elsewhere('79995550000')
+
+        with self.assertNumQueries(0):
+            self.assertTrue(BlacklistFilter.might_contain('79995550000'))
+        self.assertIs(BlacklistFilter._filter, bloom)
+
+    @override_settings(BLACKLIST_FILTER_CHECK_INTERVAL=30)
+    def test_version_checked_once_per_interval(self):
+        """Версия сверяется с кэшем не чаще интервала"""
+        # Построение и первая сверка версии после него
+        BlacklistFilter.might_contain('')
+        BlacklistFilter.might_contain('')
+        self._publish_elsewhere('79995550000')
+
+        with mock.patch('crm.services.blacklist_filter.get_version') as get_version:
+            self.assertFalse(BlacklistFilter.might_contain('79995550000'))
+        get_version.assert_not_called()
+
+        BlacklistFilter._checked_at -= 30
+        self.assertTrue(BlacklistFilter.might_contain('79995550000'))
+
+    @override_settings(BLACKLIST_FILTER_CHECK_INTERVAL=30)
+    def test_own_process_changes_visible_immediately(self):
+        """Добавления и инвалидация своего процесса не ждут интервала"""
+        BlacklistFilter.might_contain('')
+        BlacklistFilter.publish(['79995550000'])
+        self.assertTrue(BlacklistFilter.might_contain('79995550000'))
+
+        Blacklist.objects.create(client_name='Сидоров', phone='+79997770000', reason='Тест')
+        Blacklist.objects.filter(phone='+79997770000').update(phone_normalized='79996660000')
+        BlacklistFilter.invalidate()
+        self.assertTrue(BlacklistFilter.might_contain('79996660000'))
+
+    def test_rebuild_does_not_block_checks(self):
+        """Пока фильтр пересобирается, проверки идут по прежнему"""
+        BlacklistFilter.might_contain('')
+        bloom = BlacklistFilter._filter
+        BlacklistFilter.invalidate()
+
+        with BlacklistFilter._build_lock, self.assertNumQueries(0):
+            self.assertFalse(BlacklistFilter.might_contain('79990000000'))
+        self.assertIs(BlacklistFilter._filter, bloom)
+
+    def test_rebuilt_when_log_lost(self):
+        """Разрыв журнала приводит к пересборке из БД"""
+        BlacklistFilter.might_contain('')
+        version = BlacklistFilter._version
+        Blacklist.objects.create(client_name='Сидоров', phone='+79997770000', reason='Тест')
+        cache.delete(BlacklistFilter.LOG_KEY.format(version + 1))
+        BlacklistFilter._filter = BloomFilter(10)
+        BlacklistFilter._filter.add('79991234567')
+
+        self.assertTrue(BlacklistFilter.might_contain('79997770000'))
+        self.assertGreater(BlacklistFilter._filter.capacity, 10)
+
+    def test_backfill_invalidates(self):
+        """Массовое обновление телефонов командой пересобирает фильтр"""
+        Blacklist.objects.create(client_name='Сидоров', phone='+79997770000', reason='Тест')
+        Blacklist.objects.update(phone_normalized='')
+        BlacklistFilter._filter = None
+        self.assertFalse(BlacklistFilter.might_contain('79997770000'))
+
+        call_command('backfill_phone_normalized', stdout=StringIO())
+
+        self.assertTrue(BlacklistFilter.might_contain('79997770000'))
@@ -0,0 +1,74 @@
+from django.test import TestCase
+from django.utils import timezone
+from crm.models import User, Role, City, Address, Order, NotificationLog, NotificationTemplate
+from crm.services.notification_service import NotificationService
+from crm.services.recipient_directory import RecipientDirectory, Recipient
+from crm.services.template_registry import NotificationTemplateRegistry
+
+
+class RecipientDirectoryTest(TestCase):
+    """Справочник получателей уведомлений по ролям"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.role = Role.objects.create(name=Role.ROLE_COORDINATOR)
+        cls.first = User.objects.create_user(username='first', password='testpass123', role=cls.role, telegram_chat_id='100')
+        cls.second = User.objects.create_user(username='second', password='testpass123', role=cls.role)
+
+    def setUp(self):
+        RecipientDirectory.invalidate()
+
+    def test_cached_between_calls(self):
+        """Повторное обращение не делает запросов к БД"""
+        self.assertEqual(RecipientDirectory.get(Role.ROLE_COORDINATOR), [Recipient(self.first.id, '100')])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(RecipientDirectory.get(Role.ROLE_COORDINATOR), [Recipient(self.first.id, '100')])
+
+    def test_invalidated_on_chat_id_change(self):
+        """Смена chat_id сбрасывает справочник"""
+        RecipientDirectory.get(Role.ROLE_COORDINATOR)
+
+        self.second.telegram_chat_id = '200'
+        self.second.save()
+
+        self.assertEqual(
+            RecipientDirectory.get(Role.ROLE_COORDINATOR),
+            [Recipient(self.first.id, '100'), Recipient(self.second.id, '200')]
+        )
+
+    def test_unrelated_update_keeps_cache(self):
+        """Сохранение несвязанных полей (last_login) справочник не сбрасывает"""
+        RecipientDirectory.get(Role.ROLE_COORDINATOR)
+
+        self.first.last_login = timezone.now()
+        self.first.save(update_fields=['last_login'])
+
+        with self.assertNumQueries(0):
+            RecipientDirectory.get(Role.ROLE_COORDINATOR)
+
+    def test_invalidated_on_role_rename(self):
+        """Переименование роли сбрасывает справочник и при update_fields"""
+        RecipientDirectory.get(Role.ROLE_COORDINATOR)
+
+        self.role.name = Role.ROLE_MANAGER
+        self.role.save(update_fields=['name'])
+
+        self.assertEqual(RecipientDirectory.get(Role.ROLE_COORDINATOR), [])
+        self.assertEqual(RecipientDirectory.get(Role.ROLE_MANAGER), [Recipient(self.first.id, '100')])
+
+    def test_completion_fanout_without_user_query(self):
+        """Уведомление о завершении - только INSERT в outbox"""
+        city = City.objects.create(name='Москва')
+        order = Order.objects.create(
+            client_name='Клиент',
+            phone='+79990000000',
+            address=Address.objects.create(city=city, street='Тестовая', house='1')
+        )
+        RecipientDirectory.get(Role.ROLE_COORDINATOR)
+        NotificationTemplateRegistry.render(NotificationTemplate.TYPE_COMPLETION, {'order': order})
+
+        with self.assertNumQueries(1):
+            NotificationService.queue_completion_notification(order)
+
+        self.assertEqual(NotificationLog.objects.get().recipient_id, self.first.id)
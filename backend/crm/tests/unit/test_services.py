@@ -1,7 +1,13 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from crm.services.blacklist_filter import BlacklistFilter
+from crm.services.blacklist_service import BlacklistService
 from crm.services.order_service import OrderService
-from crm.models import Order
+from crm.models import Order, StatusHistory, Blacklist, Role, City, Address, ManagerStatus, NotificationLog
+from crm.tests.helpers import QueryBudgetMixin
 
 User = get_user_model()
 
@@ -29,4 +35,201 @@ class OrderServiceTestCase(TestCase):
         
         self.assertEqual(Order.objects.count(), 1)
         self.assertEqual(order.client_name, "Иванов Иван")
-        self.assertEqual(order.status, 'unassigned')
\ No newline at end of file
+        self.assertEqual(order.status, 'unassigned')
+
+class OrderBulkCreateTestCase(QueryBudgetMixin, TestCase):
+    """Тестирование пакетного создания заявок"""
+
+    # Адреса + черный список + SAVEPOINT/RELEASE + INSERT заявок + INSERT истории
+    # + блокировка дней и upsert суточного среза
+    BULK_CREATE_QUERY_BUDGET = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.ROLE_OPERATOR)
+        cls.operator = User.objects.create_user(
+            username='operator',
+            password='testpass123',
+            role=role
+        )
+        city = City.objects.create(name='Москва')
+        cls.address = Address.objects.create(city=city, street='Тестовая', house='1')
+        Blacklist.objects.create(client_name='Клиент 0', phone='+79990000000', reason='Тест')
+
+    def setUp(self):
+        # Фильтр черного списка строится при первом обращении - вне бюджета запросов
+        BlacklistFilter._filter = None
+        BlacklistFilter.might_contain('')
+
+    def _items(self, count):
+        return [
+            {
+                'client_name': f'Клиент {i}',
+                'phone': f'+7999000{i:04d}',
+                'address_id': self.address.id,
+                'comment': ''
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create_fixed_statements(self):
+        """Число запросов не зависит от размера пакета"""
+        result, small = self.assertQueryBudget(
+            self.BULK_CREATE_QUERY_BUDGET,
+            OrderService.bulk_create_orders, self._items(3), self.operator
+        )
+        _, large = self.assertQueryBudget(
+            self.BULK_CREATE_QUERY_BUDGET,
+            OrderService.bulk_create_orders, self._items(50), self.operator
+        )
+
+        self.assertEqual(small, large)
+        self.assertEqual(Order.objects.count(), 53)
+        self.assertEqual(StatusHistory.objects.count(), 53)
+        self.assertTrue(result['created'][0].is_blacklisted)
+        self.assertFalse(result['created'][1].is_blacklisted)
+
+    def test_bulk_create_reports_item_errors(self):
+        """Ошибки отдельных элементов не мешают создать остальные"""
+        items = self._items(3)
+        items[1]['address_id'] = 0
+
+        result = OrderService.bulk_create_orders(items, self.operator)
+
+        self.assertEqual(len(result['created']), 2)
+        self.assertEqual(result['errors'], [{'index': 1, 'errors': {'address_id': ['Адрес не найден']}}])
+
+class BlacklistPhoneMatchTestCase(TestCase):
+    """Сопоставление с черным списком по нормализованному телефону"""
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(name=Role.ROLE_OPERATOR)
+        cls.operator = User.objects.create_user(
+            username='operator',
+            password='testpass123',
+            role=role
+        )
+        city = City.objects.create(name='Москва')
+        cls.address = Address.objects.create(city=city, street='Тестовая', house='1')
+
+    def test_reformatted_phone_matches_blacklist(self):
+        """Номер в другом формате совпадает с записью черного списка"""
+        Blacklist.objects.create(client_name='Иванов Иван', phone='+79991234567', reason='Тест')
+
+        order = OrderService.create_order(
+            client_name='Иванов Иван',
+            phone='8 (999) 123-45-67',
+            address=self.address,
+            comment='',
+            operator=self.operator
+        )
+
+        self.assertEqual(order.phone_normalized, '79991234567')
+        self.assertTrue(order.is_blacklisted)
+
+    def test_add_to_blacklist_flags_client_orders(self):
+        """Добавление в ЧС помечает заявки клиента независимо от формата номера"""
+        first = Order.objects.create(client_name='Иванов Иван', phone='89991234567', address=self.address)
+        second = Order.objects.create(client_name='Иванов Иван', phone='+7 999 123 45 67', address=self.address)
+
+        entry, job = OrderService.add_to_blacklist(first.id, 'Тест')
+        BlacklistService.propagate(job.id)
+        self.assertEqual(OrderService.add_to_blacklist(second.id, 'Повторно')[0].id, entry.id)
+
+        second.refresh_from_db()
+        self.assertTrue(second.is_blacklisted)
+        self.assertEqual(Blacklist.objects.count(), 1)
+
+    def test_backfill_command(self):
+        """Команда заполняет телефоны порциями и помечает заявки из ЧС"""
+        orders = [
+            Order.objects.create(client_name='Иванов Иван', phone=f'8999123456{i}', address=self.address)
+            for i in range(5)
+        ]
+        Blacklist.objects.create(client_name='Иванов Иван', phone='+79991234560', reason='Тест')
+        Order.objects.update(phone_normalized='', search_document='')
+        Blacklist.objects.update(phone_normalized='')
+        # Вторая запись попадает в последнюю порцию пометки заявок
+        Blacklist.objects.create(client_name='Иванов Иван', phone='+79991234564', reason='Тест')
+
+        call_command('backfill_phone_normalized', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            list(Order.objects.order_by('id').values_list('phone_normalized', flat=True)),
+            [f'7999123456{i}' for i in range(5)]
+        )
+        self.assertIn('79991234560', Order.objects.get(id=orders[0].id).search_document)
+        self.assertEqual(
+            list(Order.objects.filter(is_blacklisted=True).order_by('id').values_list('id', flat=True)),
+            [orders[0].id, orders[4].id]
+        )
+
+class OrderAssignmentTestCase(TestCase):
+    """Атомарное назначение заявок менеджерам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coordinator = User.objects.create_user(
+            username='coordinator',
+            password='testpass123',
+            role=Role.objects.create(name=Role.ROLE_COORDINATOR)
+        )
+        cls.manager = User.objects.create_user(
+            username='manager',
+            password='testpass123',
+            role=Role.objects.create(name=Role.ROLE_MANAGER)
+        )
+        ManagerStatus.objects.create(user=cls.manager)
+        city = City.objects.create(name='Москва')
+        address = Address.objects.create(city=city, street='Тестовая', house='1')
+        cls.first = Order.objects.create(client_name='Клиент 1', phone='+79990000001', address=address)
+        cls.second = Order.objects.create(client_name='Клиент 2', phone='+79990000002', address=address)
+
+    def test_busy_manager_is_not_double_booked(self):
+        """Занятого менеджера нельзя назначить на вторую заявку"""
+        OrderService.assign_order(self.first.id, self.manager.id, self.coordinator)
+
+        with self.assertRaises(ValueError):
+            OrderService.assign_order(self.second.id, self.manager.id, self.coordinator)
+
+        self.second.refresh_from_db()
+        self.assertIsNone(self.second.assigned_to)
+        self.assertEqual(self.second.status, Order.STATUS_UNASSIGNED)
+        self.assertEqual(
+            ManagerStatus.objects.get(user=self.manager).status,
+            ManagerStatus.STATUS_BUSY
+        )
+
+    def test_completion_frees_manager(self):
+        """Завершение заявки освобождает менеджера для следующего назначения"""
+        OrderService.assign_order(self.first.id, self.manager.id, self.coordinator)
+        OrderService.update_order_status(self.first.id, Order.STATUS_COMPLETED, self.manager)
+
+        order = OrderService.assign_order(self.second.id, self.manager.id, self.coordinator)
+
+        self.assertEqual(order.assigned_to, self.manager)
+        self.assertEqual(
+            StatusHistory.objects.filter(status=Order.STATUS_ASSIGNED).count(),
+            2
+        )
+
+    def test_notifications_written_to_outbox(self):
+        """Уведомления пишутся в outbox транзакции, отправка - после коммита"""
+        self.manager.telegram_chat_id = '100'
+        self.manager.save()
+
+        with mock.patch('crm.tasks.dispatch_notifications.delay') as dispatch, \
+                mock.patch('crm.services.telegram_sender.TelegramSender.send_batch') as send:
+            with self.captureOnCommitCallbacks() as callbacks:
+                OrderService.assign_order(self.first.id, self.manager.id, self.coordinator)
+            dispatch.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+
+        dispatch.assert_called_once_with()
+        send.assert_not_called()
+        notification = NotificationLog.objects.get()
+        self.assertEqual(notification.recipient, self.manager)
+        self.assertEqual(notification.status, NotificationLog.STATUS_PENDING)
@@ -0,0 +1,92 @@
+from django.test import SimpleTestCase
+from crm.services.telegram_sender import TokenBucket, TelegramSender
+from crm.tests.fake_telegram import FakeTelegramServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTest(SimpleTestCase):
+    """Ведро токенов для лимитов Telegram"""
+
+    def test_burst_then_rate(self):
+        """Емкость расходуется сразу, дальше токены выдаются со скоростью rate"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+
+        clock.now = 1.0
+        self.assertAlmostEqual(bucket.delay(), 0)
+
+    def test_pause(self):
+        """Пауза после 429 блокирует ведро даже при наличии токенов"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, clock=clock)
+
+        bucket.pause(3)
+
+        self.assertEqual(bucket.delay(), 3)
+        clock.now = 3.0
+        self.assertEqual(bucket.delay(), 0)
+
+
+class TelegramSenderTest(SimpleTestCase):
+    """Отправка пакета сообщений через локальный фейковый Bot API"""
+
+    def test_cooling_chat_does_not_block_others(self):
+        """Сообщения в другие чаты уходят, пока первый чат ждет своего лимита"""
+        messages = [('1', 'a'), ('1', 'b'), ('2', 'c'), ('3', 'd')]
+
+        with FakeTelegramServer(global_rate=100, chat_rate=10) as server:
+            sender = TelegramSender('token', api_url=server.url, global_rate=100, chat_rate=10)
+            self.addCleanup(sender.close)
+            results = sender.send_batch(messages)
+
+        self.assertEqual(results, [True] * 4)
+        self.assertEqual(server.rejected, 0)
+        # Второе сообщение в чат 1 уходит последним, не задерживая чаты 2 и 3
+        self.assertEqual(server.messages[-1][1], 'b')
+
+    def test_retry_after_on_429(self):
+        """Ответ 429 откладывает сообщение на retry_after, затем оно доставляется"""
+        messages = [(str(chat_id), 'text') for chat_id in range(5)]
+
+        with FakeTelegramServer(global_rate=3, retry_after=0.2) as server:
+            # Отправитель настроен на больший лимит, чем допускает сервер
+            sender = TelegramSender('token', api_url=server.url, global_rate=100)
+            self.addCleanup(sender.close)
+            results = sender.send_batch(messages)
+
+        self.assertEqual(results, [True] * 5)
+        self.assertGreater(server.rejected, 0)
+        self.assertEqual(len(server.messages), 5)
+
+    def test_permanent_error_not_retried(self):
+        """Отказ Telegram (не 429) возвращается как неудача без повторов"""
+        with FakeTelegramServer(fail_chats=['2']) as server:
+            sender = TelegramSender('token', api_url=server.url)
+            self.addCleanup(sender.close)
+            with self.assertLogs('crm.services.telegram_sender', 'WARNING'):
+                results = sender.send_batch([('1', 'a'), ('2', 'b')])
+
+        self.assertEqual(results, [True, False])
+        self.assertEqual(len(server.messages), 1)
+
+    def test_batch_timeout(self):
+        """Пакет прерывается по таймауту, доставленное к этому моменту учитывается"""
+        with FakeTelegramServer() as server:
+            # Второе сообщение в чат ждет лимита дольше таймаута пакета
+            sender = TelegramSender('token', api_url=server.url, batch_timeout=0.5)
+            self.addCleanup(sender.close)
+            with self.assertLogs('crm.services.telegram_sender', 'WARNING'):
+                results = sender.send_batch([('1', 'a'), ('1', 'b')])
+
+        self.assertEqual(results, [True, False])
@@ -0,0 +1,77 @@
+from django.test import TestCase
+from crm.models import NotificationTemplate, User, Role, City, Address, Order
+from crm.services.recipient_directory import RecipientDirectory
+from crm.services.template_registry import NotificationTemplateRegistry
+from crm.view_helpers.notification_utils import NotificationBuilder
+
+
+class NotificationTemplateRegistryTest(TestCase):
+    """Скомпилированные шаблоны уведомлений"""
+
+    @classmethod
+    def setUpTestData(cls):
+        city = City.objects.create(name='Москва')
+        cls.order = Order.objects.create(
+            client_name='Иванов & сын',
+            phone='+79990000000',
+            address=Address.objects.create(city=city, street='Тестовая', house='1')
+        )
+
+    def setUp(self):
+        # Данные предыдущих тестов откатаны, а версия в кэше осталась
+        NotificationTemplateRegistry._version = None
+        RecipientDirectory.invalidate()
+
+    def test_file_template_fallback(self):
+        """Без шаблона в БД используется файловый, HTML экранируется"""
+        message = NotificationTemplateRegistry.render(NotificationTemplate.TYPE_CANCELLATION, {
+            'order': self.order,
+            'reason': 'Клиент отказался'
+        })
+
+        self.assertTrue(message.startswith(f'<b>Заявка №{self.order.id} отменена</b>\nПричина: Клиент отказался'))
+        self.assertIn('Иванов &amp; сын', message)
+
+    def test_batch_without_queries(self):
+        """Пакет сообщений рендерится без запросов к БД"""
+        NotificationTemplateRegistry.render(NotificationTemplate.TYPE_COMPLETION, {'order': self.order})
+
+        with self.assertNumQueries(0):
+            messages = NotificationTemplateRegistry.render_many(
+                NotificationTemplate.TYPE_COMPLETION,
+                [{'order': self.order}] * 50
+            )
+
+        self.assertEqual(len(messages), 50)
+        self.assertIn('Менеджер: Не назначен', messages[0])
+
+    def test_edited_template_applied(self):
+        """Изменение шаблона в БД применяется без перезапуска"""
+        NotificationTemplateRegistry.render(NotificationTemplate.TYPE_COMPLETION, {'order': self.order})
+
+        template = NotificationTemplate.objects.create(
+            type=NotificationTemplate.TYPE_COMPLETION,
+            content='Готово: {{ order.id }}'
+        )
+        self.assertEqual(
+            NotificationTemplateRegistry.render(NotificationTemplate.TYPE_COMPLETION, {'order': self.order}),
+            f'Готово: {self.order.id}'
+        )
+
+        template.is_active = False
+        template.save()
+        self.assertIn(
+            'завершена',
+            NotificationTemplateRegistry.render(NotificationTemplate.TYPE_COMPLETION, {'order': self.order})
+        )
+
+    def test_builder_status_change(self):
+        """Уведомления о смене статуса для менеджера и координаторов"""
+        role = Role.objects.create(name=Role.ROLE_COORDINATOR)
+        User.objects.create_user(username='coordinator', password='testpass123', role=role, telegram_chat_id='100')
+
+        notifications = NotificationBuilder.build_status_change_notification(self.order, 'Не назначена')
+
+        self.assertEqual(len(notifications), 1)
+        self.assertEqual(notifications[0]['recipient'].chat_id, '100')
+        self.assertIn('Было: Не назначена', notifications[0]['message'])
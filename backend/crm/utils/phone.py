@@ -0,0 +1,23 @@
+import re
+
+NON_DIGITS = re.compile(r'\D')
+
+
+def normalize_phone(value):
+    """
+    Каноническая форма номера для хранения в индексе и сравнения:
+    только цифры, российский номер всегда с кодом 7.
+    Формат не проверяет, поэтому применима и к уже сохраненным данным.
+    
+    Args:
+        value (str): Номер в произвольном формате ('8 (999) 123-45-67', '+79991234567')
+        
+    Returns:
+        str: Номер вида 79991234567 (пустая строка, если цифр нет)
+    """
+    digits = NON_DIGITS.sub('', value or '')
+    if len(digits) == 11 and digits.startswith('8'):
+        return '7' + digits[1:]
+    if len(digits) == 10:
+        return '7' + digits
+    return digits
@@ -0,0 +1,63 @@
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'crm:version:{}'
+
+
+def _initial_version():
+    # Метка времени вместо 1: после сброса кэша версия не повторит
+    # ранее выданное значение, и старые ETag не совпадут по ошибке.
+    return time.time_ns()
+
+
+def get_versions(*scopes):
+    """
+    Возвращает текущие версии коллекций одним обращением к кэшу.
+    
+    Args:
+        *scopes (str): Имена коллекций ('status_history', 'cities', ...)
+        
+    Returns:
+        dict: {scope: version}
+    """
+    keys = {VERSION_KEY.format(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    
+    versions = {}
+    for key, scope in keys.items():
+        if key not in found:
+            cache.add(key, _initial_version(), None)
+            found[key] = cache.get(key)
+        versions[scope] = found[key]
+    return versions
+
+
+def get_version(scope):
+    """
+    Возвращает текущую версию коллекции.
+    """
+    return get_versions(scope)[scope]
+
+
+def bump_version(scope):
+    """
+    Увеличивает версию коллекции после изменения данных.
+    Атомарно для общего кэша (Redis INCR).
+    """
+    key = VERSION_KEY.format(scope)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), None)
+        return cache.incr(key)
+
+
+def bump_version_on_commit(scope):
+    """
+    Увеличивает версию коллекции сразу и повторно после коммита текущей
+    транзакции: читатель, успевший загрузить старые данные до коммита,
+    не закрепит их под новой версией.
+    """
+    bump_version(scope)
+    transaction.on_commit(lambda: bump_version(scope))
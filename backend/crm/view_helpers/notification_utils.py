@@ -1,12 +1,14 @@
-from django.template.loader import render_to_string
-from .models import NotificationTemplate
-from .services.notification_service import NotificationService
+from ..models import NotificationTemplate, Role
+from ..services.recipient_directory import RecipientDirectory, Recipient
+from ..services.template_registry import NotificationTemplateRegistry
 
 class NotificationBuilder:
     """
     Класс для построения сложных уведомлений с шаблонами.
+    Шаблоны берутся из NotificationTemplateRegistry (скомпилированы
+    и закэшированы), запросов к БД на каждое сообщение нет.
     """
-    
+
     @staticmethod
     def build_assignment_notification(order):
         """
@@ -18,53 +20,39 @@ class NotificationBuilder:
             'client': order.client_name,
             'address': order.address
         }
-        
-        try:
-            template = NotificationTemplate.objects.get(
-                type='assignment',
-                is_active=True
-            )
-            message = template.content.format(**context)
-        except NotificationTemplate.DoesNotExist:
-            message = render_to_string(
-                'emails/assignment_notification.txt',
-                context
-            )
-        
+
+        message = NotificationTemplateRegistry.render(
+            NotificationTemplate.TYPE_ASSIGNMENT,
+            context
+        )
+
         return {
             'recipient': order.assigned_to,
             'message': message,
             'attachments': []
         }
-    
+
     @staticmethod
     def build_status_change_notification(order, old_status):
         """
-        Создает уведомление об изменении статуса.
+        Создает уведомления об изменении статуса для менеджера и координаторов.
+        Тексты для всех получателей рендерятся одним проходом.
         """
+        recipients = [Recipient(order.assigned_to.id, order.assigned_to.telegram_chat_id)] if order.assigned_to else []
+        recipients += RecipientDirectory.get(Role.ROLE_COORDINATOR)
+
         context = {
             'order': order,
             'old_status': old_status,
             'new_status': order.get_status_display()
         }
-        
-        try:
-            template = NotificationTemplate.objects.get(
-                type='status_change',
-                is_active=True
-            )
-            message = template.content.format(**context)
-        except NotificationTemplate.DoesNotExist:
-            message = render_to_string(
-                'emails/status_change_notification.txt',
-                context
-            )
-        
-        recipients = [order.assigned_to] if order.assigned_to else []
-        recipients += User.objects.filter(role__name='coordinator')
-        
+        messages = NotificationTemplateRegistry.render_many(
+            NotificationTemplate.TYPE_STATUS_CHANGE,
+            [dict(context, recipient=recipient) for recipient in recipients]
+        )
+
         return [{
             'recipient': recipient,
             'message': message,
             'attachments': []
-        } for recipient in recipients]
\ No newline at end of file
+        } for recipient, message in zip(recipients, messages)]
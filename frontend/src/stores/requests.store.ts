@@ -46,6 +46,15 @@ interface ApiRequest {
   }>;
 }
 
+/**
+ * Страница курсорной пагинации API
+ */
+interface CursorPage<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
 /**
  * Параметры фильтрации для API
  */
@@ -68,6 +77,7 @@ interface RequestsState {
   loading: boolean;
   error: string | null;
   filters: RequestFilterParams;
+  nextPageUrl: string | null;
 }
 
 export const useRequestsStore = defineStore('requests', {
@@ -82,7 +92,8 @@ export const useRequestsStore = defineStore('requests', {
       search: undefined,
       date_from: undefined,
       date_to: undefined
-    }
+    },
+    nextPageUrl: null
   }),
 
   actions: {
@@ -99,10 +110,32 @@ export const useRequestsStore = defineStore('requests', {
           manager_id: params?.manager_id ? Number(params.manager_id) : undefined
         };
 
-        const response = await httpClient.get<ApiRequest[]>('/api/v1/orders/', {
+        const response = await httpClient.get<CursorPage<ApiRequest>>('/api/v1/orders/', {
           params: apiParams
         });
-        this.requests = response.data.map(this.convertApiRequest);
+        this.requests = response.data.results.map(this.convertApiRequest);
+        this.nextPageUrl = response.data.next;
+      } catch (error) {
+        this.handleError(error, 'Ошибка загрузки заявок');
+        throw error;
+      } finally {
+        this.loading = false;
+      }
+    },
+
+    /**
+     * Догружает следующую страницу заявок (бесконечная прокрутка)
+     */
+    async fetchMoreRequests(): Promise<void> {
+      if (!this.nextPageUrl || this.loading) {
+        return;
+      }
+      this.loading = true;
+      this.error = null;
+      try {
+        const response = await httpClient.get<CursorPage<ApiRequest>>(this.nextPageUrl);
+        this.requests.push(...response.data.results.map(this.convertApiRequest));
+        this.nextPageUrl = response.data.next;
       } catch (error) {
         this.handleError(error, 'Ошибка загрузки заявок');
         throw error;
@@ -306,6 +339,13 @@ export const useRequestsStore = defineStore('requests', {
   },
 
   getters: {
+    /**
+     * Есть ли еще страницы для догрузки
+     */
+    hasMoreRequests(state): boolean {
+      return state.nextPageUrl !== null;
+    },
+
     /**
      * Отфильтрованные заявки
      */